@@ -1,11 +1,9 @@
-import torch
-import cv2
 import numpy as np
 from PIL import Image
 import logging
+from functools import lru_cache
 from typing import Tuple, Optional
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import time
 import os
 import io
@@ -48,24 +46,30 @@ class MockCannyDetector:
         return Image.new("L", image.size, color=128)
 
 
-# Use mocks in testing mode, real imports otherwise
-if TESTING_MODE:
-    StableDiffusionControlNetPipeline = MockStableDiffusionControlNetPipeline
-    ControlNetModel = MockControlNetModel
-    CannyDetector = MockCannyDetector
-    print("Using mock AI models for testing")
-else:
+@lru_cache(maxsize=1)
+def model_classes():
+    """
+    Classes du pipeline, de ControlNet et du détecteur Canny
+
+    Importées au premier usage (diffusers et torch sont lourds) : mocks en
+    mode test ou si les bibliothèques sont absentes.
+    """
+    if TESTING_MODE:
+        print("Using mock AI models for testing")
+        return MockStableDiffusionControlNetPipeline, MockControlNetModel, MockCannyDetector
     try:
         from diffusers import StableDiffusionControlNetPipeline, ControlNetModel
         from controlnet_aux import CannyDetector
     except ImportError as e:
         print(f"Warning: Could not import AI models: {e}")
         print("Falling back to mock models")
-        StableDiffusionControlNetPipeline = MockStableDiffusionControlNetPipeline
-        ControlNetModel = MockControlNetModel
-        CannyDetector = MockCannyDetector
+        return MockStableDiffusionControlNetPipeline, MockControlNetModel, MockCannyDetector
+    return StableDiffusionControlNetPipeline, ControlNetModel, CannyDetector
 
 from config import DEVICE, MODEL_NAME, CONTROLNET_MODEL, INFERENCE_STEPS, GUIDANCE_SCALE
+from app.services.control_cache import control_cache
+from app.services.inference_scheduler import InferenceScheduler, InferenceTimeoutError, inference_deadline
+from app.utils.file_manager import FileManager
 
 logger = logging.getLogger(__name__)
 
@@ -76,8 +80,16 @@ class AestheticAIGenerator:
     def __init__(self):
         self.pipeline = None
         self.controlnet = None
-        self.canny_detector = CannyDetector()
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._canny_detector = None
+        # Inférences simultanées selon le device (INFERENCE_CONCURRENCY_CPU / _CUDA)
+        self.executor = InferenceScheduler(device=DEVICE)
+
+    @property
+    def canny_detector(self):
+        """Détecteur Canny, instancié à la première image de contrôle"""
+        if self._canny_detector is None:
+            self._canny_detector = model_classes()[2]()
+        return self._canny_detector
 
     async def initialize(self):
         """Initialiser les modèles IA"""
@@ -86,13 +98,17 @@ class AestheticAIGenerator:
 
             # Charger en arrière-plan pour ne pas bloquer
             loop = asyncio.get_event_loop()
-            await loop.run_in_executor(self.executor, self._load_models)
+            await loop.run_in_executor(self.executor.executor, self._load_models)
 
             logger.info("Modèles IA initialisés avec succès")
 
     def _load_models(self):
         """Charger les modèles (exécuté en arrière-plan)"""
         try:
+            import torch
+
+            StableDiffusionControlNetPipeline, ControlNetModel, _ = model_classes()
+
             # Charger ControlNet
             self.controlnet = ControlNetModel.from_pretrained(
                 CONTROLNET_MODEL,
@@ -112,6 +128,9 @@ class AestheticAIGenerator:
                 self.pipeline.enable_model_cpu_offload()
                 self.pipeline.enable_xformers_memory_efficient_attention()
 
+            # Threads torch partagés entre les inférences simultanées (CPU)
+            self.executor.configure_threads()
+
         except Exception as e:
             logger.error(f"Erreur lors du chargement des modèles: {e}")
             # Fallback: utiliser un générateur mock pour le développement
@@ -151,8 +170,11 @@ class AestheticAIGenerator:
             # Préparer le prompt basé sur l'intervention
             prompt = self._create_prompt(intervention_type, dose, parameters)
 
-            # Préparer l'image de contrôle avec Canny
-            control_image = self._prepare_control_image(original_image)
+            # Préparer l'image de contrôle avec Canny (mémoïsée par image source)
+            control_image = self._prepare_control_image(
+                original_image,
+                source_hash=FileManager.get_file_hash(image_path),
+            )
 
             # Générer l'image en arrière-plan
             loop = asyncio.get_event_loop()
@@ -196,21 +218,35 @@ class AestheticAIGenerator:
 
         return prompt
 
-    def _prepare_control_image(self, image: Image.Image) -> Image.Image:
+    def _prepare_control_image(
+        self,
+        image: Image.Image,
+        source_hash: Optional[str] = None,
+    ) -> Image.Image:
         """Préparer l'image de contrôle avec détection Canny"""
         # Redimensionner si nécessaire
         if max(image.size) > 768:
             image = image.resize((768, int(768 * image.size[1] / image.size[0])))
 
         # Appliquer Canny
-        control_image = self.canny_detector(image)
-        return control_image
+        if source_hash is None:
+            return self.canny_detector(image)
+        return control_cache.get_or_compute(source_hash, image, self.canny_detector)
 
     def _generate_image(
         self, prompt: str, control_image: Image.Image, original_image: Image.Image
     ) -> Image.Image:
         """Générer l'image avec le pipeline IA"""
         negative_prompt = "unrealistic, fake, artificial, exaggerated, cartoon, distorted, blurry, low quality"
+        deadline = inference_deadline()
+
+        def on_step_end(pipeline, step, timestep, callback_kwargs):
+            # Interrompre la boucle de débruitage au-delà de MAX_INFERENCE_TIME
+            if deadline is not None and time.monotonic() > deadline:
+                raise InferenceTimeoutError(
+                    f"Génération interrompue à l'étape {step + 1}/{INFERENCE_STEPS} : délai maximal dépassé"
+                )
+            return callback_kwargs
 
         result = self.pipeline(
             prompt=prompt,
@@ -219,6 +255,7 @@ class AestheticAIGenerator:
             num_inference_steps=INFERENCE_STEPS,
             guidance_scale=GUIDANCE_SCALE,
             controlnet_conditioning_scale=0.8,
+            callback_on_step_end=on_step_end,
         )
 
         return result.images[0]
@@ -406,7 +443,7 @@ def apply_intervention(
     if pipeline is not None and controlnet is not None and USE_GPU and not TESTING_MODE:
         # Utiliser le pipeline réel
         try:
-            canny_detector = CannyDetector()
+            canny_detector = model_classes()[2]()
             control_image = canny_detector(image)
             prompt = f"beautiful face with enhanced {intervention_type}, dose {dose}"
             
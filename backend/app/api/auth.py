@@ -1,10 +1,11 @@
 """API endpoints pour l'authentification"""
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPAuthorizationCredentials
 
-from app.core.database import get_db
+from app.core.database import DatabaseSession, get_async_db
 from app.services.auth import auth_service, get_current_user
+from app.services.principal_cache import principal_cache
 from app.schemas import (
     UserCreate, UserResponse, UserLogin, TokenResponse,
     SuccessResponse
@@ -17,7 +18,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_data: UserCreate, 
-    db: Session = Depends(get_db)
+    db: DatabaseSession = Depends(get_async_db)
 ):
     """
     Enregistrer un nouveau professionnel de santé
@@ -26,7 +27,7 @@ async def register_user(
     des informations professionnelles.
     """
     try:
-        user = auth_service.create_user(db, user_data)
+        user = await auth_service.create_user(db, user_data)
         return UserResponse.from_orm(user)
     except HTTPException:
         raise
@@ -40,7 +41,7 @@ async def register_user(
 @router.post("/login", response_model=TokenResponse)
 async def login(
     login_data: UserLogin,
-    db: Session = Depends(get_db)
+    db: DatabaseSession = Depends(get_async_db)
 ):
     """
     Connecter un utilisateur avec nom d'utilisateur et PIN
@@ -49,7 +50,7 @@ async def login(
     des requêtes suivantes.
     """
     try:
-        return auth_service.login(db, login_data)
+        return await auth_service.login(db, login_data)
     except HTTPException:
         raise
     except Exception as e:
@@ -74,14 +75,17 @@ async def get_current_user_info(
 
 @router.post("/logout", response_model=SuccessResponse)
 async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(auth_service.security),
     current_user: User = Depends(get_current_user)
 ):
     """
     Déconnecter l'utilisateur
     
     Note: Avec JWT, la déconnexion est gérée côté client
-    en supprimant le token. Cette endpoint confirme la déconnexion.
+    en supprimant le token. Cette endpoint confirme la déconnexion
+    et retire le token du cache d'authentification.
     """
+    principal_cache.invalidate_token(User, credentials.credentials)
     return SuccessResponse(
         message=f"Utilisateur {current_user.username} déconnecté avec succès"
     )
@@ -1,10 +1,23 @@
 """API endpoints principaux et utilitaires"""
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, Response, status
 from datetime import datetime
+from sqlalchemy import text
 
 from app.core.config import settings
-from app.schemas import HealthCheckResponse, SuccessResponse
+from app.core.database import DatabaseSession, get_async_db
+from app.schemas import HealthCheckResponse, ReadinessResponse, SuccessResponse
+from app.services.ai_generator import ai_service
+from app.services.control_cache import control_cache
+from app.services.image_delivery import image_delivery
+from app.services.inference_scheduler import inference_scheduler
+from app.services.job_queue import job_queue
+from app.services.model_artifacts import model_artifacts
+from app.services.pin_hashing import pin_hasher
+from app.services.principal_cache import principal_cache
+from app.services.result_cache import result_cache
+from app.services.status_writer import status_writer
+from app.services.usage import usage_accounting
 
 router = APIRouter(tags=["System"])
 
@@ -29,18 +42,62 @@ async def root():
 
 
 @router.get("/health", response_model=HealthCheckResponse)
+@router.get("/health/live", response_model=HealthCheckResponse)
 async def health_check():
     """
-    Vérification de santé de l'API
+    Vérification de santé de l'API (liveness)
     
     Endpoint utilisé par les systèmes de monitoring
     et les load balancers pour vérifier le statut de l'application.
+    Répond dès le démarrage, sans attendre les modèles IA : utiliser
+    /health/ready pour savoir si les générations peuvent être servies.
     """
     return HealthCheckResponse(
         status="healthy",
         version=settings.app_version,
         timestamp=datetime.now().isoformat(),
-        environment=settings.environment
+        environment=settings.environment,
+        ready=ai_service.models_loaded
+    )
+
+
+@router.get("/health/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response, db: DatabaseSession = Depends(get_async_db)):
+    """
+    Disponibilité de l'API (readiness)
+    
+    200 quand les modèles IA sont chargés (worker embarqué) et la base
+    joignable, 503 pendant le chargement des modèles ou si la base est
+    indisponible.
+    """
+    checks = {}
+    if not settings.embedded_worker:
+        # Modèles chargés par les workers dédiés
+        checks["models"] = "external"
+    elif ai_service.models_loaded:
+        checks["models"] = "fallback" if ai_service.using_fallback else "loaded"
+    else:
+        checks["models"] = "loading" if ai_service.loading else "not_loaded"
+    
+    try:
+        await db.run(lambda session: session.execute(text("SELECT 1")))
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+    
+    if checks["database"] != "ok":
+        readiness = "unavailable"
+    elif checks["models"] in ("loading", "not_loaded"):
+        readiness = "starting"
+    else:
+        readiness = "ready"
+    if readiness != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    return ReadinessResponse(
+        status=readiness,
+        checks=checks,
+        model_load_seconds=ai_service.load_seconds
     )
 
 
@@ -60,3 +117,30 @@ async def get_version():
         "device": settings.device,
         "model_name": settings.model_name
     }
+
+
+@router.get("/metrics", response_model=dict)
+async def get_metrics(db: DatabaseSession = Depends(get_async_db)):
+    """
+    Métriques de fonctionnement
+    
+    Expose le taux de succès des caches (authentification,
+    résultats, images de contrôle, compteurs d'utilisation),
+    la file du pool bcrypt, l'activité du regroupement des
+    inférences, les emplacements de l'ordonnanceur d'inférences,
+    les lots de l'écrivain d'avancement et la profondeur de la
+    file de travaux (avec son seuil de refus).
+    """
+    return {
+        "auth_cache": principal_cache.stats(),
+        "pin_hashing": pin_hasher.stats(),
+        "result_cache": result_cache.stats(),
+        "control_cache": control_cache.stats(),
+        "usage_counters": usage_accounting.stats(),
+        "inference_batches": dict(ai_service.batcher.stats),
+        "inference_scheduler": inference_scheduler.stats(),
+        "status_writer": status_writer.stats(),
+        "image_etags": image_delivery.etags.stats(),
+        "model_artifacts": model_artifacts.stats(),
+        "job_queue": {**await db.run(job_queue.queue_depth), "max_queued": settings.max_queued_jobs}
+    }
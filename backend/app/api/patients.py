@@ -1,16 +1,17 @@
 """API endpoints pour la gestion des patients"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
-from app.core.database import get_db
+from app.core.database import DatabaseSession, get_async_db
 from app.services.auth import get_current_user
 from app.schemas import (
     PatientCreate, PatientResponse, PatientSummary, PatientUpdate,
     SuccessResponse, PaginatedResponse
 )
 from app.models import User, Patient
+from app.utils.pagination import InvalidCursorError, keyset_page
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
@@ -18,7 +19,7 @@ router = APIRouter(prefix="/patients", tags=["Patients"])
 @router.post("/", response_model=PatientResponse, status_code=status.HTTP_201_CREATED)
 async def create_patient(
     patient_data: PatientCreate,
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -27,37 +28,64 @@ async def create_patient(
     Crée un dossier patient avec des données anonymisées
     conformes au RGPD.
     """
-    try:
-        db_patient = Patient(**patient_data.dict())
-        db.add(db_patient)
-        db.commit()
-        db.refresh(db_patient)
-        
-        return PatientResponse.from_orm(db_patient)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la création du patient: {str(e)}"
-        )
+    def create(session: Session) -> PatientResponse:
+        try:
+            db_patient = Patient(**patient_data.dict())
+            session.add(db_patient)
+            session.commit()
+            session.refresh(db_patient)
+            
+            return PatientResponse.from_orm(db_patient)
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la création du patient: {str(e)}"
+            )
+    
+    return await db.run(create)
 
 
-@router.get("/", response_model=List[PatientSummary])
+@router.get("/", response_model=Union[List[PatientSummary], PaginatedResponse])
 async def list_patients(
     skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Pagination par curseur (vide = première page)"),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Lister les patients avec pagination
     
     Retourne une liste paginée des patients avec
-    leurs informations de base.
+    leurs informations de base, plus récents d'abord.
+    Avec `cursor` (vide pour la première page), la
+    pagination se fait par curseur et la réponse est une
+    enveloppe portant `next_cursor`.
     """
-    try:
-        patients = db.query(Patient).offset(skip).limit(limit).all()
+    def fetch(session: Session) -> Union[List[PatientSummary], PaginatedResponse]:
+        query = session.query(Patient)
+        
+        if cursor is not None:
+            patients, next_cursor = keyset_page(query, Patient, cursor, limit)
+            return PaginatedResponse(
+                items=[PatientSummary.from_orm(patient) for patient in patients],
+                per_page=limit,
+                next_cursor=next_cursor
+            )
+        
+        patients = query.order_by(
+            Patient.created_at.desc(), Patient.id.desc()
+        ).offset(skip).limit(limit).all()
         return [PatientSummary.from_orm(patient) for patient in patients]
+    
+    try:
+        return await db.run(fetch)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -65,10 +93,21 @@ async def list_patients(
         )
 
 
+def _get_patient_or_404(session: Session, patient_id: int) -> Patient:
+    """Charger un patient ou lever une 404"""
+    patient = session.query(Patient).filter(Patient.id == patient_id).first()
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient non trouvé"
+        )
+    return patient
+
+
 @router.get("/{patient_id}", response_model=PatientResponse)
 async def get_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -77,21 +116,17 @@ async def get_patient(
     Retourne toutes les informations disponibles
     pour un patient donné.
     """
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Patient non trouvé"
-        )
+    def fetch(session: Session) -> PatientResponse:
+        return PatientResponse.from_orm(_get_patient_or_404(session, patient_id))
     
-    return PatientResponse.from_orm(patient)
+    return await db.run(fetch)
 
 
 @router.put("/{patient_id}", response_model=PatientResponse)
 async def update_patient(
     patient_id: int,
     patient_update: PatientUpdate,
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -100,34 +135,32 @@ async def update_patient(
     Met à jour les informations modifiables du patient
     (exclut l'ID anonyme pour la traçabilité).
     """
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Patient non trouvé"
-        )
-    
-    try:
-        update_data = patient_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(patient, field, value)
-        
-        db.commit()
-        db.refresh(patient)
+    def update(session: Session) -> PatientResponse:
+        patient = _get_patient_or_404(session, patient_id)
         
-        return PatientResponse.from_orm(patient)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la mise à jour: {str(e)}"
-        )
+        try:
+            update_data = patient_update.dict(exclude_unset=True)
+            for field, value in update_data.items():
+                setattr(patient, field, value)
+            
+            session.commit()
+            session.refresh(patient)
+            
+            return PatientResponse.from_orm(patient)
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la mise à jour: {str(e)}"
+            )
+    
+    return await db.run(update)
 
 
 @router.delete("/{patient_id}", response_model=SuccessResponse)
 async def delete_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -136,34 +169,33 @@ async def delete_patient(
     Note: En production, il faudrait implémenter une suppression
     conforme au RGPD avec anonymisation des données liées.
     """
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Patient non trouvé"
-        )
-    
-    try:
-        # TODO: Implémenter une suppression conforme RGPD
-        # Pour l'instant, suppression simple
-        db.delete(patient)
-        db.commit()
+    def delete(session: Session) -> SuccessResponse:
+        patient = _get_patient_or_404(session, patient_id)
+        anonymous_id = patient.anonymous_id
         
-        return SuccessResponse(
-            message=f"Patient {patient.anonymous_id} supprimé avec succès"
-        )
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la suppression: {str(e)}"
-        )
+        try:
+            # TODO: Implémenter une suppression conforme RGPD
+            # Pour l'instant, suppression simple
+            session.delete(patient)
+            session.commit()
+            
+            return SuccessResponse(
+                message=f"Patient {anonymous_id} supprimé avec succès"
+            )
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la suppression: {str(e)}"
+            )
+    
+    return await db.run(delete)
 
 
 @router.get("/search/by-anonymous-id/{anonymous_id}", response_model=PatientResponse)
 async def get_patient_by_anonymous_id(
     anonymous_id: str,
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -172,11 +204,14 @@ async def get_patient_by_anonymous_id(
     Permet de retrouver un patient en utilisant
     son identifiant anonymisé externe.
     """
-    patient = db.query(Patient).filter(Patient.anonymous_id == anonymous_id).first()
-    if not patient:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Patient non trouvé avec cet ID anonyme"
-        )
+    def fetch(session: Session) -> PatientResponse:
+        patient = session.query(Patient).filter(Patient.anonymous_id == anonymous_id).first()
+        if not patient:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Patient non trouvé avec cet ID anonyme"
+            )
+        
+        return PatientResponse.from_orm(patient)
     
-    return PatientResponse.from_orm(patient)
+    return await db.run(fetch)
@@ -1,26 +1,43 @@
 """API endpoints pour les simulations d'interventions esthétiques"""
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, func, or_
 from sqlalchemy.orm import Session
-from typing import List, Optional
-import uuid
+from typing import Any, Dict, List, Optional, Union
 import asyncio
+import json
+import logging
+import uuid
 from pathlib import Path
-from PIL import Image
-import io
 
-from app.core.database import get_db
+from app.core.database import DatabaseSession, get_async_db, open_database_session
 from app.core.config import settings
-from app.services.auth import get_current_user
+from app.services.auth import get_current_user, get_current_user_or_query_token
+from app.services.events import event_bus, simulation_event
 from app.services.ai_generator import ai_service
+from app.services.job_queue import job_queue
+from app.services.control_cache import control_cache
+from app.services.result_cache import result_cache
+from app.services.image_delivery import image_delivery
+from app.services.renditions import (
+    FULL_SIZE, RENDITION_FORMATS, create_file_renditions, delete_renditions, rendition_sizes, select_rendition
+)
+from app.utils import FileManager
+from app.utils.pagination import InvalidCursorError, keyset_page
+from app.utils.uploads import IngestedUpload, ingest_upload, UploadTooLargeError, InvalidImageError
 from app.schemas import (
     SimulationResponse, SimulationSummary, SimulationCreate,
-    SimulationStats, AvailableInterventions, InterventionTypeInfo,
-    SuccessResponse
+    SimulationStats, SimulationSweepResponse, AvailableInterventions,
+    InterventionTypeInfo, SuccessResponse, PaginatedResponse
 )
-from app.models import User, Patient, Simulation
+from app.models import User, Patient, Simulation, SimulationJob
 
 router = APIRouter(prefix="/simulations", tags=["Simulations"])
+logger = logging.getLogger(__name__)
+
+# Images servies par /simulations/{id}/images/{kind}
+IMAGE_KINDS = ("original", "generated")
 
 
 @router.get("/interventions", response_model=AvailableInterventions)
@@ -53,7 +70,7 @@ async def create_simulation(
     intervention_type: str = Form(...),
     dose: float = Form(...),
     image: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -63,12 +80,10 @@ async def create_simulation(
     pour simuler le résultat d'une intervention esthétique.
     """
     # Vérifier que le patient existe
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Patient non trouvé"
-        )
+    await db.run(_ensure_patient_exists, patient_id)
+    
+    # Refuser avant l'upload si la file de génération est saturée
+    await db.run(_check_admission)
     
     # Valider les paramètres d'intervention
     is_valid, error_msg = ai_service.validate_intervention_parameters(
@@ -87,139 +102,392 @@ async def create_simulation(
             detail="Le fichier doit être une image"
         )
     
+    # Enregistrer l'image par blocs (taille limitée, hash calculé au fil de l'eau)
+    file_id = str(uuid.uuid4())
+    upload = await _ingest_image(image, file_id)
+    generated_filename = f"{file_id}_generated.jpg"
+    user_id = current_user.id
+    
+    def create(session: Session) -> SimulationResponse:
+        try:
+            # Créer l'entrée en base de données
+            db_simulation = Simulation(
+                patient_id=patient_id,
+                user_id=user_id,
+                original_image_path=str(upload.path),
+                intervention_type=intervention_type,
+                dose=dose,
+                status="processing"
+            )
+            
+            session.add(db_simulation)
+            session.flush()
+            
+            # Mettre la génération en file (traitée par un worker)
+            job_queue.enqueue(
+                session,
+                db_simulation.id,
+                payload={"output_filename": generated_filename, "source_hash": upload.sha256},
+                commit=False
+            )
+            session.commit()
+            session.refresh(db_simulation)
+            
+            return SimulationResponse.from_orm(db_simulation)
+            
+        except Exception as e:
+            session.rollback()
+            upload.path.unlink(missing_ok=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la création de la simulation: {str(e)}"
+            )
+    
+    return await db.run(create)
+
+
+@router.post("/sweep", response_model=SimulationSweepResponse, status_code=status.HTTP_201_CREATED)
+async def create_simulation_sweep(
+    patient_id: int = Form(...),
+    intervention_type: str = Form(...),
+    doses: str = Form(..., description="Doses séparées par des virgules, ex: 1,2,3"),
+    image: UploadFile = File(...),
+    db: DatabaseSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Créer une série de simulations à doses différentes
+    
+    Une seule image est envoyée et enregistrée ; le préprocessing et les
+    contours sont partagés et toutes les doses sont générées en un seul lot.
+    Chaque dose donne une simulation classique liée par un sweep_id commun.
+    """
+    await db.run(_ensure_patient_exists, patient_id)
+    await db.run(_check_admission)
+    
+    # Analyser et valider les doses
     try:
-        # Lire et traiter l'image
-        image_content = await image.read()
-        original_image = Image.open(io.BytesIO(image_content))
-        
-        # Générer un nom de fichier unique
-        file_id = str(uuid.uuid4())
-        original_filename = f"{file_id}_original.jpg"
-        generated_filename = f"{file_id}_generated.jpg"
-        
-        # Sauvegarder l'image originale
-        original_path = settings.upload_dir / original_filename
-        original_image.save(original_path, "JPEG", quality=90)
-        
-        # Créer l'entrée en base de données
-        db_simulation = Simulation(
-            patient_id=patient_id,
-            user_id=current_user.id,
-            original_image_path=str(original_path),
-            intervention_type=intervention_type,
-            dose=dose,
-            status="processing"
+        dose_values = sorted({float(value) for value in doses.split(",") if value.strip()})
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Les doses doivent être des nombres séparés par des virgules"
         )
-        
-        db.add(db_simulation)
-        db.commit()
-        db.refresh(db_simulation)
-        
-        # Lancer la génération en arrière-plan
-        asyncio.create_task(
-            process_simulation(db_simulation.id, original_image, intervention_type, dose)
+    if not 2 <= len(dose_values) <= settings.sweep_max_doses:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Une série doit contenir entre 2 et {settings.sweep_max_doses} doses distinctes"
         )
-        
-        return SimulationResponse.from_orm(db_simulation)
-        
-    except Exception as e:
-        db.rollback()
+    for dose in dose_values:
+        is_valid, error_msg = ai_service.validate_intervention_parameters(intervention_type, dose)
+        if not is_valid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error_msg
+            )
+    
+    if not image.content_type.startswith('image/'):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la création de la simulation: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le fichier doit être une image"
         )
+    
+    # Une seule image originale pour toute la série
+    sweep_id = str(uuid.uuid4())
+    upload = await _ingest_image(image, sweep_id)
+    user_id = current_user.id
+    
+    def create(session: Session) -> SimulationSweepResponse:
+        try:
+            simulations = [
+                Simulation(
+                    patient_id=patient_id,
+                    user_id=user_id,
+                    original_image_path=str(upload.path),
+                    intervention_type=intervention_type,
+                    dose=dose,
+                    status="processing",
+                    sweep_id=sweep_id
+                )
+                for dose in dose_values
+            ]
+            session.add_all(simulations)
+            session.flush()
+            
+            # Un seul travail pour toute la série
+            job_queue.enqueue(
+                session,
+                simulations[0].id,
+                payload={
+                    "simulation_ids": [sim.id for sim in simulations],
+                    "output_filenames": {
+                        str(sim.id): f"{sweep_id}_{sim.id}_generated.jpg" for sim in simulations
+                    },
+                    "source_hash": upload.sha256
+                },
+                kind="sweep",
+                commit=False
+            )
+            session.commit()
+            for sim in simulations:
+                session.refresh(sim)
+            
+            return _build_sweep_response(sweep_id, simulations)
+            
+        except Exception as e:
+            session.rollback()
+            upload.path.unlink(missing_ok=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la création de la série: {str(e)}"
+            )
+    
+    return await db.run(create)
 
 
-async def process_simulation(
-    simulation_id: int,
-    original_image: Image.Image,
-    intervention_type: str,
-    dose: float
+def _ensure_patient_exists(session: Session, patient_id: int) -> None:
+    """Lever une 404 si le patient n'existe pas"""
+    if session.query(Patient.id).filter(Patient.id == patient_id).first() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient non trouvé"
+        )
+
+
+def _check_admission(session: Session) -> None:
+    """Lever une 429 (avec Retry-After) si la file de génération est saturée"""
+    delay = job_queue.admission_delay(session)
+    if delay is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de simulations en attente de génération, réessayez plus tard",
+            headers={"Retry-After": str(delay)}
+        )
+
+
+async def _ingest_image(image: UploadFile, file_id: str) -> IngestedUpload:
+    """Enregistrer une image envoyée en traduisant les refus en erreurs HTTP"""
+    try:
+        return await ingest_upload(image, settings.upload_dir, file_id=file_id)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except InvalidImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/sweeps/{sweep_id}", response_model=SimulationSweepResponse)
+async def get_simulation_sweep(
+    sweep_id: str,
+    db: DatabaseSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
 ):
     """
-    Traiter une simulation en arrière-plan
-    
-    Args:
-        simulation_id: ID de la simulation
-        original_image: Image originale PIL
-        intervention_type: Type d'intervention
-        dose: Dosage de l'intervention
+    Obtenir une série de doses et l'état de chacune de ses simulations
     """
-    from app.core.database import SessionLocal
+    user_id = current_user.id
     
-    db = SessionLocal()
-    try:
-        simulation = db.query(Simulation).filter(Simulation.id == simulation_id).first()
-        if not simulation:
-            return
+    def fetch(session: Session) -> SimulationSweepResponse:
+        simulations = session.query(Simulation).filter(
+            Simulation.sweep_id == sweep_id,
+            Simulation.user_id == user_id
+        ).order_by(Simulation.dose).all()
         
-        # Générer l'image avec l'IA
-        generated_image, metadata = await ai_service.generate_simulation(
-            original_image, intervention_type, dose
-        )
-        
-        # Sauvegarder l'image générée
-        file_id = Path(simulation.original_image_path).stem.split('_')[0]
-        generated_filename = f"{file_id}_generated.jpg"
-        generated_path = settings.upload_dir / generated_filename
-        generated_image.save(generated_path, "JPEG", quality=90)
-        
-        # Mettre à jour la simulation
-        simulation.generated_image_path = str(generated_path)
-        simulation.model_version = metadata.get("model_version")
-        simulation.generation_time = metadata.get("generation_time")
-        simulation.mark_completed(metadata.get("generation_time", 0))
+        if not simulations:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Série de simulations non trouvée"
+            )
         
-        db.commit()
-        
-    except Exception as e:
-        # Marquer comme échouée en cas d'erreur
-        if simulation:
-            simulation.mark_failed()
-            db.commit()
-        print(f"Erreur lors du traitement de la simulation {simulation_id}: {e}")
-    finally:
-        db.close()
+        return _build_sweep_response(sweep_id, simulations)
+    
+    return await db.run(fetch)
+
 
+def _build_sweep_response(sweep_id: str, simulations: List[Simulation]) -> SimulationSweepResponse:
+    """Construire la réponse groupée d'une série de doses"""
+    statuses = {sim.status for sim in simulations}
+    if statuses == {"completed"}:
+        sweep_status = "completed"
+    elif "processing" in statuses or "pending" in statuses:
+        sweep_status = "processing"
+    else:
+        sweep_status = "failed"
+    
+    first = simulations[0]
+    return SimulationSweepResponse(
+        sweep_id=sweep_id,
+        patient_id=first.patient_id,
+        intervention_type=first.intervention_type,
+        original_image_path=first.original_image_path,
+        doses=[sim.dose for sim in simulations],
+        status=sweep_status,
+        simulations=[SimulationResponse.from_orm(sim) for sim in simulations]
+    )
 
-@router.get("/", response_model=List[SimulationSummary])
+
+@router.get("/", response_model=Union[List[SimulationSummary], PaginatedResponse])
 async def list_simulations(
     skip: int = 0,
     limit: int = 50,
     patient_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Pagination par curseur (vide = première page)"),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Lister les simulations avec filtres et pagination
     
     Retourne une liste paginée des simulations avec
-    possibilité de filtrer par patient et statut.
+    possibilité de filtrer par patient et statut, plus
+    récentes d'abord. Avec `cursor` (vide pour la première
+    page), la pagination se fait par curseur et la réponse
+    est une enveloppe portant `next_cursor` ; sans, le mode
+    `skip`/`limit` historique est conservé.
     """
-    try:
-        query = db.query(Simulation).filter(Simulation.user_id == current_user.id)
-        
-        if patient_id:
-            query = query.filter(Simulation.patient_id == patient_id)
+    user_id = current_user.id
+    
+    def fetch(session: Session) -> Union[List[SimulationSummary], PaginatedResponse]:
+        query = _simulation_list_query(session, user_id, patient_id, status)
         
-        if status:
-            query = query.filter(Simulation.status == status)
+        if cursor is not None:
+            simulations, next_cursor = keyset_page(query, Simulation, cursor, limit)
+            return PaginatedResponse(
+                items=[SimulationSummary.from_orm(sim) for sim in simulations],
+                per_page=limit,
+                next_cursor=next_cursor
+            )
         
         simulations = query.offset(skip).limit(limit).all()
         
         return [SimulationSummary.from_orm(sim) for sim in simulations]
+    
+    try:
+        return await db.run(fetch)
+    # Codes littéraux : le paramètre `status` masque le module fastapi.status
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=500,
             detail=f"Erreur lors de la récupération des simulations: {str(e)}"
         )
 
 
+def _simulation_list_query(
+    db: Session,
+    user_id: int,
+    patient_id: Optional[int] = None,
+    status: Optional[str] = None
+):
+    """
+    Requête des simulations d'un praticien, plus récentes d'abord
+    
+    Chaque combinaison de filtres est servie par un index composite
+    (user_id, [status | patient_id,] created_at) : parcours d'index
+    ordonné, sans tri ni lecture de la table.
+    """
+    query = db.query(Simulation).filter(Simulation.user_id == user_id)
+    
+    if patient_id:
+        query = query.filter(Simulation.patient_id == patient_id)
+    
+    if status:
+        query = query.filter(Simulation.status == status)
+    
+    return query.order_by(Simulation.created_at.desc(), Simulation.id.desc())
+
+
+@router.get("/events")
+async def stream_simulation_events(
+    request: Request,
+    db: DatabaseSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_or_query_token)
+):
+    """
+    Flux Server-Sent Events des simulations de l'utilisateur
+    
+    Un seul flux par client pour toutes ses générations en cours : chaque
+    changement de statut, d'avancement ou d'aperçu est poussé sous forme
+    d'événement `simulation` (JSON). Remplace l'interrogation répétée de
+    GET /simulations/{id}. Accepte le token en paramètre `?token=` pour
+    les clients EventSource.
+    """
+    user_id = current_user.id
+    # Ne pas garder de connexion à la base pendant toute la durée du flux
+    await db.close()
+    
+    return StreamingResponse(
+        _simulation_event_stream(request, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _simulation_event_stream(request: Request, user_id: int):
+    """Générer les événements SSE d'un utilisateur"""
+    queue = event_bus.subscribe(user_id)
+    last_sent: Dict[int, Dict[str, Any]] = {}
+    
+    def format_event(event: Dict[str, Any]) -> str:
+        last_sent[event["id"]] = event
+        return f"event: simulation\nid: {event['id']}\ndata: {json.dumps(event)}\n\n"
+    
+    try:
+        yield f"retry: {int(settings.events_reconcile_seconds * 1000)}\n\n"
+        
+        while not await request.is_disconnected():
+            # Réconciliation en base : état initial et workers d'autres processus
+            for event in await _reconcile_simulation_events(user_id, last_sent):
+                yield format_event(event)
+            
+            try:
+                deadline = asyncio.get_running_loop().time() + settings.events_reconcile_seconds
+                while True:
+                    timeout = deadline - asyncio.get_running_loop().time()
+                    event = await asyncio.wait_for(queue.get(), timeout=max(timeout, 0))
+                    if last_sent.get(event["id"]) != event:
+                        yield format_event(event)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        event_bus.unsubscribe(user_id, queue)
+
+
+async def _reconcile_simulation_events(user_id: int, last_sent: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Événements des simulations actives dont l'état diffère du dernier envoi"""
+    tracked = [sim_id for sim_id, event in last_sent.items() if event["status"] in ("pending", "processing")]
+    
+    def fetch(session: Session) -> List[Dict[str, Any]]:
+        simulations = session.query(Simulation).filter(
+            Simulation.user_id == user_id,
+            or_(Simulation.status.in_(("pending", "processing")), Simulation.id.in_(tracked))
+        ).all()
+        return [simulation_event(sim) for sim in simulations]
+    
+    db = open_database_session()
+    try:
+        events = await db.run(fetch)
+    finally:
+        await db.close()
+    
+    # Les simulations terminées déjà notifiées ne sont plus suivies
+    for sim_id in [sim_id for sim_id, event in last_sent.items() if event["status"] in ("completed", "failed")]:
+        last_sent.pop(sim_id, None)
+    
+    return [event for event in events if last_sent.get(event["id"]) != event]
+
+
 @router.get("/{simulation_id}", response_model=SimulationResponse)
 async def get_simulation(
     simulation_id: int,
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -228,9 +496,19 @@ async def get_simulation(
     Retourne toutes les informations d'une simulation
     incluant les chemins des images et métadonnées.
     """
-    simulation = db.query(Simulation).filter(
+    user_id = current_user.id
+    
+    def fetch(session: Session) -> SimulationResponse:
+        return SimulationResponse.from_orm(_get_simulation_or_404(session, simulation_id, user_id))
+    
+    return await db.run(fetch)
+
+
+def _get_simulation_or_404(session: Session, simulation_id: int, user_id: int) -> Simulation:
+    """Charger une simulation du praticien ou lever une 404"""
+    simulation = session.query(Simulation).filter(
         Simulation.id == simulation_id,
-        Simulation.user_id == current_user.id
+        Simulation.user_id == user_id
     ).first()
     
     if not simulation:
@@ -239,13 +517,80 @@ async def get_simulation(
             detail="Simulation non trouvée"
         )
     
-    return SimulationResponse.from_orm(simulation)
+    return simulation
+
+
+@router.get("/{simulation_id}/images/{kind}")
+async def get_simulation_image(
+    simulation_id: int,
+    kind: str,
+    request: Request,
+    size: str = Query(FULL_SIZE, description="Taille : thumb, medium ou full"),
+    image_format: Optional[str] = Query(None, alias="format", description="webp ou jpeg (sinon selon Accept)"),
+    db: DatabaseSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_or_query_token)
+):
+    """
+    Servir l'image originale ou générée d'une simulation
+    
+    `?size=thumb` pour les listes, `medium` pour l'affichage courant,
+    `full` (défaut) pour l'image complète. Le WebP est servi aux clients
+    qui l'acceptent. Les simulations antérieures aux déclinaisons sont
+    déclinées au premier accès. Accepte `?token=` pour les balises <img>.
+    
+    La réponse porte un ETag fort (empreinte du contenu) : If-None-Match
+    donne un 304, Range une réponse partielle. Une URL épinglée par
+    `?v=<ETag sans guillemets>` est mise en cache comme immuable.
+    """
+    if kind not in IMAGE_KINDS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image non trouvée")
+    if size not in rendition_sizes():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Taille non valide. Tailles disponibles: {rendition_sizes()}"
+        )
+    if image_format is not None and image_format not in RENDITION_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Format non valide. Formats disponibles: {list(RENDITION_FORMATS)}"
+        )
+    user_id = current_user.id
+    
+    def fetch(session: Session):
+        simulation = _get_simulation_or_404(session, simulation_id, user_id)
+        return getattr(simulation, f"{kind}_image_path"), simulation.get_renditions().get(kind, {})
+    
+    source, renditions = await db.run(fetch)
+    if not source or not Path(source).exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image non trouvée")
+    
+    accept = request.headers.get("accept")
+    selected = select_rendition(renditions, size, accept, image_format)
+    if selected is None:
+        # Simulation antérieure aux déclinaisons (ou fichiers supprimés)
+        try:
+            renditions = await asyncio.to_thread(create_file_renditions, Path(source))
+        except Exception as e:
+            logger.warning(f"Déclinaisons impossibles pour la simulation {simulation_id}: {e}")
+        else:
+            def store(session: Session) -> None:
+                simulation = session.get(Simulation, simulation_id)
+                if simulation is not None:
+                    simulation.set_renditions({**simulation.get_renditions(), kind: renditions})
+                    session.commit()
+            
+            await db.run(store)
+            selected = select_rendition(renditions, size, accept, image_format)
+    await db.close()
+    
+    path, media_type = selected or (Path(source), "image/jpeg")
+    return await image_delivery.respond(request, path, media_type, headers={"Vary": "Accept"})
 
 
 @router.delete("/{simulation_id}", response_model=SuccessResponse)
 async def delete_simulation(
     simulation_id: int,
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -254,42 +599,63 @@ async def delete_simulation(
     Supprime la simulation de la base de données et
     nettoie les fichiers images associés.
     """
-    simulation = db.query(Simulation).filter(
-        Simulation.id == simulation_id,
-        Simulation.user_id == current_user.id
-    ).first()
-    
-    if not simulation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Simulation non trouvée"
-        )
+    user_id = current_user.id
     
-    try:
-        # Supprimer les fichiers images
-        if simulation.original_image_path:
-            Path(simulation.original_image_path).unlink(missing_ok=True)
-        if simulation.generated_image_path:
-            Path(simulation.generated_image_path).unlink(missing_ok=True)
-        
-        # Supprimer de la base de données
-        db.delete(simulation)
-        db.commit()
+    def delete(session: Session) -> SuccessResponse:
+        simulation = _get_simulation_or_404(session, simulation_id, user_id)
         
-        return SuccessResponse(
-            message=f"Simulation {simulation_id} supprimée avec succès"
-        )
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la suppression: {str(e)}"
-        )
+        try:
+            # Supprimer les fichiers images (l'originale peut être partagée par une série)
+            shared_original = session.query(Simulation.id).filter(
+                Simulation.original_image_path == simulation.original_image_path,
+                Simulation.id != simulation_id
+            ).first() is not None
+            renditions = simulation.get_renditions()
+            if simulation.original_image_path and not shared_original:
+                original_path = Path(simulation.original_image_path)
+                if original_path.exists():
+                    # Contours et résultats dérivés de l'image du patient (caches indexés par hash)
+                    source_hash = FileManager.get_file_hash(original_path)
+                    control_cache.delete(source_hash)
+                    result_cache.delete_source(source_hash)
+                original_path.unlink(missing_ok=True)
+                delete_renditions(renditions.get("original", {}))
+            delete_renditions(renditions.get("generated", {}))
+            if simulation.generated_image_path:
+                Path(simulation.generated_image_path).unlink(missing_ok=True)
+            if simulation.preview_image_path:
+                Path(simulation.preview_image_path).unlink(missing_ok=True)
+            
+            # Supprimer de la base de données (avec ses travaux de génération)
+            for job in session.query(SimulationJob).filter(SimulationJob.simulation_id == simulation_id).all():
+                payload = job.get_payload()
+                remaining = [i for i in payload.get("simulation_ids", []) if i != simulation_id]
+                if job.kind == "sweep" and remaining and job.status in ("queued", "running"):
+                    # Le travail de la série reste dû aux autres doses
+                    payload["simulation_ids"] = remaining
+                    job.set_payload(payload)
+                    job.simulation_id = remaining[0]
+                else:
+                    session.delete(job)
+            session.delete(simulation)
+            session.commit()
+            
+            return SuccessResponse(
+                message=f"Simulation {simulation_id} supprimée avec succès"
+            )
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la suppression: {str(e)}"
+            )
+    
+    return await db.run(delete)
 
 
 @router.get("/stats/user", response_model=SimulationStats)
 async def get_user_simulation_stats(
-    db: Session = Depends(get_db),
+    db: DatabaseSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -298,26 +664,41 @@ async def get_user_simulation_stats(
     Retourne un résumé des simulations effectuées par
     l'utilisateur connecté.
     """
+    user_id = current_user.id
+    
+    def aggregate(session: Session):
+        # Un seul agrégat groupé par intervention : aucune ligne chargée en mémoire
+        return session.query(
+            Simulation.intervention_type,
+            func.count(Simulation.id).label("total"),
+            func.sum(case((Simulation.status == "completed", 1), else_=0)).label("completed"),
+            func.sum(case((Simulation.status == "failed", 1), else_=0)).label("failed"),
+            # Temps nuls ignorés, comme dans le calcul historique (valeurs fausses)
+            func.sum(case((Simulation.generation_time > 0, Simulation.generation_time))).label("time_sum"),
+            func.count(case((Simulation.generation_time > 0, 1))).label("timed"),
+            func.min(Simulation.id).label("first_id")
+        ).filter(
+            Simulation.user_id == user_id
+        ).group_by(Simulation.intervention_type).all()
+    
     try:
-        simulations = db.query(Simulation).filter(
-            Simulation.user_id == current_user.id
-        ).all()
+        rows = await db.run(aggregate)
         
-        total = len(simulations)
-        completed = len([s for s in simulations if s.status == "completed"])
-        failed = len([s for s in simulations if s.status == "failed"])
+        total = sum(row.total for row in rows)
+        completed = sum(row.completed or 0 for row in rows)
+        failed = sum(row.failed or 0 for row in rows)
         
         # Calculer le temps moyen de génération
-        completed_sims = [s for s in simulations if s.generation_time]
+        timed = sum(row.timed for row in rows)
         avg_time = None
-        if completed_sims:
-            avg_time = sum(s.generation_time for s in completed_sims) / len(completed_sims)
+        if timed:
+            avg_time = sum(row.time_sum or 0.0 for row in rows) / timed
         
-        # Intervention la plus courante
-        from collections import Counter
-        intervention_counts = Counter(s.intervention_type for s in simulations)
-        most_common = intervention_counts.most_common(1)
-        most_common_intervention = most_common[0][0] if most_common else None
+        # Intervention la plus courante (à égalité, la première rencontrée)
+        most_common_intervention = None
+        if rows:
+            most_common = min(rows, key=lambda row: (-row.total, row.first_id))
+            most_common_intervention = most_common.intervention_type
         
         return SimulationStats(
             total_simulations=total,
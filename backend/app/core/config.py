@@ -5,8 +5,11 @@ Gestion des paramètres d'environnement et configuration par environnement
 
 import os
 from pathlib import Path
-from typing import Dict, Any
-from pydantic import BaseSettings
+from typing import Any, Dict, Optional
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:  # pydantic v1
+    from pydantic import BaseSettings
 
 
 class Settings(BaseSettings):
@@ -22,35 +25,98 @@ class Settings(BaseSettings):
     base_dir: Path = Path(__file__).parent.parent
     upload_dir: Path = base_dir / "uploads"
     models_dir: Path = base_dir / "models"
+    cache_dir: Path = base_dir / "cache"
     
     # === Base de données ===
     database_url: str = "sqlite:///./aesthetic_app.db"
+    database_async: bool = False  # Routes sur AsyncSession (asyncpg / aiosqlite)
+    db_pool_size: int = 10  # Connexions permanentes par processus (hors SQLite)
+    db_max_overflow: int = 20  # Connexions supplémentaires en pointe
+    db_pool_timeout: int = 30  # Attente maximale d'une connexion libre (s)
+    db_pool_recycle: int = 1800  # Renouvellement des connexions (s)
+    db_pool_pre_ping: bool = True  # Vérifier la connexion avant usage
+    db_statement_cache_size: int = 500  # Requêtes compilées / préparées en cache
+    sqlite_tuning: bool = True  # WAL, synchronous=NORMAL, busy_timeout et mmap (SQLite uniquement)
+    sqlite_busy_timeout_ms: int = 10000  # Attente d'un verrou d'écriture avant "database is locked"
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # Lecture par mmap (octets, 0 = désactivé)
+    status_writer_max_batch: int = 100  # Mises à jour d'avancement validées par transaction
     
     # === Sécurité ===
     secret_key: str = "changez-moi-en-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    auth_cache_ttl_seconds: float = 60.0  # Cache des utilisateurs authentifiés (0 = désactivé)
+    auth_cache_max_items: int = 10000
+    bcrypt_rounds: int = 12  # Coût bcrypt (les hashs d'un autre coût sont recalculés à la connexion)
+    auth_hash_workers: int = 2  # Calculs bcrypt simultanés
+    auth_hash_max_pending: int = 64  # Calculs en attente avant refus (503)
     
     # === Configuration IA ===
     use_gpu: bool = False
     device: str = "cpu"
     model_name: str = "runwayml/stable-diffusion-v1-5"
     controlnet_model: str = "lllyasviel/sd-controlnet-canny"
+    model_artifact_cache: bool = True  # Poids convertis en safetensors sous models_dir/artifacts (mmap au démarrage)
+    model_artifact_keep: int = 2  # Artefacts conservés (configurations les plus récentes)
     
     # === Paramètres de génération ===
     max_image_size: int = 1024
     inference_steps: int = 20
     guidance_scale: float = 7.5
-    max_inference_time: int = 120
+    max_inference_time: int = 120  # Secondes par image générée (0 = illimité), vérifié à chaque étape
+    
+    # === Ordonnancement des inférences ===
+    inference_concurrency_cpu: int = 1  # Inférences simultanées sur CPU (chacune utilise tous ses threads)
+    inference_concurrency_cuda: int = 1  # Inférences simultanées par GPU
+    inference_max_pending: int = 8  # Lots en attente d'un emplacement avant refus (0 = illimité)
+    torch_num_threads: int = 0  # Threads intra-op torch sur CPU (0 = cœurs / inférences simultanées)
+    torch_interop_threads: int = 0  # Threads inter-op torch (0 = défaut torch)
+    max_queued_jobs: int = 50  # Travaux en attente avant refus des nouvelles simulations (429, 0 = illimité)
+    
+    # === Regroupement des inférences (micro-batching) ===
+    batch_max_size: int = 1  # 1 = pas de regroupement
+    batch_max_wait_ms: int = 50
+    
+    # === Cache des résultats de génération ===
+    result_cache_enabled: bool = True
+    result_cache_memory_mb: int = 256
+    result_cache_disk_mb: int = 2048
+    control_cache_memory_mb: int = 64
+    control_cache_persist: bool = True  # Contours Canny sauvegardés sous cache_dir/control (non publics)
+    usage_cache_ttl_seconds: float = 30.0  # Compteurs d'utilisation en mémoire (quotas)
     
     # === API Configuration ===
     cors_origins: list = ["http://localhost:3000", "http://localhost:5173"]
     max_upload_size: int = 50 * 1024 * 1024  # 50MB
     
+    # === Déclinaisons des images (listes, détail) ===
+    rendition_sizes: Dict[str, int] = {"thumb": 320, "medium": 1024}  # Côté maximal ("full" = taille d'origine)
+    rendition_jpeg_quality: int = 85
+    rendition_webp_quality: int = 80
+    image_etag_cache_items: int = 10000  # Empreintes de fichiers gardées en mémoire
+    image_accel_redirect_prefix: Optional[str] = None  # Ex. "/protected-uploads" : envoi délégué à nginx
+    public_uploads: bool = True  # Montage /uploads sans authentification (clients historiques)
+    
+    # === File de travaux (workers de génération) ===
+    embedded_worker: bool = True  # Worker dans le processus API (mono-nœud)
+    job_lease_seconds: int = 300
+    job_max_attempts: int = 3
+    job_retry_backoff: float = 10.0  # secondes, doublé à chaque tentative
+    job_poll_interval: float = 1.0
+    job_timeout_grace_seconds: int = 30  # Marge ajoutée à max_inference_time (préprocessing, enregistrement)
+    worker_concurrency: int = 1  # Travaux traités en parallèle par worker
+    worker_processes: int = 1  # Workers préforkés de `python -m app.worker` (poids chargés une fois, partagés)
+    sweep_max_doses: int = 6  # Doses par série, générées en un seul lot
+    preview_every_steps: int = 5  # Aperçu publié toutes les N étapes (0 = désactivé)
+    preview_size: int = 256
+    events_reconcile_seconds: float = 5.0  # Vérification en base du flux SSE (workers externes)
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_sensitive = False
+        # Champs model_* (modèle de diffusion) : pas de conflit avec l'API pydantic
+        protected_namespaces = ("settings_",)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -3,18 +3,96 @@ Configuration de base de données modernisée
 Utilise SQLAlchemy 2.0 avec une approche modulaire
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from starlette.concurrency import run_in_threadpool
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional, TypeVar, Union
 
 from app.core.config import settings
 
+T = TypeVar("T")
+
+# Pilotes asynchrones par dialecte
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def _engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Options communes aux engines synchrone et asynchrone
+
+    SQLite n'utilise pas de pool de connexions réseau (pool par thread ou
+    NullPool) : le dimensionnement du pool ne s'applique qu'aux autres bases.
+    """
+    options: Dict[str, Any] = {
+        "echo": settings.debug,  # Log SQL en mode debug
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "query_cache_size": settings.db_statement_cache_size,
+    }
+    if make_url(database_url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    return options
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """
+    Réglages SQLite appliqués à chaque nouvelle connexion
+
+    - WAL : les lectures (routes, flux SSE) ne bloquent plus l'écriture des
+      workers et inversement ; un seul écrivain à la fois reste la règle ;
+    - synchronous=NORMAL : plus de fsync à chaque commit (sûr en WAL, seule
+      la dernière transaction peut être perdue en cas de coupure) ;
+    - busy_timeout : attente d'un verrou au lieu d'un "database is locked" ;
+    - mmap_size : lectures par projection mémoire.
+    """
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+    }
+
+
+def configure_sqlite(engine, pragmas: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Appliquer les pragmas SQLite à chaque connexion ouverte par un engine
+
+    Args:
+        engine: Engine synchrone (ou `AsyncEngine.sync_engine`)
+        pragmas: Pragmas à appliquer (réglages par défaut sinon)
+    """
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                # Base en mémoire : journal_mode reste "memory", sans erreur
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _tune_engine(engine, database_url: str):
+    """Brancher les réglages propres au dialecte sur un engine créé"""
+    if settings.sqlite_tuning and make_url(database_url).get_backend_name() == "sqlite":
+        configure_sqlite(engine.sync_engine if hasattr(engine, "sync_engine") else engine)
+    return engine
+
+
 # Configuration de l'engine avec les bonnes options
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-    echo=settings.debug,  # Log SQL en mode debug
+engine = _tune_engine(
+    create_engine(settings.database_url, **_engine_options(settings.database_url)),
+    settings.database_url
 )
 
 # Session factory
@@ -36,6 +114,141 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def async_database_url(database_url: str) -> str:
+    """
+    URL de la base avec son pilote asynchrone
+
+    Args:
+        database_url: URL synchrone (sqlite:///..., postgresql://...)
+
+    Returns:
+        URL utilisant aiosqlite ou asyncpg
+
+    Raises:
+        ValueError: Si aucun pilote asynchrone n'est connu pour ce dialecte
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Aucun pilote asynchrone pour la base {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_async_engine_for(database_url: str):
+    """
+    Créer un engine asynchrone (pool, pre-ping et cache de requêtes réglés)
+
+    Avec asyncpg, les requêtes préparées sont aussi mises en cache côté
+    connexion ; aiosqlite exécute les requêtes dans son propre thread.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(database_url)
+    options = _engine_options(database_url)
+    if make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    return _tune_engine(create_async_engine(url, **options), database_url)
+
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """Engine asynchrone de l'application, créé au premier usage"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_engine = create_async_engine_for(settings.database_url)
+        # Pas d'expiration au commit : aucun chargement implicite hors greenlet
+        _async_session_factory = async_sessionmaker(
+            bind=_async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    """Nouvelle AsyncSession liée à l'engine asynchrone"""
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def dispose_async_engine() -> None:
+    """Fermer les connexions du pool asynchrone (arrêt de l'application)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
+class DatabaseSession:
+    """
+    Session de base de données utilisable sans bloquer la boucle d'événements
+
+    Les routes décrivent leur travail en base avec l'API ORM habituelle dans
+    une fonction recevant une `Session`, exécutée par `run` :
+    - sur une AsyncSession (asyncpg / aiosqlite), via `run_sync` : les
+      entrées/sorties sont asynchrones, sans thread supplémentaire ;
+    - sur une Session classique, dans le pool de threads de Starlette.
+    Les services existants (pagination, quotas, file de travaux) restent
+    ainsi partagés entre les deux modes.
+    """
+
+    def __init__(self, session: Union[Session, Any]):
+        self.session = session
+        self.is_async = not isinstance(session, Session)
+
+    @property
+    def sync_session(self) -> Session:
+        """Session ORM sous-jacente"""
+        return self.session.sync_session if self.is_async else self.session
+
+    async def run(self, function: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Exécuter une fonction ORM synchrone
+
+        Args:
+            function: Fonction appelée avec la session puis `args`/`kwargs`
+
+        Returns:
+            Résultat de la fonction
+        """
+        if self.is_async:
+            return await self.session.run_sync(function, *args, **kwargs)
+        return await run_in_threadpool(function, self.session, *args, **kwargs)
+
+    async def close(self) -> None:
+        """Fermer la session et rendre sa connexion au pool"""
+        if self.is_async:
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+
+def open_database_session() -> DatabaseSession:
+    """
+    Ouvrir une session pour du code asynchrone
+
+    AsyncSession si `database_async` est activé, sinon Session classique
+    dont les requêtes sont déportées dans un thread.
+    """
+    return DatabaseSession(AsyncSessionLocal() if settings.database_async else SessionLocal())
+
+
+async def get_async_db() -> AsyncGenerator[DatabaseSession, None]:
+    """
+    Dépendance FastAPI des routes asynchrones
+    Ferme la session (et rend sa connexion au pool) en fin de requête
+    """
+    db = open_database_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
 def create_tables() -> None:
     """Créer toutes les tables définies dans les modèles"""
     Base.metadata.create_all(bind=engine)
@@ -6,13 +6,18 @@ Point d'entrée FastAPI modernisé avec architecture modulaire
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import create_tables
+from app.core.database import create_tables, dispose_async_engine
 from app.services.ai_generator import ai_service
+from app.services.pin_hashing import pin_hasher
+from app.services.status_writer import status_writer
+from app.worker import SimulationWorker
 from app.api import auth_router, patients_router, simulations_router, main_router
+from app.utils.uploads import UploadSizeLimitMiddleware
 
 # Configuration du logging
 logging.basicConfig(
@@ -34,18 +39,38 @@ async def lifespan(app: FastAPI):
     create_tables()
     logger.info("Tables de base de données créées")
     
-    # Initialiser les modèles IA en arrière-plan
-    try:
-        await ai_service.initialize_models()
-        logger.info("Modèles IA initialisés")
-    except Exception as e:
-        logger.warning(f"Erreur lors de l'initialisation IA: {e}")
+    # Charger les modèles IA en arrière-plan : l'API répond dès maintenant,
+    # /health/ready passe à 200 une fois les modèles chargés. Sans worker
+    # embarqué, les générations sont faites par `python -m app.worker` :
+    # les processus de l'API ne gardent pas de copie des poids.
+    if settings.embedded_worker:
+        ai_service.load_models_in_background()
+        logger.info("Chargement des modèles IA lancé en arrière-plan")
+    
+    # Worker embarqué pour les déploiements mono-nœud
+    # (désactiver avec EMBEDDED_WORKER=false et lancer `python -m app.worker`)
+    worker = None
+    worker_task = None
+    if settings.embedded_worker:
+        worker = SimulationWorker()
+        worker_task = asyncio.create_task(worker.run())
+        logger.info("Worker de génération embarqué démarré")
     
     yield
     
     # Shutdown
     logger.info("Arrêt de l'application")
+    if worker_task:
+        worker.stop()
+        worker_task.cancel()
+        try:
+            await worker_task
+        except asyncio.CancelledError:
+            pass
+    status_writer.shutdown()
     await ai_service.cleanup()
+    pin_hasher.shutdown()
+    await dispose_async_engine()
 
 
 # Créer l'application FastAPI
@@ -85,6 +110,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Refus des uploads trop volumineux avant l'analyse du formulaire
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -94,8 +122,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Servir les fichiers uploadés
-app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
+# Servir les fichiers uploadés sans contrôle d'accès (clients historiques ;
+# préférer /api/simulations/{id}/images/{kind})
+if settings.public_uploads:
+    app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
 
 # Inclure les routers
 app.include_router(main_router)
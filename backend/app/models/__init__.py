@@ -6,5 +6,7 @@ Exportation centralisée de tous les modèles
 from .user import User
 from .patient import Patient 
 from .simulation import Simulation
+from .job import SimulationJob
+from .usage import UsageStats
 
-__all__ = ["User", "Patient", "Simulation"]
+__all__ = ["User", "Patient", "Simulation", "SimulationJob", "UsageStats"]
@@ -0,0 +1,86 @@
+"""
+Modèle SimulationJob - File de travaux persistante pour la génération IA
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+from datetime import datetime
+from typing import Dict, Any
+import json
+
+from app.core.database import Base
+
+
+class SimulationJob(Base):
+    """
+    Travail de génération en attente ou en cours pour une simulation
+
+    Les workers réservent un travail via un bail (lease) limité dans le
+    temps : si le worker disparaît, le bail expire et le travail est
+    remis en file au lieu de rester bloqué.
+
+    Attributes:
+        id: Identifiant unique
+        simulation_id: Référence vers la simulation à générer
+        kind: Type de travail (simulation, sweep)
+        payload: Paramètres JSON du travail
+        status: Statut du travail (queued, running, completed, failed)
+        attempts: Nombre de tentatives déjà effectuées
+        max_attempts: Nombre maximal de tentatives
+        available_at: Date à partir de laquelle le travail peut être réservé
+        lease_owner: Identifiant du worker détenant le bail
+        lease_expires_at: Date d'expiration du bail
+        last_error: Dernière erreur rencontrée
+        created_at: Date de création
+        updated_at: Date de dernière mise à jour
+        completed_at: Date de fin (succès ou échec définitif)
+    """
+
+    __tablename__ = "simulation_jobs"
+    __table_args__ = (
+        Index("ix_simulation_jobs_status_available_at", "status", "available_at"),
+    )
+
+    # Clé primaire
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Relations
+    simulation_id = Column(Integer, ForeignKey("simulations.id"), nullable=False, index=True)
+
+    # Définition du travail
+    kind = Column(String, default="simulation", nullable=False)
+    payload = Column(Text, nullable=True)  # JSON des paramètres du travail
+
+    # Statut et tentatives
+    status = Column(String, default="queued", nullable=False)  # queued, running, completed, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Bail du worker
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    # Suivi
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    def get_payload(self) -> Dict[str, Any]:
+        """Désérialiser le payload JSON"""
+        if self.payload:
+            try:
+                return json.loads(self.payload)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+
+    def set_payload(self, payload: Dict[str, Any]) -> None:
+        """Sérialiser le payload en JSON"""
+        self.payload = json.dumps(payload) if payload else None
+
+    def __repr__(self) -> str:
+        return (
+            f"<SimulationJob(id={self.id}, simulation_id={self.simulation_id}, "
+            f"status='{self.status}', attempts={self.attempts})>"
+        )
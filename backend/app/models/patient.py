@@ -2,7 +2,7 @@
 Modèle Patient - Données patient anonymisées
 """
 
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -26,6 +26,10 @@ class Patient(Base):
     """
     
     __tablename__ = "patients"
+    __table_args__ = (
+        # Pagination par curseur sur (created_at, id)
+        Index("ix_patients_created_id", "created_at", "id"),
+    )
     
     # Clé primaire
     id = Column(Integer, primary_key=True, index=True)
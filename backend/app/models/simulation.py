@@ -2,7 +2,7 @@
 Modèle Simulation - Simulation d'intervention esthétique
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -27,11 +27,21 @@ class Simulation(Base):
         model_version: Version du modèle IA utilisé
         generation_time: Temps de génération en secondes
         status: Statut de la simulation
+        sweep_id: Identifiant de la série de doses dont fait partie la simulation
+        progress: Avancement de la génération en pourcentage
+        preview_image_path: Chemin vers le dernier aperçu intermédiaire
+        renditions: Chemins JSON des déclinaisons (taille, format) des images
         created_at: Date de création
         completed_at: Date de completion
     """
     
     __tablename__ = "simulations"
+    __table_args__ = (
+        # Listes par praticien triées par date, filtrées par statut ou patient
+        Index("ix_simulations_user_created", "user_id", "created_at"),
+        Index("ix_simulations_user_status_created", "user_id", "status", "created_at"),
+        Index("ix_simulations_user_patient_created", "user_id", "patient_id", "created_at"),
+    )
     
     # Clé primaire
     id = Column(Integer, primary_key=True, index=True)
@@ -55,6 +65,11 @@ class Simulation(Base):
     
     # Statut et tracking
     status = Column(String, default="pending", nullable=False)  # pending, processing, completed, failed
+    sweep_id = Column(String, nullable=True, index=True)  # Série de doses générée en une passe
+    progress = Column(Integer, default=0, nullable=False)  # 0-100 pendant la génération
+    preview_image_path = Column(String, nullable=True)
+    renditions = Column(Text, nullable=True)  # {"generated": {"thumb": {"webp": ..., "jpeg": ...}}, ...}
+    failure_reason = Column(Text, nullable=True)  # Cause de l'échec (délai dépassé, erreur du pipeline)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     completed_at = Column(DateTime, nullable=True)
     
@@ -71,16 +86,38 @@ class Simulation(Base):
         """Sérialiser les paramètres en JSON"""
         self.parameters = json.dumps(params) if params else None
     
+    def get_renditions(self) -> Dict[str, Any]:
+        """Désérialiser les chemins des déclinaisons"""
+        if self.renditions:
+            try:
+                return json.loads(self.renditions)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+    
+    def set_renditions(self, renditions: Dict[str, Any]) -> None:
+        """Sérialiser les chemins des déclinaisons en JSON"""
+        self.renditions = json.dumps(renditions) if renditions else None
+    
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        """URL de la miniature de l'image générée (listes)"""
+        if not self.generated_image_path:
+            return None
+        return f"/api/simulations/{self.id}/images/generated?size=thumb"
+    
     def mark_completed(self, generation_time: float) -> None:
         """Marquer la simulation comme terminée"""
         self.status = "completed"
         self.completed_at = datetime.utcnow()
         self.generation_time = generation_time
+        self.progress = 100
     
-    def mark_failed(self) -> None:
-        """Marquer la simulation comme échouée"""
+    def mark_failed(self, reason: Optional[str] = None) -> None:
+        """Marquer la simulation comme échouée, avec la cause de l'échec"""
         self.status = "failed"
         self.completed_at = datetime.utcnow()
+        self.failure_reason = reason
     
     def __repr__(self) -> str:
         return f"<Simulation(id={self.id}, type='{self.intervention_type}', status='{self.status}')>"
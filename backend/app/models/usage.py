@@ -0,0 +1,50 @@
+"""
+Modèle UsageStats - Compteurs d'utilisation mensuels par praticien
+"""
+
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class UsageStats(Base):
+    """
+    Consommation mensuelle d'un praticien (quotas d'abonnement)
+
+    Une seule ligne par utilisateur et par mois : les compteurs sont
+    incrémentés par upsert atomique à chaque simulation terminée.
+
+    Attributes:
+        id: Identifiant unique
+        user_id: Praticien concerné
+        month: Mois (1-12)
+        year: Année
+        simulations_count: Nombre de simulations terminées
+        storage_used_mb: Stockage consommé par les images générées
+        ai_processing_time_seconds: Temps de génération cumulé
+        created_at: Date de création de la ligne
+    """
+
+    __tablename__ = "usage_stats"
+    __table_args__ = (
+        Index("ix_usage_stats_user_period", "user_id", "year", "month", unique=True),
+    )
+
+    # Clé primaire
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Période
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+
+    # Compteurs
+    simulations_count = Column(Integer, default=0, nullable=False)
+    storage_used_mb = Column(Float, default=0.0, nullable=False)
+    ai_processing_time_seconds = Column(Float, default=0.0, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<UsageStats(user_id={self.user_id}, period={self.year}-{self.month:02d}, simulations={self.simulations_count})>"
@@ -14,12 +14,12 @@ from .patient import (
 from .simulation import (
     SimulationBase, SimulationCreate, SimulationUpdate,
     SimulationResponse, SimulationSummary, SimulationStats,
-    InterventionTypeInfo, AvailableInterventions
+    SimulationSweepResponse, InterventionTypeInfo, AvailableInterventions
 )
 
 # Schémas génériques
 from pydantic import BaseModel
-from typing import List, Any, Optional
+from typing import Dict, List, Any, Optional
 
 
 class SuccessResponse(BaseModel):
@@ -37,12 +37,18 @@ class ErrorResponse(BaseModel):
 
 
 class PaginatedResponse(BaseModel):
-    """Schéma de réponse paginée"""
+    """
+    Schéma de réponse paginée
+    
+    En pagination par curseur, `next_cursor` donne la page suivante
+    (None en fin de liste) et les totaux ne sont pas calculés.
+    """
     items: List[Any]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class HealthCheckResponse(BaseModel):
@@ -51,6 +57,17 @@ class HealthCheckResponse(BaseModel):
     version: str
     timestamp: str
     environment: str
+    ready: Optional[bool] = None
+
+
+class ReadinessResponse(BaseModel):
+    """Schéma pour la vérification de disponibilité (readiness)"""
+    status: str  # ready | starting | unavailable
+    checks: Dict[str, str]
+    model_load_seconds: Optional[float] = None
+
+    class Config:
+        protected_namespaces = ()
 
 
 # Export de tous les schémas
@@ -66,9 +83,9 @@ __all__ = [
     # Simulation schemas
     "SimulationBase", "SimulationCreate", "SimulationUpdate",
     "SimulationResponse", "SimulationSummary", "SimulationStats",
-    "InterventionTypeInfo", "AvailableInterventions",
+    "SimulationSweepResponse", "InterventionTypeInfo", "AvailableInterventions",
     
     # Generic schemas
     "SuccessResponse", "ErrorResponse", "PaginatedResponse", 
-    "HealthCheckResponse"
+    "HealthCheckResponse", "ReadinessResponse"
 ]
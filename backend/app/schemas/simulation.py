@@ -53,6 +53,9 @@ class SimulationUpdate(BaseModel):
     model_version: Optional[str] = None
     generation_time: Optional[float] = None
 
+    class Config:
+        protected_namespaces = ()
+
     @validator('status')
     def validate_status(cls, v):
         """Valider le statut"""
@@ -72,11 +75,28 @@ class SimulationResponse(SimulationBase):
     model_version: Optional[str] = None
     generation_time: Optional[float] = None
     status: str
+    progress: int = 0
+    preview_image_path: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    sweep_id: Optional[str] = None
+    failure_reason: Optional[str] = None
     created_at: datetime
     completed_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+        protected_namespaces = ()
+
+
+class SimulationSweepResponse(BaseModel):
+    """Schéma de réponse pour une série de doses"""
+    sweep_id: str
+    patient_id: int
+    intervention_type: str
+    original_image_path: str
+    doses: List[float]
+    status: str
+    simulations: List[SimulationResponse]
 
 
 class SimulationSummary(BaseModel):
@@ -85,6 +105,8 @@ class SimulationSummary(BaseModel):
     patient_id: int
     intervention_type: str
     status: str
+    progress: int = 0
+    thumbnail_url: Optional[str] = None
     created_at: datetime
 
     class Config:
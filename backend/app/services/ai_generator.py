@@ -1,22 +1,31 @@
 """
 Service IA pour la génération d'images esthétiques
 Utilise Stable Diffusion et ControlNet pour les simulations d'interventions
+
+torch, diffusers et controlnet_aux ne sont importés qu'au chargement des
+modèles ou à la première inférence : l'API démarre sans les attendre
 """
 
-import torch
-import cv2
-import numpy as np
 from PIL import Image
 import logging
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, List
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import time
 import os
+import sys
 import io
-from pathlib import Path
+import hashlib
 
 from app.core.config import settings, INTERVENTION_TYPES
+from app.services.batching import InferenceBatcher, InferenceRequest
+from app.services.inference_scheduler import (
+    InferenceTimeoutError, SchedulerFullError, inference_deadline, inference_scheduler
+)
+from app.services.previews import ProgressCallback, make_step_callback
+from app.services.result_cache import result_cache
+from app.services.control_cache import control_cache
+from app.services.model_artifacts import model_artifacts
+from app.utils.file_manager import ImageProcessor
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -24,8 +33,8 @@ logger = logging.getLogger(__name__)
 
 class MockImageResult:
     """Classe mock pour les résultats d'images en mode test"""
-    def __init__(self, size: Tuple[int, int] = (512, 512)):
-        self.images = [Image.new("RGB", size, color="lightblue")]
+    def __init__(self, size: Tuple[int, int] = (512, 512), count: int = 1):
+        self.images = [Image.new("RGB", size, color="lightblue") for _ in range(count)]
 
 
 class MockControlNetModel:
@@ -51,7 +60,20 @@ class MockStableDiffusionPipeline:
         pass
 
     def __call__(self, *args, **kwargs):
-        return MockImageResult()
+        # Un résultat par prompt, comme le pipeline réel en mode batch
+        prompt = kwargs.get("prompt")
+        count = len(prompt) if isinstance(prompt, list) else 1
+        
+        # Émuler le callback de fin d'étape de diffusers avec des latents factices
+        callback = kwargs.get("callback_on_step_end")
+        if callback is not None:
+            import torch
+            
+            latents = torch.zeros(count, 4, 64, 64)
+            for step in range(kwargs.get("num_inference_steps", 1)):
+                callback(self, step, 1000 - step, {"latents": latents})
+        
+        return MockImageResult(count=count)
 
 
 class MockCannyDetector:
@@ -70,10 +92,22 @@ class AIGeneratorService:
         self.device = settings.device
         self.testing_mode = settings.environment == "test"
         self.models_loaded = False
+        self.using_fallback = False
+        self.load_seconds: Optional[float] = None
+        self._loading_task: Optional[asyncio.Task] = None
         self.pipeline = None
         self.controlnet = None
         self.canny_detector = None
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        # Emplacements d'inférence bornés par device (file d'attente limitée)
+        self.executor = inference_scheduler
+        self.result_cache = result_cache if settings.result_cache_enabled else None
+        self.control_cache = control_cache
+        self.batcher = InferenceBatcher(
+            self._run_pipeline_batch,
+            executor=self.executor,
+            max_batch_size=settings.batch_max_size,
+            max_wait_ms=settings.batch_max_wait_ms
+        )
         
         logger.info(f"Initialisation AIGeneratorService - Device: {self.device}, Test: {self.testing_mode}")
 
@@ -81,10 +115,43 @@ class AIGeneratorService:
         """
         Initialiser les modèles IA de manière asynchrone
         Utilise des mocks en mode test pour éviter le téléchargement
+        
+        Un seul chargement a lieu même si plusieurs appelants attendent
+        (chargement en arrière-plan au démarrage, premières inférences).
         """
         if self.models_loaded:
             return
-
+        
+        loop = asyncio.get_running_loop()
+        task = self._loading_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = self._loading_task = loop.create_task(self._load_models())
+        # L'annulation d'un appelant n'interrompt pas le chargement
+        await asyncio.shield(task)
+
+    def load_models_in_background(self) -> asyncio.Task:
+        """
+        Lancer le chargement des modèles sans l'attendre (démarrage de l'API)
+        
+        Returns:
+            Tâche du chargement
+        """
+        loop = asyncio.get_running_loop()
+        if self._loading_task is None or self._loading_task.get_loop() is not loop:
+            self._loading_task = loop.create_task(self._load_models())
+        return self._loading_task
+
+    @property
+    def loading(self) -> bool:
+        """Chargement des modèles en cours"""
+        return self._loading_task is not None and not self._loading_task.done()
+
+    async def _load_models(self) -> None:
+        """Charger les modèles (réels ou mock) ; repli sur les mocks en cas d'erreur"""
+        if self.models_loaded:
+            return
+        
+        started = time.perf_counter()
         try:
             if self.testing_mode:
                 logger.info("Mode test - Initialisation des modèles mock")
@@ -105,29 +172,63 @@ class AIGeneratorService:
             self.pipeline = MockStableDiffusionPipeline()
             self.controlnet = MockControlNetModel()
             self.canny_detector = MockCannyDetector()
+            self.using_fallback = True
             self.models_loaded = True
+        finally:
+            self.load_seconds = time.perf_counter() - started
 
     async def _load_real_models(self) -> None:
-        """Charger les vrais modèles IA (pour la production)"""
+        """
+        Charger les vrais modèles IA (pour la production)
+        
+        Le premier démarrage résout les poids et les convertit, puis les
+        enregistre dans le cache d'artefacts ; les suivants relisent les
+        fichiers safetensors par mmap, sans conversion.
+        """
         def load_models():
             try:
+                import torch
                 from diffusers import StableDiffusionControlNetPipeline, ControlNetModel
                 from controlnet_aux import CannyDetector
 
-                # Charger ControlNet
-                self.controlnet = ControlNetModel.from_pretrained(
-                    settings.controlnet_model,
-                    torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
-                )
-
-                # Charger le pipeline principal
-                self.pipeline = StableDiffusionControlNetPipeline.from_pretrained(
-                    settings.model_name,
-                    controlnet=self.controlnet,
-                    torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                    safety_checker=None,
-                    requires_safety_checker=False
-                )
+                dtype = torch.float16 if self.device == "cuda" else torch.float32
+                spec = self._artifact_spec(dtype)
+                artifact = model_artifacts.lookup(spec) if settings.model_artifact_cache else None
+                started = time.perf_counter()
+                
+                if artifact is not None:
+                    # Pipeline complet (ControlNet inclus) depuis le cache local
+                    self.pipeline = StableDiffusionControlNetPipeline.from_pretrained(
+                        str(artifact),
+                        torch_dtype=dtype,
+                        use_safetensors=True,
+                        local_files_only=True,
+                        safety_checker=None,
+                        requires_safety_checker=False
+                    )
+                    self.controlnet = self.pipeline.controlnet
+                    logger.info(f"Modèles chargés depuis le cache d'artefacts {artifact.name}")
+                else:
+                    # Charger ControlNet
+                    self.controlnet = ControlNetModel.from_pretrained(
+                        settings.controlnet_model,
+                        torch_dtype=dtype
+                    )
+
+                    # Charger le pipeline principal
+                    self.pipeline = StableDiffusionControlNetPipeline.from_pretrained(
+                        settings.model_name,
+                        controlnet=self.controlnet,
+                        torch_dtype=dtype,
+                        safety_checker=None,
+                        requires_safety_checker=False
+                    )
+                    
+                    if settings.model_artifact_cache:
+                        try:
+                            model_artifacts.store(spec, self.pipeline, time.perf_counter() - started)
+                        except Exception as e:
+                            logger.warning(f"Cache d'artefacts de modèles non enregistré: {e}")
 
                 # Configuration de performance
                 self.pipeline = self.pipeline.to(self.device)
@@ -147,11 +248,62 @@ class AIGeneratorService:
                 logger.error(f"Erreur lors du chargement des modèles réels: {e}")
                 raise
 
-        await asyncio.get_event_loop().run_in_executor(self.executor, load_models)
+        # Chargement hors des emplacements d'inférence (non comptabilisé)
+        await asyncio.get_event_loop().run_in_executor(self.executor.executor, load_models)
+        self.executor.configure_threads()
+
+    def prepare_for_fork(self) -> None:
+        """
+        Figer les modèles avant de créer des workers par fork
+        
+        Mode évaluation et gradients désactivés : l'inférence ne touche plus
+        aux poids, dont les pages restent partagées entre les processus.
+        """
+        components = getattr(self.pipeline, "components", None) or {}
+        for component in components.values():
+            if hasattr(component, "requires_grad_"):
+                component.eval()
+                component.requires_grad_(False)
+
+    def after_fork(self, processes: int = 1, threads: Optional[int] = None) -> None:
+        """
+        Réinitialiser l'état propre au processus dans un worker forké
+        
+        Les threads du parent n'existent pas dans l'enfant : l'ordonnanceur et
+        le regroupeur d'inférences sont recréés, et les cœurs sont partagés
+        entre les processus.
+        
+        Args:
+            processes: Workers forkés sur la machine
+            threads: Threads de calcul torch imposés pour ce processus
+        """
+        self.executor.reset()
+        self.batcher = InferenceBatcher(
+            self._run_pipeline_batch,
+            executor=self.executor,
+            max_batch_size=settings.batch_max_size,
+            max_wait_ms=settings.batch_max_wait_ms
+        )
+        self._loading_task = None
+        if "torch" in sys.modules:
+            self.executor.configure_threads(processes, threads)
+
+    def _artifact_spec(self, dtype: Any) -> Dict[str, Any]:
+        """Configuration identifiant l'artefact des modèles (modèles, précision, versions)"""
+        import diffusers
+        import torch
+        
+        return {
+            "model_name": settings.model_name,
+            "controlnet_model": settings.controlnet_model,
+            "dtype": str(dtype).replace("torch.", ""),
+            "torch": torch.__version__,
+            "diffusers": diffusers.__version__
+        }
 
     def _preprocess_image(self, image: Image.Image) -> Image.Image:
         """
-        Préprocesser l'image d'entrée
+        Préprocesser l'image d'entrée (orientation, RGB, multiples de 8)
         
         Args:
             image: Image PIL d'entrée
@@ -159,24 +311,32 @@ class AIGeneratorService:
         Returns:
             Image preprocessée
         """
-        # Redimensionner si nécessaire
-        max_size = settings.max_image_size
-        if max(image.size) > max_size:
-            ratio = max_size / max(image.size)
-            new_size = tuple(int(dim * ratio) for dim in image.size)
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-
-        # S'assurer que l'image est en RGB
-        if image.mode != "RGB":
-            image = image.convert("RGB")
+        return ImageProcessor.prepare_image_for_ai(image, settings.max_image_size)
 
-        # Redimensionner à des multiples de 8 (requis pour Stable Diffusion)
-        width, height = image.size
-        width = (width // 8) * 8
-        height = (height // 8) * 8
-        image = image.resize((width, height))
-
-        return image
+    def _prepare_control_image(
+        self,
+        image: Image.Image,
+        source_hash: str
+    ) -> Tuple[Image.Image, Image.Image]:
+        """
+        Préprocesser l'image et obtenir ses contours Canny (appel bloquant)
+        
+        Décodage, redimensionnement et détection des contours sont exécutés
+        dans un thread : la boucle d'événements, partagée avec l'API quand
+        le worker est embarqué, n'est pas bloquée.
+        
+        Args:
+            image: Image PIL d'entrée
+            source_hash: Hash de l'image source (clé du cache de contours)
+            
+        Returns:
+            Tuple (image préprocessée, image de contrôle)
+        """
+        processed_image = self._preprocess_image(image)
+        canny_image = self.control_cache.get_or_compute(
+            source_hash, processed_image, self.canny_detector
+        )
+        return processed_image, canny_image
 
     def _create_intervention_prompt(
         self, 
@@ -226,7 +386,9 @@ class AIGeneratorService:
         original_image: Image.Image,
         intervention_type: str,
         dose: float,
-        parameters: Optional[Dict[str, Any]] = None
+        parameters: Optional[Dict[str, Any]] = None,
+        source_hash: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> Tuple[Image.Image, Dict[str, Any]]:
         """
         Générer une simulation d'intervention esthétique
@@ -236,6 +398,8 @@ class AIGeneratorService:
             intervention_type: Type d'intervention
             dose: Dosage de l'intervention
             parameters: Paramètres additionnels
+            source_hash: Hash SHA-256 du fichier source (calculé sur les pixels si absent)
+            progress_callback: Suivi (étape, nombre d'étapes, aperçu) pendant l'inférence
             
         Returns:
             Tuple (image générée, métadonnées)
@@ -246,30 +410,47 @@ class AIGeneratorService:
         parameters = parameters or {}
         
         try:
-            # Préprocesser l'image
-            processed_image = self._preprocess_image(original_image)
-            
             # Créer le prompt
             prompt = self._create_intervention_prompt(intervention_type, dose, parameters)
             
-            # Détecter les contours avec Canny
-            canny_image = self.canny_detector(processed_image)
+            source_hash = source_hash or await asyncio.to_thread(self._hash_image, original_image)
             
-            # Générer l'image
-            def generate():
-                return self.pipeline(
-                    prompt=prompt,
-                    image=canny_image,
-                    num_inference_steps=settings.inference_steps,
-                    guidance_scale=settings.guidance_scale,
-                    generator=torch.Generator(device=self.device).manual_seed(42)
+            # Résultat déjà calculé pour la même source et les mêmes paramètres ?
+            cache_key = None
+            if self.result_cache is not None:
+                cache_key = self.result_cache.make_key(
+                    source_hash,
+                    prompt,
+                    dose,
+                    self._model_version(),
+                    self._inference_settings()
                 )
+                # Décodage PNG et accès disque hors de la boucle d'événements
+                cached = await asyncio.to_thread(self.result_cache.get, cache_key)
+                if cached is not None:
+                    cached_image, metadata = cached
+                    metadata.update({
+                        "generation_time": time.time() - start_time,
+                        "cache_hit": True
+                    })
+                    logger.info(f"Simulation servie depuis le cache - Type: {intervention_type}, Dose: {dose}")
+                    return cached_image, metadata
             
-            result = await asyncio.get_event_loop().run_in_executor(
-                self.executor, generate
+            # Préprocesser l'image et détecter les contours (une seule fois par image source)
+            processed_image, canny_image = await asyncio.to_thread(
+                self._prepare_control_image, original_image, source_hash
             )
             
-            generated_image = result.images[0]
+            # Générer l'image (regroupée avec les requêtes compatibles en attente)
+            generated_image = await self.batcher.submit(
+                prompt,
+                canny_image,
+                num_inference_steps=settings.inference_steps,
+                guidance_scale=settings.guidance_scale,
+                seed=42,
+                progress_callback=progress_callback,
+                deadline=inference_deadline()
+            )
             generation_time = time.time() - start_time
             
             metadata = {
@@ -288,8 +469,14 @@ class AIGeneratorService:
                 f"Dose: {dose}, Temps: {generation_time:.2f}s"
             )
             
+            if cache_key is not None:
+                await asyncio.to_thread(self.result_cache.put, cache_key, generated_image, metadata)
+            
             return generated_image, metadata
             
+        except (SchedulerFullError, InferenceTimeoutError):
+            # Surcharge ou délai dépassé : le travail échoue, pas d'image de repli
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la génération: {e}")
             # En cas d'erreur, retourner une image de fallback
@@ -301,6 +488,196 @@ class AIGeneratorService:
             }
             return fallback_image, metadata
 
+    async def generate_dose_sweep(
+        self,
+        original_image: Image.Image,
+        intervention_type: str,
+        doses: List[float],
+        parameters: Optional[Dict[str, Any]] = None,
+        source_hash: Optional[str] = None,
+        progress_callbacks: Optional[List[Optional[ProgressCallback]]] = None
+    ) -> List[Tuple[Image.Image, Dict[str, Any]]]:
+        """
+        Générer une série de doses pour une même image source
+        
+        Le préprocessing et l'image de contrôle sont calculés une seule fois,
+        puis toutes les doses absentes du cache sont générées en un seul lot.
+        
+        Args:
+            original_image: Image originale du patient
+            intervention_type: Type d'intervention
+            doses: Dosages à comparer
+            parameters: Paramètres additionnels
+            source_hash: Hash SHA-256 du fichier source (calculé sur les pixels si absent)
+            progress_callbacks: Suivi de l'avancement par dose
+            
+        Returns:
+            Liste de tuples (image générée, métadonnées), dans l'ordre des doses
+            
+        Raises:
+            InferenceTimeoutError: Si le lot dépasse `max_inference_time` par dose
+            Exception: Si la génération du lot échoue
+        """
+        await self.initialize_models()
+        
+        start_time = time.time()
+        parameters = parameters or {}
+        source_hash = source_hash or await asyncio.to_thread(self._hash_image, original_image)
+        model_version = self._model_version()
+        
+        progress_callbacks = progress_callbacks or [None] * len(doses)
+        prompts = [self._create_intervention_prompt(intervention_type, dose, parameters) for dose in doses]
+        results: List[Optional[Tuple[Image.Image, Dict[str, Any]]]] = [None] * len(doses)
+        cache_keys: List[Optional[str]] = [None] * len(doses)
+        
+        # Doses déjà calculées pour cette source
+        if self.result_cache is not None:
+            for index, (dose, prompt) in enumerate(zip(doses, prompts)):
+                cache_keys[index] = self.result_cache.make_key(
+                    source_hash, prompt, dose, model_version, self._inference_settings()
+                )
+                cached = await asyncio.to_thread(self.result_cache.get, cache_keys[index])
+                if cached is not None:
+                    cached_image, metadata = cached
+                    metadata.update({"generation_time": time.time() - start_time, "cache_hit": True})
+                    results[index] = (cached_image, metadata)
+        
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            # Préprocessing et contours partagés par toute la série
+            processed_image, canny_image = await asyncio.to_thread(
+                self._prepare_control_image, original_image, source_hash
+            )
+            
+            deadline = inference_deadline(len(missing))
+            requests = [
+                InferenceRequest(
+                    prompt=prompts[index],
+                    control_image=canny_image,
+                    num_inference_steps=settings.inference_steps,
+                    guidance_scale=settings.guidance_scale,
+                    seed=42,
+                    progress_callback=progress_callbacks[index],
+                    deadline=deadline
+                )
+                for index in missing
+            ]
+            # Même chemin que les simulations unitaires : à l'échéance du travail,
+            # le lot en file n'est pas annulé mais abandonné à l'étape suivante
+            images = await self.batcher.submit_batch(requests)
+            generation_time = time.time() - start_time
+            
+            for index, image in zip(missing, images):
+                metadata = {
+                    "model_version": settings.model_name,
+                    "generation_time": generation_time,
+                    "intervention_type": intervention_type,
+                    "dose": doses[index],
+                    "prompt": prompts[index],
+                    "parameters": parameters,
+                    "image_size": processed_image.size,
+                    "device": self.device,
+                    "batch_size": len(requests)
+                }
+                if cache_keys[index] is not None:
+                    await asyncio.to_thread(self.result_cache.put, cache_keys[index], image, metadata)
+                results[index] = (image, metadata)
+        
+        logger.info(
+            f"Série de doses générée - Type: {intervention_type}, Doses: {doses}, "
+            f"Inférences: {len(missing)}, Temps: {time.time() - start_time:.2f}s"
+        )
+        return results
+
+    def _model_version(self) -> str:
+        """Modèles utilisés (clé de cache), repli sur les mocks compris"""
+        version = f"{settings.model_name}+{settings.controlnet_model}"
+        # Les images des mocks de repli ne doivent pas être servies une fois les vrais modèles chargés
+        return f"{version}+fallback" if self.using_fallback else version
+
+    def _inference_settings(self) -> Dict[str, Any]:
+        """Réglages d'inférence influençant le résultat (clé de cache)"""
+        return {
+            "steps": settings.inference_steps,
+            "guidance_scale": settings.guidance_scale,
+            "seed": 42,
+            "max_image_size": settings.max_image_size,
+            "preprocessing": ImageProcessor.PREPROCESSING_VERSION
+        }
+
+    @staticmethod
+    def _hash_image(image: Image.Image) -> str:
+        """Hash SHA-256 du contenu d'une image (pixels, taille et mode)"""
+        digest = hashlib.sha256(f"{image.mode}:{image.size}".encode("utf-8"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def _run_pipeline_batch(self, requests: List[InferenceRequest]) -> List[Image.Image]:
+        """
+        Exécuter un lot de générations en un seul appel du pipeline
+        
+        Args:
+            requests: Requêtes compatibles (même taille, mêmes réglages)
+            
+        Returns:
+            Une image générée par requête, dans le même ordre
+            
+        Raises:
+            InferenceTimeoutError: Si toutes les requêtes du lot sont abandonnées
+                (échéance dépassée ou appelant parti), vérifié à chaque étape
+        """
+        import torch
+        
+        first = requests[0]
+        self._check_abandoned(requests, 0, first.num_inference_steps)
+        
+        callbacks = [request.progress_callback for request in requests]
+        # Avancement et aperçus publiés à la fin de chaque étape de diffusion
+        progress = make_step_callback(
+            callbacks,
+            first.num_inference_steps,
+            settings.preview_every_steps,
+            settings.preview_size
+        ) if any(callbacks) else None
+        
+        def on_step_end(pipeline, step: int, timestep, callback_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            # Une exception levée ici interrompt la boucle de débruitage et libère l'emplacement
+            self._check_abandoned(requests, step + 1, first.num_inference_steps)
+            if progress is not None:
+                return progress(pipeline, step, timestep, callback_kwargs)
+            return callback_kwargs
+        
+        options = {"callback_on_step_end": on_step_end}
+        if progress is not None:
+            options["callback_on_step_end_tensor_inputs"] = ["latents"]
+        
+        result = self.pipeline(
+            prompt=[request.prompt for request in requests],
+            image=[request.control_image for request in requests],
+            num_inference_steps=first.num_inference_steps,
+            guidance_scale=first.guidance_scale,
+            generator=[
+                torch.Generator(device=self.device).manual_seed(request.seed)
+                for request in requests
+            ],
+            **options
+        )
+        return list(result.images)
+
+    @staticmethod
+    def _check_abandoned(requests: List[InferenceRequest], step: int, total_steps: int) -> None:
+        """
+        Interrompre un lot dont plus aucune requête n'attend le résultat
+        
+        Raises:
+            InferenceTimeoutError: Si toutes les requêtes sont abandonnées
+        """
+        if all(request.abandoned() for request in requests):
+            raise InferenceTimeoutError(
+                f"Génération interrompue à l'étape {step}/{total_steps} : "
+                f"délai maximal d'inférence ({settings.max_inference_time}s) dépassé"
+            )
+
     async def get_available_interventions(self) -> Dict[str, Dict[str, Any]]:
         """
         Obtenir la liste des interventions disponibles
@@ -6,32 +6,34 @@ Gestion des utilisateurs, authentification JWT et sécurité
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 import jwt
-from passlib.context import CryptContext
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import DatabaseSession, get_async_db
 from app.models import User
 from app.schemas import UserCreate, UserLogin, TokenResponse
+from app.services.pin_hashing import pin_hasher
+from app.services.principal_cache import principal_cache
 
 
 class AuthService:
     """Service pour gérer l'authentification et la sécurité"""
     
     def __init__(self):
-        # Configuration pour le hachage des PINs
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # Hachage des PINs délégué au pool bcrypt (hors boucle d'événements)
+        self.pin_hasher = pin_hasher
+        self.pwd_context = pin_hasher.context
         self.security = HTTPBearer()
     
     def hash_pin(self, pin: str) -> str:
-        """Hacher un PIN avec bcrypt"""
-        return self.pwd_context.hash(pin)
+        """Hacher un PIN avec bcrypt (appel bloquant)"""
+        return self.pin_hasher.hash_sync(pin)
     
     def verify_pin(self, plain_pin: str, hashed_pin: str) -> bool:
-        """Vérifier un PIN contre son hash"""
-        return self.pwd_context.verify(plain_pin, hashed_pin)
+        """Vérifier un PIN contre son hash (appel bloquant)"""
+        return self.pin_hasher.verify_sync(plain_pin, hashed_pin)[0]
     
     def create_access_token(
         self, 
@@ -107,10 +109,13 @@ class AuthService:
                 detail="Token invalide"
             )
     
-    def authenticate_user(self, db: Session, username: str, pin: str) -> Optional[User]:
+    async def authenticate_user(self, db: DatabaseSession, username: str, pin: str) -> Optional[User]:
         """
         Authentifier un utilisateur avec nom d'utilisateur et PIN
         
+        Le PIN est vérifié dans le pool bcrypt ; si le coût configuré a
+        changé, le hash est recalculé et enregistré de façon transparente.
+        
         Args:
             db: Session de base de données
             username: Nom d'utilisateur
@@ -119,19 +124,30 @@ class AuthService:
         Returns:
             Utilisateur authentifié ou None
         """
-        user = db.query(User).filter(User.username == username.lower()).first()
+        user = await db.run(
+            lambda session: session.query(User).filter(User.username == username.lower()).first()
+        )
         if not user:
             return None
         
         if not user.is_active:
             return None
             
-        if not self.verify_pin(pin, user.hashed_pin):
+        valid, new_hash = await self.pin_hasher.verify(pin, user.hashed_pin)
+        if not valid:
             return None
+        
+        if new_hash is not None:
+            def save_rehash(session: Session) -> None:
+                user.hashed_pin = new_hash
+                session.commit()
+                session.refresh(user)
+            
+            await db.run(save_rehash)
             
         return user
     
-    def create_user(self, db: Session, user_data: UserCreate) -> User:
+    async def create_user(self, db: DatabaseSession, user_data: UserCreate) -> User:
         """
         Créer un nouvel utilisateur
         
@@ -145,21 +161,24 @@ class AuthService:
         Raises:
             HTTPException: Si l'utilisateur existe déjà
         """
-        # Vérifier si l'utilisateur existe déjà
-        if db.query(User).filter(User.username == user_data.username.lower()).first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Nom d'utilisateur déjà utilisé"
-            )
+        def check_unique(session: Session) -> None:
+            if session.query(User).filter(User.username == user_data.username.lower()).first():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Nom d'utilisateur déjà utilisé"
+                )
+            
+            if session.query(User).filter(User.license_number == user_data.license_number).first():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Numéro de licence déjà utilisé"
+                )
         
-        if db.query(User).filter(User.license_number == user_data.license_number).first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Numéro de licence déjà utilisé"
-            )
+        # Vérifier si l'utilisateur existe déjà
+        await db.run(check_unique)
         
         # Créer l'utilisateur
-        hashed_pin = self.hash_pin(user_data.pin)
+        hashed_pin = await self.pin_hasher.hash(user_data.pin)
         db_user = User(
             username=user_data.username.lower(),
             hashed_pin=hashed_pin,
@@ -168,13 +187,15 @@ class AuthService:
             license_number=user_data.license_number
         )
         
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        def save(session: Session) -> User:
+            session.add(db_user)
+            session.commit()
+            session.refresh(db_user)
+            return db_user
         
-        return db_user
+        return await db.run(save)
     
-    def login(self, db: Session, login_data: UserLogin) -> TokenResponse:
+    async def login(self, db: DatabaseSession, login_data: UserLogin) -> TokenResponse:
         """
         Connecter un utilisateur et générer un token
         
@@ -188,7 +209,7 @@ class AuthService:
         Raises:
             HTTPException: Si l'authentification échoue
         """
-        user = self.authenticate_user(db, login_data.username, login_data.pin)
+        user = await self.authenticate_user(db, login_data.username, login_data.pin)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -211,13 +232,16 @@ class AuthService:
 auth_service = AuthService()
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(auth_service.security),
-    db: Session = Depends(get_db)
+    db: DatabaseSession = Depends(get_async_db)
 ) -> User:
     """
     Dépendance FastAPI pour obtenir l'utilisateur actuel
     
+    La session est celle de la route (même dépendance) : l'utilisateur
+    retourné y est rattaché.
+    
     Args:
         credentials: Credentials HTTP Bearer
         db: Session de base de données
@@ -228,9 +252,47 @@ def get_current_user(
     Raises:
         HTTPException: Si l'authentification échoue
     """
-    payload = auth_service.verify_token(credentials.credentials)
-    username = payload.get("sub")
+    return await db.run(_resolve_user_in_session, credentials.credentials)
+
+
+async def get_current_user_or_query_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    token: Optional[str] = Query(None, description="Token JWT (clients EventSource sans en-têtes)"),
+    db: DatabaseSession = Depends(get_async_db)
+) -> User:
+    """
+    Dépendance FastAPI acceptant le token en en-tête ou en paramètre de requête
+    
+    EventSource ne permet pas d'envoyer d'en-tête Authorization : les flux
+    SSE acceptent donc aussi `?token=`.
+    
+    Raises:
+        HTTPException: Si l'authentification échoue
+    """
+    raw_token = credentials.credentials if credentials else token
+    if not raw_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token d'authentification requis"
+        )
+    return await db.run(_resolve_user_in_session, raw_token)
+
+
+def _resolve_user_in_session(session: Session, token: str) -> User:
+    """`_resolve_user` avec la session en premier argument (pour `DatabaseSession.run`)"""
+    return _resolve_user(token, session)
+
+
+def _resolve_user(token: str, db: Session) -> User:
+    """Valider un token et charger l'utilisateur actif correspondant"""
+    payload = auth_service.verify_token(token)
     
+    # Utilisateur déjà authentifié avec ce token : pas de requête en base
+    cached_user = principal_cache.lookup(token, db, User)
+    if cached_user is not None:
+        return cached_user
+    
+    username = payload.get("sub")
     user = db.query(User).filter(User.username == username).first()
     if not user:
         raise HTTPException(
@@ -244,9 +306,14 @@ def get_current_user(
             detail="Compte utilisateur désactivé"
         )
     
+    principal_cache.store(token, user, payload.get("exp"))
     return user
 
 
+# Invalidation du cache à chaque modification d'un utilisateur (désactivation, PIN...)
+principal_cache.register_model(User)
+
+
 def get_current_user_from_token(token: str, db: Session) -> Optional[User]:
     """
     Obtenir l'utilisateur actuel à partir d'un token (pour les tests)
@@ -0,0 +1,190 @@
+"""
+Regroupement dynamique des requêtes d'inférence (micro-batching)
+Collecte les générations en attente pendant une courte fenêtre et les
+exécute en un seul appel du pipeline Stable Diffusion + ControlNet
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from app.services.previews import ProgressCallback
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InferenceRequest:
+    """Requête de génération en attente d'un lot"""
+    prompt: str
+    control_image: Image.Image
+    num_inference_steps: int
+    guidance_scale: float
+    seed: int = 42
+    progress_callback: Optional[ProgressCallback] = field(default=None, repr=False)
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+    deadline: Optional[float] = None  # time.monotonic() au-delà duquel la génération est abandonnée
+
+    @property
+    def batch_key(self) -> Tuple:
+        """Clé de compatibilité : seules les requêtes de même taille et mêmes réglages sont regroupées"""
+        return (self.control_image.size, self.num_inference_steps, self.guidance_scale)
+
+    def abandoned(self) -> bool:
+        """Échéance dépassée ou appelant parti (attente annulée)"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return True
+        return self.future is not None and self.future.cancelled()
+
+
+class InferenceBatcher:
+    """
+    Ordonnanceur de micro-batches pour le pipeline de diffusion
+
+    Les requêtes compatibles (même taille d'image, même nombre d'étapes,
+    même guidance) sont accumulées jusqu'à max_batch_size ou jusqu'à
+    l'expiration de max_wait_ms, puis exécutées en un seul appel.
+    Chaque appelant récupère l'image qui lui correspond.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[InferenceRequest]], List[Image.Image]],
+        executor: Optional[Executor] = None,
+        max_batch_size: int = 4,
+        max_wait_ms: int = 50
+    ):
+        """
+        Args:
+            run_batch: Fonction synchrone exécutant un lot et retournant une image par requête
+            executor: Executor dans lequel exécuter les lots
+            max_batch_size: Taille maximale d'un lot
+            max_wait_ms: Attente maximale avant l'exécution d'un lot incomplet
+        """
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+
+        self._pending: Dict[Tuple, List[InferenceRequest]] = {}
+        self._timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        self._running: Set[asyncio.Task] = set()
+        self.stats = {"batches": 0, "requests": 0, "max_batch_size_seen": 0}
+
+    async def submit(
+        self,
+        prompt: str,
+        control_image: Image.Image,
+        num_inference_steps: int,
+        guidance_scale: float,
+        seed: int = 42,
+        progress_callback: Optional[ProgressCallback] = None,
+        deadline: Optional[float] = None
+    ) -> Image.Image:
+        """
+        Soumettre une génération et attendre son résultat
+        
+        Args:
+            progress_callback: Suivi de l'avancement de cette requête dans son lot
+            deadline: Échéance (time.monotonic()) au-delà de laquelle la génération est abandonnée
+
+        Returns:
+            Image générée pour cette requête
+        """
+        loop = asyncio.get_running_loop()
+        request = InferenceRequest(
+            prompt=prompt,
+            control_image=control_image,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            seed=seed,
+            progress_callback=progress_callback,
+            future=loop.create_future(),
+            deadline=deadline
+        )
+
+        key = request.batch_key
+        bucket = self._pending.setdefault(key, [])
+        bucket.append(request)
+
+        if len(bucket) >= self.max_batch_size:
+            self._dispatch(key)
+        elif len(bucket) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._dispatch, key)
+
+        return await request.future
+
+    async def submit_batch(self, requests: List[InferenceRequest]) -> List[Image.Image]:
+        """
+        Exécuter un lot déjà constitué (série de doses) et attendre ses résultats
+
+        Le lot part immédiatement, en un seul appel, par le même chemin que
+        les lots regroupés : un appelant parti (délai dépassé) marque ses
+        requêtes comme abandonnées sans annuler le calcul déjà soumis à
+        l'exécuteur, qui s'arrête à l'étape suivante et rend son emplacement.
+
+        Args:
+            requests: Requêtes compatibles (même taille, mêmes réglages)
+
+        Returns:
+            Une image par requête, dans le même ordre
+
+        Raises:
+            Exception: Erreur du pipeline pour ce lot
+        """
+        loop = asyncio.get_running_loop()
+        for request in requests:
+            request.future = loop.create_future()
+        self._start(requests)
+
+        results = await asyncio.gather(*(request.future for request in requests), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def _dispatch(self, key: Tuple) -> None:
+        """Lancer l'exécution du lot correspondant à une clé"""
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+        # Les appelants partis entre-temps (délai dépassé) ne sont pas générés
+        batch = [request for request in self._pending.pop(key, []) if not request.future.cancelled()]
+        if batch:
+            self._start(batch)
+
+    def _start(self, batch: List[InferenceRequest]) -> None:
+        """Exécuter un lot dans une tâche indépendante des appelants"""
+        task = asyncio.get_running_loop().create_task(self._execute(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: List[InferenceRequest]) -> None:
+        """Exécuter un lot et redistribuer les résultats aux appelants"""
+        self.stats["batches"] += 1
+        self.stats["requests"] += len(batch)
+        self.stats["max_batch_size_seen"] = max(self.stats["max_batch_size_seen"], len(batch))
+        logger.debug(f"Exécution d'un lot de {len(batch)} génération(s)")
+
+        loop = asyncio.get_running_loop()
+        try:
+            images = await loop.run_in_executor(self.executor, self.run_batch, batch)
+            if len(images) != len(batch):
+                raise RuntimeError(
+                    f"Le pipeline a retourné {len(images)} image(s) pour {len(batch)} requête(s)"
+                )
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        for request, image in zip(batch, images):
+            if not request.future.done():
+                request.future.set_result(image)
@@ -0,0 +1,126 @@
+"""
+Pool de threads à file d'attente bornée
+Base commune des pools de calcul bloquant (bcrypt, inférences) : la taille
+du pool borne les calculs simultanés et `max_pending` les demandes en
+attente ; au-delà, la soumission est refusée plutôt que d'allonger la file
+"""
+
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class BoundedExecutor(Executor):
+    """
+    Exécuteur borné tenant les métriques de file
+
+    S'utilise comme un `Executor` (run_in_executor...). Les sous-classes
+    choisissent l'erreur levée quand la file est pleine (`_full_error`).
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, thread_name_prefix: str):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self.thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _full_error(self) -> Exception:
+        """Erreur levée quand `max_pending` demandes attendent déjà"""
+        return RuntimeError(f"{self.pending} demande(s) déjà en attente")
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool de threads, créé au premier usage"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.thread_name_prefix
+            )
+        return self._executor
+
+    def submit(self, function: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Soumettre un appel bloquant au pool
+
+        Raises:
+            Exception: Erreur de `_full_error` si la file d'attente est pleine
+        """
+        with self._lock:
+            if self.max_pending and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise self._full_error()
+            self.pending += 1
+
+        submitted_at = time.perf_counter()
+        # Une soumission quitte la file une seule fois : au démarrage, ou à
+        # l'annulation du futur avant démarrage (délai du travail dépassé)
+        dequeued = [False]
+
+        def dequeue() -> bool:
+            """Retirer la soumission de la file (verrou déjà acquis)"""
+            if dequeued[0]:
+                return False
+            dequeued[0] = True
+            self.pending -= 1
+            return True
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                dequeue()
+                self.running += 1
+                wait = started_at - submitted_at
+                self.total_wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.total_run_seconds += time.perf_counter() - started_at
+
+        def release_if_cancelled(future: Future) -> None:
+            if future.cancelled():
+                with self._lock:
+                    dequeue()
+
+        try:
+            future = self.executor.submit(task)
+        except RuntimeError:
+            with self._lock:
+                dequeue()
+            raise
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    def shutdown(self, wait: bool = True, **kwargs) -> None:
+        """Arrêter le pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def _queue_stats(self) -> Dict[str, Any]:
+        """Métriques de file (verrou déjà acquis)"""
+        completed = self.completed
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "completed": completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": 1000 * self.total_wait_seconds / completed if completed else 0.0,
+            "max_wait_ms": 1000 * self.max_wait_seconds,
+            "avg_run_ms": 1000 * self.total_run_seconds / completed if completed else 0.0
+        }
@@ -0,0 +1,112 @@
+"""
+Cache des images de contrôle ControlNet (contours Canny)
+La carte de contours ne dépend que de l'image source préprocessée, pas de
+l'intervention ni de la dose : elle est calculée une seule fois par source
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def _image_nbytes(image: Image.Image) -> int:
+    """Estimer la taille mémoire d'une image décodée"""
+    return image.width * image.height * len(image.getbands())
+
+
+class ControlImageCache:
+    """
+    Mémoïsation des images de contrôle par hash de l'image source
+
+    Les entrées sont conservées dans un LRU borné en octets et, en option,
+    persistées dans `cache_dir/control` (`<hash>_<l>x<h>_canny.png`) pour
+    survivre aux redémarrages et être partagées entre workers. Ce dossier
+    n'est pas servi publiquement, contrairement aux uploads, et la taille
+    dans le nom évite que des préprocessings différents s'écrasent.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: Optional[int] = None,
+        persist: Optional[bool] = None,
+        directory: Optional[Path] = None
+    ):
+        self.memory = LRUCache(
+            max_items=256,
+            max_bytes=memory_bytes if memory_bytes is not None else settings.control_cache_memory_mb * 1024 * 1024,
+            sizeof=_image_nbytes
+        )
+        self.persist = settings.control_cache_persist if persist is None else persist
+        self.directory = Path(directory or settings.cache_dir / "control")
+
+    def persisted_path(self, source_hash: str, size: Tuple[int, int]) -> Path:
+        """Chemin de l'image de contrôle persistée pour une source et une taille"""
+        return self.directory / f"{source_hash}_{size[0]}x{size[1]}_canny.png"
+
+    def delete(self, source_hash: str) -> None:
+        """Supprimer les images de contrôle d'une source (mémoire et disque, toutes tailles)"""
+        for key in [key for key in self.memory.keys() if key[0] == source_hash]:
+            self.memory.pop(key)
+        for path in self.directory.glob(f"{source_hash}_*_canny.png"):
+            path.unlink(missing_ok=True)
+
+    def get_or_compute(
+        self,
+        source_hash: str,
+        processed_image: Image.Image,
+        detector: Callable[[Image.Image], Image.Image]
+    ) -> Image.Image:
+        """
+        Obtenir l'image de contrôle d'une source, en la calculant si nécessaire
+
+        Args:
+            source_hash: Hash de l'image source
+            processed_image: Image source préprocessée
+            detector: Détecteur de contours (Canny)
+
+        Returns:
+            Image de contrôle
+        """
+        key = (source_hash, processed_image.size)
+        control_image = self.memory.get(key)
+        if control_image is not None:
+            return control_image
+
+        persisted = self.persisted_path(source_hash, processed_image.size) if self.persist else None
+        if persisted is not None and persisted.exists():
+            try:
+                with Image.open(persisted) as stored:
+                    stored.load()
+                    control_image = stored.copy()
+            except OSError as e:
+                logger.warning(f"Image de contrôle illisible {persisted}: {e}")
+
+        if control_image is None:
+            control_image = detector(processed_image)
+            if persisted is not None:
+                try:
+                    persisted.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = persisted.with_suffix(".tmp")
+                    control_image.save(tmp_path, "PNG")
+                    os.replace(tmp_path, persisted)
+                except OSError as e:
+                    logger.warning(f"Impossible de persister l'image de contrôle {persisted}: {e}")
+
+        self.memory.put(key, control_image)
+        return control_image
+
+    def stats(self):
+        """Statistiques du cache"""
+        return self.memory.stats()
+
+
+# Instance globale du cache d'images de contrôle
+control_cache = ControlImageCache()
@@ -0,0 +1,110 @@
+"""
+Bus d'événements des simulations
+Diffuse les changements de statut et d'avancement aux clients connectés
+(flux Server-Sent Events) au lieu de leur faire interroger l'API
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def simulation_event(simulation) -> Dict[str, Any]:
+    """
+    Construire l'événement publié pour l'état courant d'une simulation
+
+    Args:
+        simulation: Simulation (modèle SQLAlchemy ou ligne équivalente)
+
+    Returns:
+        Données JSON de l'événement
+    """
+    return {
+        "id": simulation.id,
+        "status": simulation.status,
+        "progress": simulation.progress or 0,
+        "preview_image_path": simulation.preview_image_path,
+        "generated_image_path": simulation.generated_image_path,
+        "sweep_id": simulation.sweep_id,
+        "failure_reason": simulation.failure_reason
+    }
+
+
+class SimulationEventBus:
+    """
+    Bus de publication/abonnement en mémoire, par utilisateur
+
+    Chaque abonnement est une file asyncio liée à sa boucle ; la
+    publication est sûre depuis n'importe quel thread (thread du pipeline,
+    workers intégrés). Les workers d'autres processus ne passent pas par ce
+    bus : le flux SSE complète par une réconciliation périodique en base.
+    """
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """
+        S'abonner aux événements d'un utilisateur
+
+        Returns:
+            File recevant les événements
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        """Se désabonner"""
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            for entry in [entry for entry in subscribers if entry[1] is queue]:
+                subscribers.discard(entry)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def subscriber_count(self, user_id: int) -> int:
+        """Nombre d'abonnements actifs d'un utilisateur"""
+        with self._lock:
+            return len(self._subscribers.get(user_id, ()))
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> None:
+        """
+        Publier un événement pour un utilisateur
+
+        Args:
+            user_id: Destinataire
+            event: Données JSON de l'événement
+        """
+        with self._lock:
+            subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = list(
+                self._subscribers.get(user_id, ())
+            )
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Boucle fermée : l'abonné a disparu
+                self.unsubscribe(user_id, queue)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        """Déposer un événement, en écartant le plus ancien si le client est lent"""
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(event)
+
+
+# Instance globale du bus d'événements
+event_bus = SimulationEventBus()
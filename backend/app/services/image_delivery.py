@@ -0,0 +1,219 @@
+"""
+Livraison des images (originales, générées, déclinaisons)
+ETag fort calculé sur le contenu, réponses 304, plages d'octets et
+délégation de l'envoi à nginx (X-Accel-Redirect) : une fois l'accès
+vérifié, Python n'a plus à lire ni à transmettre les octets
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+# Image épinglée par `?v=<empreinte>` : son contenu ne peut plus changer
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Sinon, revalidation à chaque usage (304 si l'ETag n'a pas changé)
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ETagCache:
+    """
+    Empreintes SHA-256 des fichiers servis
+
+    Un fichier n'est haché qu'une fois tant que sa taille et sa date de
+    modification ne changent pas.
+    """
+
+    def __init__(self, max_items: Optional[int] = None):
+        self.max_items = max_items or settings.image_etag_cache_items
+        self._items: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, path: Path) -> str:
+        """
+        Empreinte du contenu d'un fichier (appel bloquant en cas d'absence du cache)
+
+        Raises:
+            OSError: Si le fichier est illisible
+        """
+        stat = path.stat()
+        key = str(path)
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._items.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()[:32]
+
+        with self._lock:
+            self._items[key] = (stat.st_mtime_ns, stat.st_size, digest)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return digest
+
+    def stats(self) -> Dict[str, int]:
+        """Métriques du cache d'empreintes"""
+        with self._lock:
+            return {"items": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """L'en-tête If-None-Match désigne-t-il la version courante ?"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # Comparaison faible (RFC 9110) : W/"x" correspond à "x"
+    return "*" in candidates or etag in [value.removeprefix("W/") for value in candidates]
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Analyser un en-tête Range à plage unique
+
+    Returns:
+        (début, fin incluse), ou None pour servir le fichier complet
+        (absent, invalide, inversé ou plages multiples)
+
+    Raises:
+        ValueError: Si la plage, bien formée, débute au-delà du fichier (416)
+    """
+    if not header:
+        return None
+    match = _RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffixe : les N derniers octets
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError("Plage vide")
+        return max(0, size - length), size - 1
+    first = int(start)
+    if end and int(end) < first:
+        # Plage inversée : syntaxiquement invalide, l'en-tête est ignoré
+        return None
+    if first >= size:
+        raise ValueError("Plage hors du fichier")
+    return first, min(int(end), size - 1) if end else size - 1
+
+
+async def _read_range(path: Path, start: int, length: int):
+    """Lire une plage d'un fichier par blocs"""
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class ImageDelivery:
+    """Réponses HTTP des images après contrôle d'accès"""
+
+    def __init__(self, etags: Optional[ETagCache] = None):
+        self.etags = etags or ETagCache()
+
+    async def respond(
+        self,
+        request: Request,
+        path: Path,
+        media_type: str,
+        root: Optional[Path] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """
+        Servir un fichier image
+
+        Args:
+            request: Requête (If-None-Match, Range, If-Range, `?v=`)
+            path: Fichier à servir (accès déjà vérifié)
+            media_type: Type MIME
+            root: Dossier exposé par nginx sous `image_accel_redirect_prefix`
+            headers: En-têtes supplémentaires (Vary...)
+
+        Returns:
+            304, 206, 416 ou 200 (octets envoyés par nginx si X-Accel-Redirect est configuré)
+        """
+        digest = await run_in_threadpool(self.etags.digest, path)
+        etag = f'"{digest}"'
+        version = request.query_params.get("v")
+        response_headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if version == digest else REVALIDATE_CACHE_CONTROL,
+            "Accept-Ranges": "bytes",
+            **(headers or {}),
+        }
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=response_headers)
+
+        accel_path = self._accel_path(path, root or settings.upload_dir)
+        if accel_path is not None:
+            # nginx envoie le fichier (sendfile) et gère lui-même les plages
+            return Response(media_type=media_type, headers={**response_headers, "X-Accel-Redirect": accel_path})
+
+        size = path.stat().st_size
+        if_range = request.headers.get("if-range")
+        try:
+            byte_range = parse_range(request.headers.get("range"), size) if if_range in (None, etag) else None
+        except ValueError:
+            return Response(status_code=416, headers={**response_headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range is None:
+            return FileResponse(path, media_type=media_type, headers=response_headers)
+
+        start, end = byte_range
+        return StreamingResponse(
+            _read_range(path, start, end - start + 1),
+            status_code=206,
+            media_type=media_type,
+            headers={
+                **response_headers,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            }
+        )
+
+    @staticmethod
+    def _accel_path(path: Path, root: Path) -> Optional[str]:
+        """Chemin interne nginx du fichier, ou None si la délégation est désactivée"""
+        prefix = settings.image_accel_redirect_prefix
+        if not prefix:
+            return None
+        try:
+            relative = path.resolve().relative_to(root.resolve())
+        except ValueError:
+            return None
+        return f"{prefix.rstrip('/')}/{relative.as_posix()}"
+
+
+# Instance globale de la livraison d'images
+image_delivery = ImageDelivery()
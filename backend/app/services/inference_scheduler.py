@@ -0,0 +1,133 @@
+"""
+Ordonnancement des inférences sur le device de calcul
+Le nombre d'inférences simultanées est fixé par device (une seule sur CPU,
+où chaque inférence occupe déjà tous les cœurs ; configurable sur GPU) et
+les lots en attente d'un emplacement sont bornés : au-delà, la soumission
+est refusée plutôt que d'accumuler des images décodées en mémoire
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.bounded_executor import BoundedExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFullError(RuntimeError):
+    """Trop d'inférences en attente d'un emplacement de calcul"""
+
+
+class InferenceTimeoutError(TimeoutError):
+    """Génération interrompue : délai maximal d'inférence dépassé"""
+
+
+def inference_deadline(generations: int = 1) -> Optional[float]:
+    """
+    Échéance d'une génération selon `max_inference_time`
+
+    Args:
+        generations: Images produites par l'appel (doses d'une série)
+
+    Returns:
+        Instant limite (time.monotonic()), ou None si le délai est désactivé
+    """
+    if not settings.max_inference_time:
+        return None
+    return time.monotonic() + settings.max_inference_time * max(1, generations)
+
+
+def device_concurrency(device: str) -> int:
+    """Inférences simultanées configurées pour un device"""
+    if device.startswith("cuda"):
+        return max(1, settings.inference_concurrency_cuda)
+    return max(1, settings.inference_concurrency_cpu)
+
+
+class InferenceScheduler(BoundedExecutor):
+    """
+    Exécuteur borné des appels au pipeline
+
+    S'utilise comme un `Executor` (run_in_executor, micro-batching) : chaque
+    soumission occupe un emplacement en attente jusqu'à son démarrage ;
+    quand `max_pending` soumissions attendent déjà, `submit` lève
+    SchedulerFullError. Le réglage des threads torch tient compte du nombre
+    d'inférences simultanées pour ne pas surcharger les cœurs.
+    """
+
+    def __init__(
+        self,
+        device: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        self.device = device or settings.device
+        super().__init__(
+            max_workers=concurrency or device_concurrency(self.device),
+            max_pending=max_pending if max_pending is not None else settings.inference_max_pending,
+            thread_name_prefix="inference"
+        )
+        self.threads: Optional[int] = None
+
+    @property
+    def concurrency(self) -> int:
+        """Inférences simultanées (un thread par emplacement)"""
+        return self.max_workers
+
+    def _full_error(self) -> Exception:
+        return SchedulerFullError(f"{self.pending} inférence(s) déjà en attente sur {self.device}")
+
+    def configure_threads(self, processes: int = 1, threads: Optional[int] = None) -> Optional[int]:
+        """
+        Régler les threads de calcul torch (CPU uniquement)
+
+        Sans valeur explicite (argument ou `torch_num_threads`), les cœurs
+        sont partagés entre les processus et les inférences simultanées.
+
+        Args:
+            processes: Processus de génération sur la machine
+            threads: Threads intra-op imposés
+
+        Returns:
+            Threads intra-op appliqués, ou None (GPU)
+        """
+        if self.device.startswith("cuda"):
+            return None
+
+        import torch
+
+        from app.services.prefork import cpu_share
+
+        self.threads = threads or settings.torch_num_threads or cpu_share(processes * self.concurrency)
+        torch.set_num_threads(self.threads)
+        if settings.torch_interop_threads:
+            try:
+                torch.set_num_interop_threads(settings.torch_interop_threads)
+            except RuntimeError:
+                # Non modifiable après le premier calcul parallèle du processus
+                logger.warning("Threads inter-op torch déjà initialisés, réglage ignoré")
+        logger.info(f"Threads torch: {self.threads} par inférence, {self.concurrency} inférence(s) simultanée(s)")
+        return self.threads
+
+    def reset(self) -> None:
+        """Repartir d'un pool neuf (processus créé par fork : les threads du parent n'existent plus)"""
+        self._executor = None
+        with self._lock:
+            self._reset_counters()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques de l'ordonnanceur (emplacements, file, temps d'attente et de calcul)"""
+        with self._lock:
+            return {
+                "device": self.device,
+                "concurrency": self.concurrency,
+                "torch_threads": self.threads,
+                "max_pending": self.max_pending,
+                **self._queue_stats()
+            }
+
+
+# Instance globale de l'ordonnanceur d'inférences
+inference_scheduler = InferenceScheduler()
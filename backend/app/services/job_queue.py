@@ -0,0 +1,348 @@
+"""
+File de travaux persistante pour les simulations
+Remplace les tâches asyncio "fire-and-forget" par une file stockée en base
+avec réservation par bail, reprises et récupération après crash
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+import logging
+import math
+
+from sqlalchemy import and_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Simulation, SimulationJob
+from app.services.events import event_bus, simulation_event
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    File de travaux adossée à la base SQLAlchemy (SQLite/PostgreSQL)
+
+    La réservation d'un travail se fait par un UPDATE conditionnel sur le
+    statut : un seul worker peut passer un travail de "queued" à "running",
+    ce qui fonctionne sans verrou explicite sur les deux moteurs.
+    """
+
+    def __init__(
+        self,
+        lease_seconds: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None
+    ):
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.max_attempts = max_attempts or settings.job_max_attempts
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.job_retry_backoff
+
+    def enqueue(
+        self,
+        db: Session,
+        simulation_id: int,
+        payload: Optional[Dict[str, Any]] = None,
+        kind: str = "simulation",
+        commit: bool = True
+    ) -> SimulationJob:
+        """
+        Ajouter un travail dans la file
+
+        Args:
+            db: Session de base de données
+            simulation_id: ID de la simulation à générer
+            payload: Paramètres du travail
+            kind: Type de travail
+            commit: Valider la transaction immédiatement
+
+        Returns:
+            Travail créé
+        """
+        now = datetime.utcnow()
+        job = SimulationJob(
+            simulation_id=simulation_id,
+            kind=kind,
+            status="queued",
+            max_attempts=self.max_attempts,
+            available_at=now,
+            created_at=now,
+            updated_at=now
+        )
+        job.set_payload(payload or {})
+        db.add(job)
+
+        if commit:
+            db.commit()
+            db.refresh(job)
+        else:
+            db.flush()
+
+        return job
+
+    def claim(self, db: Session, worker_id: str, candidates: int = 5) -> Optional[SimulationJob]:
+        """
+        Réserver le prochain travail disponible
+
+        Args:
+            db: Session de base de données
+            worker_id: Identifiant du worker
+            candidates: Nombre de travaux candidats examinés
+
+        Returns:
+            Travail réservé ou None si la file est vide
+        """
+        now = datetime.utcnow()
+        candidate_ids = [
+            row[0] for row in db.query(SimulationJob.id).filter(
+                SimulationJob.status == "queued",
+                SimulationJob.available_at <= now
+            ).order_by(SimulationJob.available_at, SimulationJob.id).limit(candidates).all()
+        ]
+
+        for job_id in candidate_ids:
+            result = db.execute(
+                update(SimulationJob)
+                .where(and_(SimulationJob.id == job_id, SimulationJob.status == "queued"))
+                .values(
+                    status="running",
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=SimulationJob.attempts + 1,
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+            if result.rowcount == 1:
+                job = db.get(SimulationJob, job_id)
+                db.refresh(job)
+                logger.info(f"Travail {job_id} réservé par {worker_id} (tentative {job.attempts})")
+                return job
+
+        return None
+
+    def heartbeat(self, db: Session, job_id: int, worker_id: str) -> bool:
+        """
+        Prolonger le bail d'un travail en cours
+
+        Returns:
+            True si le bail est toujours détenu par ce worker
+        """
+        now = datetime.utcnow()
+        result = db.execute(
+            update(SimulationJob)
+            .where(and_(
+                SimulationJob.id == job_id,
+                SimulationJob.status == "running",
+                SimulationJob.lease_owner == worker_id
+            ))
+            .values(
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def complete(self, db: Session, job: SimulationJob, worker_id: str) -> bool:
+        """
+        Marquer un travail comme terminé
+
+        Returns:
+            True si le travail était encore détenu par ce worker
+        """
+        now = datetime.utcnow()
+        result = db.execute(
+            update(SimulationJob)
+            .where(and_(
+                SimulationJob.id == job.id,
+                SimulationJob.status == "running",
+                SimulationJob.lease_owner == worker_id
+            ))
+            .values(
+                status="completed",
+                lease_owner=None,
+                lease_expires_at=None,
+                updated_at=now,
+                completed_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def fail(self, db: Session, job: SimulationJob, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Enregistrer l'échec d'une tentative
+
+        Le travail est remis en file avec un délai exponentiel tant que le
+        nombre maximal de tentatives n'est pas atteint ; au-delà, le travail
+        et la simulation associée sont marqués comme échoués.
+
+        Args:
+            db: Session de base de données
+            job: Travail réservé
+            worker_id: Identifiant du worker
+            error: Cause de l'échec (reportée sur la simulation si définitif)
+            retry: False pour un échec définitif sans nouvel essai (délai dépassé)
+
+        Returns:
+            True si l'échec est définitif
+        """
+        now = datetime.utcnow()
+        db.refresh(job)
+        if job.status != "running" or job.lease_owner != worker_id:
+            # Le bail a été perdu entre-temps, un autre worker a repris le travail
+            return False
+
+        terminal = not retry or job.attempts >= job.max_attempts
+        failed_simulations: List[Simulation] = []
+        job.last_error = error
+        job.lease_owner = None
+        job.lease_expires_at = None
+        job.updated_at = now
+
+        if terminal:
+            job.status = "failed"
+            job.completed_at = now
+            failed_simulations = self._mark_simulation_failed(db, job)
+            logger.error(f"Travail {job.id} définitivement échoué: {error}")
+        else:
+            delay = self.retry_backoff * (2 ** max(job.attempts - 1, 0))
+            job.status = "queued"
+            job.available_at = now + timedelta(seconds=delay)
+            logger.warning(
+                f"Travail {job.id} échoué (tentative {job.attempts}/{job.max_attempts}), "
+                f"nouvel essai dans {delay:.0f}s: {error}"
+            )
+
+        db.commit()
+        self._publish(failed_simulations)
+        return terminal
+
+    def recover_expired(self, db: Session) -> int:
+        """
+        Récupérer les travaux dont le bail a expiré (worker arrêté ou planté)
+
+        Chaque reprise est un UPDATE conditionnel sur le bail expiré, comme
+        la réservation : un worker qui prolonge son bail entre la sélection
+        et la reprise garde son travail.
+
+        Returns:
+            Nombre de travaux récupérés
+        """
+        now = datetime.utcnow()
+        expired = db.query(
+            SimulationJob.id, SimulationJob.lease_owner, SimulationJob.attempts, SimulationJob.max_attempts
+        ).filter(
+            SimulationJob.status == "running",
+            SimulationJob.lease_expires_at < now
+        ).all()
+
+        recovered = 0
+        failed_simulations: List[Simulation] = []
+        for job_id, lease_owner, attempts, max_attempts in expired:
+            terminal = attempts >= max_attempts
+            values = {
+                "last_error": f"Bail expiré (worker {lease_owner})",
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "updated_at": now
+            }
+            if terminal:
+                values.update(status="failed", completed_at=now)
+            else:
+                values.update(status="queued", available_at=now)
+
+            result = db.execute(
+                update(SimulationJob)
+                .where(and_(
+                    SimulationJob.id == job_id,
+                    SimulationJob.status == "running",
+                    SimulationJob.lease_expires_at < now
+                ))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                # Bail prolongé entre-temps : le travail reste à son worker
+                continue
+
+            recovered += 1
+            if terminal:
+                job = db.get(SimulationJob, job_id)
+                db.refresh(job)
+                failed_simulations.extend(self._mark_simulation_failed(db, job))
+            db.commit()
+
+        if recovered:
+            self._publish(failed_simulations)
+            logger.warning(f"{recovered} travail(x) récupéré(s) après expiration du bail")
+
+        return recovered
+
+    def queue_depth(self, db: Session) -> Dict[str, int]:
+        """Compter les travaux en attente et en cours"""
+        queued = db.query(SimulationJob).filter(SimulationJob.status == "queued").count()
+        running = db.query(SimulationJob).filter(SimulationJob.status == "running").count()
+        return {"queued": queued, "running": running}
+
+    def admission_delay(self, db: Session, max_queued: Optional[int] = None) -> Optional[int]:
+        """
+        Contrôle d'admission d'un nouveau travail
+
+        Au-delà de `max_queued` travaux en attente, le délai avant qu'une
+        place se libère est estimé à partir de la durée des dernières
+        générations et du nombre d'emplacements des workers.
+
+        Args:
+            db: Session de base de données
+            max_queued: Travaux en attente tolérés (settings.max_queued_jobs par défaut, 0 = illimité)
+
+        Returns:
+            None si le travail est accepté, sinon délai conseillé en secondes (Retry-After)
+        """
+        max_queued = settings.max_queued_jobs if max_queued is None else max_queued
+        if not max_queued:
+            return None
+        queued = db.query(SimulationJob.id).filter(SimulationJob.status == "queued").count()
+        if queued < max_queued:
+            return None
+
+        durations = [
+            row[0] for row in db.query(Simulation.generation_time).filter(
+                Simulation.status == "completed",
+                Simulation.generation_time.isnot(None)
+            ).order_by(Simulation.id.desc()).limit(20).all()
+        ]
+        average = sum(durations) / len(durations) if durations else float(settings.max_inference_time)
+        slots = max(1, settings.worker_processes * settings.worker_concurrency)
+        delay = math.ceil((queued - max_queued + 1) * average / slots)
+        return min(max(delay, 1), 3600)
+
+    def _mark_simulation_failed(self, db: Session, job: SimulationJob) -> List[Simulation]:
+        """
+        Marquer la ou les simulations associées comme échouées
+
+        Returns:
+            Simulations passées en échec
+        """
+        simulation_ids = set(job.get_payload().get("simulation_ids", [])) | {job.simulation_id}
+        simulations = db.query(Simulation).filter(Simulation.id.in_(simulation_ids)).all()
+        failed = [simulation for simulation in simulations if simulation.status != "completed"]
+        for simulation in failed:
+            simulation.mark_failed(job.last_error)
+        return failed
+
+    @staticmethod
+    def _publish(simulations: List[Simulation]) -> None:
+        """Notifier les clients connectés des changements de statut"""
+        for simulation in simulations:
+            event_bus.publish(simulation.user_id, simulation_event(simulation))
+
+
+# Instance globale de la file de travaux
+job_queue = JobQueue()
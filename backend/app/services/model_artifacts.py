@@ -0,0 +1,184 @@
+"""
+Cache des artefacts de modèles (poids convertis, format safetensors)
+Le premier démarrage résout les poids, applique la conversion de précision
+puis enregistre le pipeline complet sous `models_dir/artifacts` ; les
+démarrages suivants relisent ces fichiers par mmap au lieu de tout
+désérialiser à nouveau
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Version du format des artefacts (incluse dans la clé)
+ARTIFACT_FORMAT = "safetensors-v1"
+MANIFEST_NAME = "manifest.json"
+
+
+class ModelArtifactCache:
+    """
+    Artefacts de pipelines indexés par une clé de configuration
+
+    Chaque entrée est un dossier `save_pretrained` (un sous-dossier par
+    composant, poids en .safetensors) accompagné d'un manifeste listant
+    les fichiers et leur taille. Le manifeste est écrit en dernier et le
+    dossier publié par renommage : une entrée sans manifeste valide est
+    ignorée (écriture interrompue).
+    """
+
+    def __init__(self, directory: Optional[Path] = None, keep: Optional[int] = None):
+        self.directory = Path(directory or settings.models_dir / "artifacts")
+        self.keep = keep if keep is not None else settings.model_artifact_keep
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def make_key(spec: Dict[str, Any]) -> str:
+        """
+        Clé d'un artefact
+
+        Args:
+            spec: Modèles, précision et versions des bibliothèques
+
+        Returns:
+            Clé hexadécimale (16 caractères)
+        """
+        payload = json.dumps({**spec, "format": ARTIFACT_FORMAT}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def path_for(self, spec: Dict[str, Any]) -> Path:
+        """Dossier de l'artefact d'une configuration"""
+        return self.directory / self.make_key(spec)
+
+    def lookup(self, spec: Dict[str, Any]) -> Optional[Path]:
+        """
+        Trouver un artefact complet
+
+        Returns:
+            Dossier à passer à `from_pretrained`, ou None
+        """
+        path = self.path_for(spec)
+        manifest = self.read_manifest(path)
+        valid = manifest is not None and manifest.get("spec") == spec and self._files_match(path, manifest)
+        with self._lock:
+            if valid:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if manifest is not None and not valid:
+            logger.warning(f"Artefact de modèle incomplet ou obsolète ignoré: {path.name}")
+        return path if valid else None
+
+    def store(self, spec: Dict[str, Any], pipeline: Any, source_load_seconds: Optional[float] = None) -> Path:
+        """
+        Enregistrer un pipeline chargé (poids déjà convertis)
+
+        Args:
+            spec: Configuration de l'artefact
+            pipeline: Pipeline exposant `save_pretrained`
+            source_load_seconds: Durée du chargement d'origine (information)
+
+        Returns:
+            Dossier de l'artefact publié
+        """
+        path = self.path_for(spec)
+        tmp_path = self.directory / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        tmp_path.mkdir(parents=True)
+        try:
+            started = time.perf_counter()
+            pipeline.save_pretrained(tmp_path, safe_serialization=True)
+            manifest = {
+                "spec": spec,
+                "format": ARTIFACT_FORMAT,
+                "created_at": datetime.now().isoformat(),
+                "source_load_seconds": source_load_seconds,
+                "save_seconds": round(time.perf_counter() - started, 3),
+                "files": {
+                    file.relative_to(tmp_path).as_posix(): file.stat().st_size
+                    for file in sorted(tmp_path.rglob("*")) if file.is_file()
+                },
+            }
+            (tmp_path / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+            # Publication atomique (remplace une entrée invalide de même clé)
+            if path.exists():
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self.stores += 1
+        logger.info(f"Artefact de modèle enregistré: {path} ({self._size_mb(manifest):.0f} Mo)")
+        self.prune()
+        return path
+
+    def prune(self) -> None:
+        """Ne garder que les artefacts les plus récents (`keep`)"""
+        entries = []
+        for path in self.directory.iterdir() if self.directory.exists() else []:
+            if not path.is_dir():
+                continue
+            if path.name.startswith("."):
+                # Écriture interrompue d'un démarrage précédent
+                if time.time() - path.stat().st_mtime > 3600:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            manifest = self.read_manifest(path)
+            entries.append((manifest.get("created_at", "") if manifest else "", path))
+
+        for _, path in sorted(entries, reverse=True)[self.keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"Artefact de modèle supprimé: {path.name}")
+
+    @staticmethod
+    def read_manifest(path: Path) -> Optional[Dict[str, Any]]:
+        """Lire le manifeste d'une entrée (None si absent ou illisible)"""
+        try:
+            return json.loads((path / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _files_match(path: Path, manifest: Dict[str, Any]) -> bool:
+        """Les fichiers listés existent-ils avec la taille attendue ?"""
+        try:
+            return all(
+                (path / name).stat().st_size == size
+                for name, size in manifest.get("files", {}).items()
+            ) and bool(manifest.get("files"))
+        except OSError:
+            return False
+
+    @staticmethod
+    def _size_mb(manifest: Dict[str, Any]) -> float:
+        return sum(manifest["files"].values()) / (1024 * 1024)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques du cache d'artefacts"""
+        with self._lock:
+            return {
+                "enabled": settings.model_artifact_cache,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+            }
+
+
+# Instance globale du cache d'artefacts de modèles
+model_artifacts = ModelArtifactCache()
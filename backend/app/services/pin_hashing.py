@@ -0,0 +1,126 @@
+"""
+Hachage et vérification des PINs hors de la boucle d'événements
+bcrypt coûte plusieurs centaines de millisecondes par appel : les calculs
+sont exécutés dans un pool de threads borné (bcrypt libère le GIL) pour ne
+pas bloquer les autres requêtes (flux SSE, uploads...)
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.services.bounded_executor import BoundedExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class PinHasher(BoundedExecutor):
+    """
+    Pool d'exécution des calculs bcrypt
+
+    Le nombre de calculs simultanés est borné par la taille du pool et le
+    nombre de demandes en attente par `max_pending` : au-delà, la demande
+    est refusée (503) plutôt que d'allonger indéfiniment la file. Le coût
+    bcrypt est configurable ; les hashs d'un autre coût sont signalés pour
+    être recalculés à la prochaine connexion réussie.
+    """
+
+    def __init__(
+        self,
+        rounds: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        super().__init__(
+            max_workers=max_workers or settings.auth_hash_workers,
+            max_pending=max_pending if max_pending is not None else settings.auth_hash_max_pending,
+            thread_name_prefix="pin-hash"
+        )
+        self.rounds = rounds or settings.bcrypt_rounds
+
+        # min = max = coût configuré : tout hash d'un autre coût doit être recalculé
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=self.rounds,
+            bcrypt__min_rounds=self.rounds,
+            bcrypt__max_rounds=self.rounds
+        )
+
+    def _reset_counters(self) -> None:
+        super()._reset_counters()
+        self.rehashed = 0
+
+    def _full_error(self) -> Exception:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service d'authentification surchargé, réessayez",
+            headers={"Retry-After": "1"}
+        )
+
+    def hash_sync(self, pin: str) -> str:
+        """Hacher un PIN (appel bloquant)"""
+        return self.context.hash(pin)
+
+    def verify_sync(self, pin: str, hashed_pin: str) -> Tuple[bool, Optional[str]]:
+        """
+        Vérifier un PIN et recalculer son hash si le coût a changé (appel bloquant)
+
+        Returns:
+            (PIN valide, nouveau hash à enregistrer ou None)
+        """
+        try:
+            return self.context.verify_and_update(pin, hashed_pin)
+        except (ValueError, TypeError):
+            # Hash absent ou illisible
+            return False, None
+
+    async def hash(self, pin: str) -> str:
+        """Hacher un PIN dans le pool"""
+        return await self._run(self.hash_sync, pin)
+
+    async def verify(self, pin: str, hashed_pin: str) -> Tuple[bool, Optional[str]]:
+        """
+        Vérifier un PIN dans le pool
+
+        Args:
+            pin: PIN en clair
+            hashed_pin: Hash enregistré
+
+        Returns:
+            (PIN valide, nouveau hash à enregistrer ou None)
+
+        Raises:
+            HTTPException: 503 si trop de calculs sont déjà en attente
+        """
+        valid, new_hash = await self._run(self.verify_sync, pin, hashed_pin)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    async def _run(self, function: Callable[..., Any], *args) -> Any:
+        """Exécuter un calcul dans le pool (503 si la file d'attente est pleine)"""
+        return await asyncio.get_running_loop().run_in_executor(self, function, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques du pool (file d'attente, temps d'attente et de calcul)"""
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.max_workers,
+                "rehashed": self.rehashed,
+                **self._queue_stats()
+            }
+
+    def shutdown(self, wait: bool = False, **kwargs) -> None:
+        """Arrêter le pool (sans attendre les calculs en cours par défaut)"""
+        super().shutdown(wait=wait)
+
+
+# Instance globale du pool de hachage des PINs
+pin_hasher = PinHasher()
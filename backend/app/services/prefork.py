@@ -0,0 +1,111 @@
+"""
+Processus préforkés partageant les poids des modèles
+Le parent charge les modèles une seule fois puis crée les workers par
+fork : les pages des tenseurs restent partagées en copie sur écriture
+tant que personne ne les modifie (inférence seule, gradients désactivés).
+Chaque worker supplémentaire ne coûte que sa mémoire propre (activations,
+tas Python), pas une copie des poids
+"""
+
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def freeze_shared_state() -> None:
+    """
+    Préparer le parent au fork
+
+    Les objets existants passent dans la génération permanente du GC
+    (`gc.freeze`) : les collectes des workers ne les parcourent plus et
+    n'écrivent donc plus dans leurs en-têtes, ce qui dupliquerait les pages.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def cpu_share(processes: int) -> int:
+    """Threads de calcul par worker pour ne pas surcharger les cœurs"""
+    return max(1, (os.cpu_count() or 1) // max(1, processes))
+
+
+class PreforkSupervisor:
+    """
+    Superviseur de processus créés par fork
+
+    Les processus terminés anormalement sont relancés depuis le parent,
+    qui détient toujours les poids : un redémarrage ne recharge rien.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        target: Callable[[int], None],
+        respawn: bool = True,
+        respawn_delay: float = 1.0
+    ):
+        self.processes = max(1, processes)
+        self.target = target
+        self.respawn = respawn
+        self.respawn_delay = respawn_delay
+        self._context = multiprocessing.get_context("fork")
+        self._children: Dict[int, multiprocessing.Process] = {}
+        self._stopping = False
+        self.restarts = 0
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(target=self.target, args=(index,), name=f"worker-{index}", daemon=False)
+        process.start()
+        self._children[index] = process
+        logger.info(f"Worker préforké {index} démarré (pid {process.pid})")
+
+    def start(self) -> None:
+        """Créer tous les processus"""
+        for index in range(self.processes):
+            self._spawn(index)
+
+    @property
+    def pids(self) -> List[int]:
+        return [process.pid for process in self._children.values() if process.pid is not None]
+
+    def stop(self, *_) -> None:
+        """Demander l'arrêt des processus (SIGTERM) sans relance"""
+        self._stopping = True
+        for process in self._children.values():
+            if process.is_alive():
+                process.terminate()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Attendre la fin des processus, en relançant ceux qui échouent
+
+        Args:
+            timeout: Durée maximale (None = jusqu'à l'arrêt)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._children:
+            for index, process in list(self._children.items()):
+                process.join(0.2)
+                if process.is_alive():
+                    continue
+                del self._children[index]
+                if process.exitcode != 0 and self.respawn and not self._stopping:
+                    logger.warning(f"Worker préforké {index} arrêté (code {process.exitcode}), relance")
+                    self.restarts += 1
+                    time.sleep(self.respawn_delay)
+                    self._spawn(index)
+            if deadline is not None and time.monotonic() > deadline:
+                return
+
+    def run(self) -> None:
+        """Démarrer, relayer SIGTERM/SIGINT aux processus et attendre leur fin"""
+        self.start()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.wait()
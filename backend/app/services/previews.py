@@ -0,0 +1,104 @@
+"""
+Aperçus progressifs pendant la génération
+Convertit les latents intermédiaires du pipeline en images basse résolution
+sans passer par le VAE (approximation linéaire, quelques millisecondes)
+
+torch n'est importé qu'à la première conversion (appelée pendant l'inférence)
+"""
+
+import logging
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from PIL import Image
+
+if TYPE_CHECKING:
+    import torch
+
+logger = logging.getLogger(__name__)
+
+# Projection linéaire des 4 canaux latents de Stable Diffusion 1.x vers RVB
+LATENT_RGB_FACTORS = [
+    [0.3512, 0.2297, 0.3227],
+    [0.3250, 0.4974, 0.2350],
+    [-0.2829, 0.1762, 0.2721],
+    [-0.2120, -0.2616, -0.7177],
+]
+
+# Signature des fonctions de suivi: (étape terminée, nombre d'étapes, aperçu ou None)
+ProgressCallback = Callable[[int, int, Optional[Image.Image]], None]
+
+
+def latents_to_previews(latents: "torch.Tensor", size: Optional[int] = None) -> List[Image.Image]:
+    """
+    Convertir un lot de latents en aperçus RVB
+
+    Args:
+        latents: Tenseur (B, 4, H/8, W/8)
+        size: Côté maximal des aperçus (taille latente si absent)
+
+    Returns:
+        Une image par élément du lot
+    """
+    import numpy as np
+    import torch
+
+    rgb = torch.einsum("bchw,cr->bhwr", latents.detach().float().cpu(), torch.tensor(LATENT_RGB_FACTORS))
+    pixels = ((rgb + 1) * 127.5).clamp(0, 255).to(torch.uint8).numpy()
+
+    previews = []
+    for array in pixels:
+        preview = Image.fromarray(np.ascontiguousarray(array), "RGB")
+        if size and max(preview.size) < size:
+            ratio = size / max(preview.size)
+            preview = preview.resize(
+                (int(preview.width * ratio), int(preview.height * ratio)),
+                Image.Resampling.BILINEAR
+            )
+        previews.append(preview)
+    return previews
+
+
+def make_step_callback(
+    callbacks: List[Optional[ProgressCallback]],
+    total_steps: int,
+    preview_every: int,
+    preview_size: Optional[int] = None
+) -> Callable[..., Dict[str, Any]]:
+    """
+    Construire le callback `callback_on_step_end` d'un appel du pipeline
+
+    Chaque élément du lot a son propre suivi ; l'avancement est publié à
+    chaque étape et un aperçu toutes les `preview_every` étapes.
+
+    Args:
+        callbacks: Suivi par élément du lot (None si non suivi)
+        total_steps: Nombre d'étapes de diffusion
+        preview_every: Intervalle entre deux aperçus (0 = jamais)
+        preview_size: Côté maximal des aperçus
+
+    Returns:
+        Callback compatible diffusers
+    """
+    def on_step_end(pipeline, step: int, timestep, callback_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        done = step + 1
+        previews: List[Optional[Image.Image]] = [None] * len(callbacks)
+        latents = callback_kwargs.get("latents")
+
+        if latents is not None and preview_every and (done % preview_every == 0) and done < total_steps:
+            try:
+                previews = latents_to_previews(latents[:len(callbacks)], preview_size)
+            except Exception as e:
+                logger.warning(f"Aperçu impossible à l'étape {done}: {e}")
+
+        for callback, preview in zip(callbacks, previews):
+            if callback is None:
+                continue
+            try:
+                callback(done, total_steps, preview)
+            except Exception as e:
+                # Le suivi ne doit jamais interrompre la génération
+                logger.warning(f"Erreur lors de la publication de l'avancement: {e}")
+
+        return callback_kwargs
+
+    return on_step_end
@@ -0,0 +1,142 @@
+"""
+Cache des utilisateurs authentifiés
+Évite la requête `SELECT users` à chaque appel authentifié (interrogation
+du statut des simulations, listes...) en mémorisant, par token, un
+instantané de l'utilisateur actif
+"""
+
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional, Set, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """
+    Cache TTL/LRU des utilisateurs authentifiés, indexé par token
+
+    Un instantané des colonnes de l'utilisateur est conservé jusqu'à la
+    plus proche des deux échéances : durée de vie du cache ou expiration
+    du token. Toute modification de l'utilisateur (désactivation,
+    changement de PIN...) invalide ses entrées via les événements
+    SQLAlchemy ; la durée de vie borne le délai entre processus.
+    L'invalidation parcourt le cache (borné) plutôt que de tenir un index
+    par utilisateur, qui survivrait aux entrées expirées ou évincées.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_items: Optional[int] = None):
+        self.ttl_seconds = settings.auth_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.entries = LRUCache(
+            max_items=max_items or settings.auth_cache_max_items,
+            ttl=self.ttl_seconds
+        )
+        self._registered: Set[Type] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def _key(model: Type, token: str):
+        return (model.__module__, model.__name__, hashlib.sha256(token.encode("utf-8")).hexdigest())
+
+    def lookup(self, token: str, db: Session, model: Type) -> Optional[Any]:
+        """
+        Obtenir l'utilisateur mis en cache pour un token
+
+        L'instance retournée est rattachée à la session sans requête
+        (merge sans chargement) : les routes peuvent la modifier normalement.
+
+        Args:
+            token: Token JWT brut
+            db: Session de la requête
+            model: Classe du modèle utilisateur
+
+        Returns:
+            Utilisateur ou None si absent du cache
+        """
+        if not self.enabled:
+            return None
+
+        snapshot = self.entries.get(self._key(model, token))
+        if snapshot is None:
+            return None
+
+        user = model(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def store(self, token: str, user: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Mettre en cache l'utilisateur associé à un token
+
+        Args:
+            token: Token JWT brut
+            user: Utilisateur actif chargé depuis la base
+            expires_at: Expiration du token (timestamp Unix)
+        """
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_seconds
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+
+        model = type(user)
+        snapshot = {
+            column.key: getattr(user, column.key)
+            for column in inspect(model).column_attrs
+        }
+        self.entries.put(self._key(model, token), snapshot, ttl=ttl)
+
+    def invalidate_user(self, model: Type, user_id: Any) -> None:
+        """Retirer toutes les entrées d'un utilisateur (désactivation, PIN modifié...)"""
+        prefix = (model.__module__, model.__name__)
+        removed = self.entries.pop_where(
+            lambda key, snapshot: key[:2] == prefix and snapshot["id"] == user_id
+        )
+        if removed:
+            logger.debug(f"Cache d'authentification invalidé pour l'utilisateur {user_id}")
+
+    def invalidate_token(self, model: Type, token: str) -> None:
+        """Retirer l'entrée d'un token (déconnexion)"""
+        self.entries.pop(self._key(model, token))
+
+    def clear(self) -> None:
+        """Vider le cache"""
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (taux de succès...)"""
+        return {"enabled": self.enabled, **self.entries.stats()}
+
+    def register_model(self, model: Type) -> None:
+        """
+        Brancher l'invalidation automatique sur un modèle utilisateur
+
+        Args:
+            model: Classe du modèle utilisateur
+        """
+        if model in self._registered:
+            return
+        self._registered.add(model)
+
+        def invalidate(mapper, connection, target) -> None:
+            self.invalidate_user(model, target.id)
+
+        event.listen(model, "after_update", invalidate)
+        event.listen(model, "after_delete", invalidate)
+
+
+# Instance globale du cache des utilisateurs authentifiés
+principal_cache = PrincipalCache()
@@ -0,0 +1,137 @@
+"""
+Déclinaisons des images de simulation (miniature, moyenne, pleine taille)
+Les listes n'ont besoin que de miniatures : chaque image est déclinée une
+fois, après la génération, en WebP et en JPEG, et servie selon `?size=`
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageOps, features
+
+from app.core.config import settings
+from app.utils import ImageProcessor
+
+FULL_SIZE = "full"
+
+# Formats produits, du préféré au plus compatible
+RENDITION_FORMATS = ("webp", "jpeg") if features.check("webp") else ("jpeg",)
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+# {taille: {format: chemin}}
+Renditions = Dict[str, Dict[str, str]]
+
+
+def rendition_sizes() -> Iterable[str]:
+    """Tailles disponibles, de la plus petite à la pleine taille"""
+    return [*sorted(settings.rendition_sizes, key=settings.rendition_sizes.get), FULL_SIZE]
+
+
+def rendition_path(source_path: Path, size: str, image_format: str) -> Path:
+    """Chemin d'une déclinaison, à côté de l'image source"""
+    extension = "jpg" if image_format == "jpeg" else image_format
+    return source_path.with_name(f"{source_path.stem}_{size}.{extension}")
+
+
+def _save(image: Image.Image, path: Path, image_format: str) -> None:
+    """Écrire une déclinaison de façon atomique"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    if image_format == "webp":
+        image.save(tmp_path, "WEBP", quality=settings.rendition_webp_quality, method=4)
+    else:
+        image.save(tmp_path, "JPEG", quality=settings.rendition_jpeg_quality, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def create_renditions(image: Image.Image, source_path: Path) -> Renditions:
+    """
+    Décliner une image en toutes tailles et tous formats
+
+    Les fichiers déjà présents sont réutilisés (image originale partagée par
+    une série de doses). Une source JPEG sert directement de déclinaison
+    pleine taille JPEG.
+
+    Args:
+        image: Image à décliner (RGB)
+        source_path: Fichier de l'image, qui donne le nom des déclinaisons
+
+    Returns:
+        Chemins par taille et par format
+    """
+    renditions: Renditions = {}
+    for size in rendition_sizes():
+        if size == FULL_SIZE:
+            scaled = image
+        else:
+            edge = settings.rendition_sizes[size]
+            scaled = ImageProcessor.create_thumbnail(image, (edge, edge))
+
+        renditions[size] = {}
+        for image_format in RENDITION_FORMATS:
+            if size == FULL_SIZE and image_format == "jpeg" and source_path.suffix.lower() in (".jpg", ".jpeg"):
+                renditions[size][image_format] = str(source_path)
+                continue
+            path = rendition_path(source_path, size, image_format)
+            if not path.exists():
+                _save(scaled, path, image_format)
+            renditions[size][image_format] = str(path)
+    return renditions
+
+
+def create_file_renditions(source_path: Path) -> Renditions:
+    """
+    Décliner une image enregistrée (orientation EXIF appliquée)
+
+    Args:
+        source_path: Fichier image
+
+    Returns:
+        Chemins par taille et par format
+    """
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        return create_renditions(image, source_path)
+
+
+def select_rendition(
+    renditions: Renditions,
+    size: str,
+    accept: Optional[str] = None,
+    image_format: Optional[str] = None
+) -> Optional[Tuple[Path, str]]:
+    """
+    Choisir la déclinaison à servir
+
+    Args:
+        renditions: Déclinaisons d'une image
+        size: Taille demandée
+        accept: En-tête Accept du client (WebP si accepté)
+        image_format: Format imposé (prioritaire sur Accept)
+
+    Returns:
+        (chemin, type MIME) ou None si la déclinaison n'existe pas
+    """
+    available = renditions.get(size, {})
+    if image_format:
+        candidates = [image_format]
+    elif accept and "image/webp" in accept:
+        candidates = list(RENDITION_FORMATS)
+    else:
+        candidates = ["jpeg"]
+
+    for candidate in candidates:
+        path = available.get(candidate)
+        if path and Path(path).exists():
+            return Path(path), MEDIA_TYPES[candidate]
+    return None
+
+
+def delete_renditions(renditions: Renditions, keep: Iterable[str] = ()) -> None:
+    """Supprimer les fichiers de déclinaisons (hors chemins conservés)"""
+    kept = set(keep)
+    for formats in renditions.values():
+        for path in formats.values():
+            if path not in kept:
+                Path(path).unlink(missing_ok=True)
@@ -0,0 +1,210 @@
+"""
+Cache des résultats de simulation adressé par contenu
+La génération est déterministe (seed fixe) : une même image source avec
+les mêmes paramètres produit toujours le même résultat
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def _image_nbytes(entry: Tuple[Image.Image, Dict[str, Any]]) -> int:
+    """Estimer la taille mémoire d'une image décodée"""
+    image = entry[0]
+    return image.width * image.height * len(image.getbands())
+
+
+class ResultCache:
+    """
+    Cache à deux niveaux des images générées
+
+    - niveau mémoire : LRU borné en octets, réponses en quelques millisecondes
+    - niveau disque : fichiers PNG sous `cache_dir/results`, éviction des
+      fichiers les moins récemment utilisés au-delà de la taille maximale
+
+    Les clés commencent par le hash de l'image source : les résultats
+    dérivés d'une image de patient peuvent être supprimés avec elle.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        memory_bytes: Optional[int] = None,
+        disk_bytes: Optional[int] = None
+    ):
+        self.directory = Path(directory or settings.cache_dir / "results")
+        self.memory = LRUCache(
+            max_items=1024,
+            max_bytes=memory_bytes if memory_bytes is not None else settings.result_cache_memory_mb * 1024 * 1024,
+            sizeof=_image_nbytes
+        )
+        self.disk_bytes = disk_bytes if disk_bytes is not None else settings.result_cache_disk_mb * 1024 * 1024
+        self.disk_hits = 0
+        self._disk_usage: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Normaliser un prompt (casse et espaces)"""
+        return " ".join(prompt.lower().split())
+
+    def make_key(
+        self,
+        image_hash: str,
+        prompt: str,
+        dose: float,
+        model_version: str,
+        inference_settings: Dict[str, Any]
+    ) -> str:
+        """
+        Construire la clé de cache d'une génération
+
+        Args:
+            image_hash: Hash SHA-256 de l'image source
+            prompt: Prompt de génération
+            dose: Dosage de l'intervention
+            model_version: Modèles utilisés
+            inference_settings: Réglages d'inférence (étapes, guidance, seed...)
+
+        Returns:
+            Clé "<hash source>_<SHA-256 des paramètres>"
+        """
+        material = json.dumps(
+            {
+                "image": image_hash,
+                "prompt": self.normalize_prompt(prompt),
+                "dose": round(float(dose), 4),
+                "model": model_version,
+                "settings": inference_settings
+            },
+            sort_keys=True
+        )
+        return f"{image_hash}_{hashlib.sha256(material.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Tuple[Image.Image, Dict[str, Any]]]:
+        """
+        Obtenir un résultat en cache
+
+        Returns:
+            Tuple (image, métadonnées) ou None
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry[0].copy(), dict(entry[1])
+
+        image_path, meta_path = self._paths(key)
+        if not image_path.exists():
+            return None
+
+        try:
+            with Image.open(image_path) as cached:
+                cached.load()
+                image = cached.copy()
+            metadata = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+            # Marquer le fichier comme récemment utilisé pour l'éviction
+            os.utime(image_path, None)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Entrée de cache illisible {key}: {e}")
+            return None
+
+        self.disk_hits += 1
+        self.memory.put(key, (image.copy(), metadata))
+        return image, dict(metadata)
+
+    def put(self, key: str, image: Image.Image, metadata: Dict[str, Any]) -> None:
+        """Enregistrer un résultat dans les deux niveaux de cache"""
+        metadata = {k: v for k, v in metadata.items() if _is_json_value(v)}
+        self.memory.put(key, (image.copy(), metadata))
+
+        image_path, meta_path = self._paths(key)
+        try:
+            image_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = image_path.with_suffix(".tmp")
+            image.save(tmp_path, "PNG", compress_level=1)
+            os.replace(tmp_path, image_path)
+            meta_path.write_text(json.dumps(metadata), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire l'entrée de cache {key}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_usage is not None:
+                self._disk_usage += image_path.stat().st_size + meta_path.stat().st_size
+        self._enforce_disk_limit()
+
+    def delete_source(self, image_hash: str) -> None:
+        """Supprimer les résultats dérivés d'une image source (mémoire et disque)"""
+        prefix = f"{image_hash}_"
+        self.memory.pop_where(lambda key, entry: key.startswith(prefix))
+        with self._lock:
+            for path in (self.directory / image_hash[:2]).glob(f"{prefix}*"):
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                    if self._disk_usage is not None:
+                        self._disk_usage -= size
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache"""
+        return {
+            "memory": self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "disk_bytes": self._disk_usage
+        }
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        """Chemins de l'image et des métadonnées d'une entrée"""
+        shard = self.directory / key[:2]
+        return shard / f"{key}.png", shard / f"{key}.json"
+
+    def _enforce_disk_limit(self) -> None:
+        """Supprimer les entrées les moins récemment utilisées au-delà de la limite"""
+        with self._lock:
+            if self._disk_usage is None:
+                self._disk_usage = sum(
+                    path.stat().st_size for path in self.directory.rglob("*") if path.is_file()
+                )
+            if self._disk_usage <= self.disk_bytes:
+                return
+
+            images = sorted(
+                self.directory.rglob("*.png"),
+                key=lambda path: path.stat().st_mtime
+            )
+            for image_path in images:
+                if self._disk_usage <= self.disk_bytes:
+                    break
+                for path in (image_path, image_path.with_suffix(".json")):
+                    try:
+                        size = path.stat().st_size
+                        path.unlink()
+                        self._disk_usage -= size
+                    except OSError:
+                        pass
+
+
+def _is_json_value(value: Any) -> bool:
+    """Vérifier qu'une valeur de métadonnées est sérialisable en JSON"""
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+# Instance globale du cache de résultats
+result_cache = ResultCache()
@@ -0,0 +1,163 @@
+"""
+Écrivain unique des mises à jour d'avancement
+Les pipelines de génération publient plusieurs mises à jour par seconde et
+par simulation : elles sont exécutées par un seul thread, qui valide en une
+transaction toutes les écritures en attente (SQLite n'accepte qu'un
+écrivain à la fois)
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Écriture : fonction recevant une session, exécutée sans validation
+WriteOperation = Callable[[Session], Any]
+
+
+class StatusWriter:
+    """
+    File d'écriture servie par un thread dédié
+
+    Les écritures soumises pendant qu'une transaction est en cours sont
+    regroupées dans la suivante (validation groupée) : N simulations en
+    parallèle ne produisent plus N écrivains concurrents, seulement des
+    lots successifs. Si un lot échoue, ses écritures sont rejouées une à
+    une pour isoler la fautive.
+    """
+
+    def __init__(self, max_batch: Optional[int] = None):
+        self.max_batch = max_batch or settings.status_writer_max_batch
+        self._queue: "queue.Queue[Optional[Tuple[Any, WriteOperation, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.total_commit_seconds = 0.0
+
+    def submit(self, bind: Any, operation: WriteOperation) -> Future:
+        """
+        Soumettre une écriture sans attendre
+
+        Args:
+            bind: Engine (ou connexion) cible
+            operation: Fonction recevant la session du lot
+
+        Returns:
+            Future résolu avec le résultat de l'écriture, une fois validée
+        """
+        future: Future = Future()
+        with self._lock:
+            self.submitted += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="status-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((bind, operation, future))
+        return future
+
+    def write(self, bind: Any, operation: WriteOperation, timeout: Optional[float] = None) -> Any:
+        """
+        Soumettre une écriture et attendre sa validation (appel bloquant)
+
+        Raises:
+            Exception: Erreur levée par l'écriture
+        """
+        return self.submit(bind, operation).result(timeout)
+
+    def _run(self) -> None:
+        """Boucle du thread écrivain"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write_batches(batch)
+                    return
+                batch.append(item)
+            self._write_batches(batch)
+
+    def _write_batches(self, batch: List[Tuple[Any, WriteOperation, Future]]) -> None:
+        """Valider un lot, une transaction par base cible"""
+        by_bind: Dict[int, List[Tuple[Any, WriteOperation, Future]]] = {}
+        for item in batch:
+            by_bind.setdefault(id(item[0]), []).append(item)
+
+        for items in by_bind.values():
+            try:
+                self._commit(items)
+            except Exception as e:
+                if len(items) == 1:
+                    self._fail(items[0][2], e)
+                    continue
+                logger.warning(f"Lot de {len(items)} écritures annulé, nouvel essai une par une: {e}")
+                for item in items:
+                    try:
+                        self._commit([item])
+                    except Exception as item_error:
+                        self._fail(item[2], item_error)
+
+    def _commit(self, items: List[Tuple[Any, WriteOperation, Future]]) -> None:
+        """Exécuter des écritures dans une transaction et résoudre leurs futures"""
+        started = time.perf_counter()
+        with Session(bind=items[0][0]) as session:
+            results = [operation(session) for _, operation, _ in items]
+            session.commit()
+
+        with self._lock:
+            self.batches += 1
+            self.written += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+            self.total_commit_seconds += time.perf_counter() - started
+        for (_, _, future), result in zip(items, results):
+            future.set_result(result)
+
+    def _fail(self, future: Future, error: Exception) -> None:
+        with self._lock:
+            self.failed += 1
+        logger.error(f"Écriture d'avancement échouée: {error}")
+        future.set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métriques de la file d'écriture"""
+        with self._lock:
+            batches = self.batches
+            return {
+                "pending": self._queue.qsize(),
+                "submitted": self.submitted,
+                "written": self.written,
+                "failed": self.failed,
+                "batches": batches,
+                "largest_batch": self.largest_batch,
+                "avg_batch": self.written / batches if batches else 0.0,
+                "avg_commit_ms": 1000 * self.total_commit_seconds / batches if batches else 0.0
+            }
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        """Écrire les mises à jour en attente puis arrêter le thread"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+        self._thread = None
+
+
+# Instance globale de l'écrivain des mises à jour d'avancement
+status_writer = StatusWriter()
@@ -0,0 +1,218 @@
+"""
+Comptabilité d'utilisation des abonnements
+Les compteurs mensuels sont incrémentés par upsert atomique à la fin de
+chaque simulation ; les vérifications de quota lisent un cache en mémoire
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, event, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import UsageStats
+from app.utils.cache import LRUCache
+
+# Compteurs incrémentés à chaque simulation terminée
+COUNTERS = ("simulations_count", "storage_used_mb", "ai_processing_time_seconds")
+
+# Dialectes disposant de INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _period(when: Optional[datetime] = None) -> Tuple[int, int]:
+    """(année, mois) d'une date (maintenant par défaut)"""
+    when = when or datetime.utcnow()
+    return when.year, when.month
+
+
+def _empty_usage(year: int, month: int) -> Dict[str, Any]:
+    """Compteurs d'un mois sans activité"""
+    return {"year": year, "month": month, **{counter: 0 for counter in COUNTERS}}
+
+
+class UsageAccounting:
+    """
+    Compteurs d'utilisation mensuels par praticien
+
+    Les incréments sont écrits dans la transaction de la simulation
+    terminée (upsert sur l'index unique utilisateur/année/mois) et reportés
+    dans le cache en mémoire uniquement après validation de la transaction.
+    La durée de vie du cache borne l'écart avec les autres processus.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_items: int = 10000):
+        ttl = settings.usage_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.counters = LRUCache(max_items=max_items, ttl=ttl)
+
+    def record_simulation(
+        self,
+        db: Session,
+        user_id: int,
+        storage_mb: float = 0.0,
+        processing_seconds: float = 0.0,
+        simulations: int = 1,
+        when: Optional[datetime] = None
+    ) -> None:
+        """
+        Comptabiliser une simulation terminée
+
+        L'upsert est exécuté dans la transaction en cours, sans la valider :
+        il est enregistré (ou annulé) avec la mise à jour de la simulation.
+
+        Args:
+            db: Session de base de données
+            user_id: Praticien
+            storage_mb: Stockage consommé par les images générées
+            processing_seconds: Temps de génération
+            simulations: Nombre de simulations terminées
+            when: Date de l'activité (maintenant par défaut)
+        """
+        year, month = _period(when)
+        increments = {
+            "simulations_count": simulations,
+            "storage_used_mb": storage_mb,
+            "ai_processing_time_seconds": processing_seconds
+        }
+
+        insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+        if insert is not None:
+            statement = insert(UsageStats).values(
+                user_id=user_id, year=year, month=month,
+                created_at=datetime.utcnow(), **increments
+            )
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["user_id", "year", "month"],
+                set_={
+                    counter: getattr(UsageStats, counter) + getattr(statement.excluded, counter)
+                    for counter in COUNTERS
+                }
+            ))
+        else:
+            self._update_or_insert(db, user_id, year, month, increments)
+
+        db.info.setdefault("usage_increments", []).append((self, (user_id, year, month), increments))
+
+    @staticmethod
+    def _update_or_insert(db: Session, user_id: int, year: int, month: int, increments: Dict[str, Any]) -> None:
+        """Upsert portable (autres dialectes) : UPDATE incrémental puis INSERT"""
+        increment = update(UsageStats).where(
+            UsageStats.user_id == user_id,
+            UsageStats.year == year,
+            UsageStats.month == month
+        ).values({
+            counter: getattr(UsageStats, counter) + value
+            for counter, value in increments.items()
+        })
+
+        if db.execute(increment).rowcount:
+            return
+        try:
+            with db.begin_nested():
+                db.add(UsageStats(user_id=user_id, year=year, month=month, **increments))
+        except IntegrityError:
+            # Ligne créée entre-temps par un autre worker
+            db.execute(increment)
+
+    def current_usage(self, db: Session, user_id: int, when: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Compteurs du mois en cours, servis depuis le cache si possible
+
+        Args:
+            db: Session de base de données
+            user_id: Praticien
+            when: Date du mois demandé (maintenant par défaut)
+
+        Returns:
+            Compteurs du mois (zéros si aucune activité)
+        """
+        year, month = _period(when)
+        key = (user_id, year, month)
+        usage = self.counters.get(key)
+        if usage is None:
+            row = db.query(UsageStats).filter(
+                UsageStats.user_id == user_id,
+                UsageStats.year == year,
+                UsageStats.month == month
+            ).first()
+            usage = _empty_usage(year, month)
+            if row is not None:
+                usage.update({counter: getattr(row, counter) or 0 for counter in COUNTERS})
+            self.counters.put(key, usage)
+        return dict(usage)
+
+    def history(self, db: Session, user_id: int, months: int = 12, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Historique mensuel en une seule requête de plage
+
+        Args:
+            db: Session de base de données
+            user_id: Praticien
+            months: Nombre de mois (mois en cours inclus)
+            now: Date de référence (maintenant par défaut)
+
+        Returns:
+            Compteurs par mois, du plus ancien au plus récent
+        """
+        year, month = _period(now)
+        last_index = year * 12 + (month - 1)
+        first_index = last_index - (months - 1)
+
+        first_year, first_month = divmod(first_index, 12)
+
+        # Plage exprimée sur (année, mois) pour rester servie par l'index unique
+        rows = db.query(UsageStats).filter(
+            UsageStats.user_id == user_id,
+            or_(
+                UsageStats.year > first_year,
+                and_(UsageStats.year == first_year, UsageStats.month >= first_month + 1)
+            ),
+            or_(
+                UsageStats.year < year,
+                and_(UsageStats.year == year, UsageStats.month <= month)
+            )
+        ).all()
+        by_period = {(row.year, row.month): row for row in rows}
+
+        history = []
+        for index in range(first_index, last_index + 1):
+            period_year, period_month = divmod(index, 12)
+            usage = _empty_usage(period_year, period_month + 1)
+            row = by_period.get((period_year, period_month + 1))
+            if row is not None:
+                usage.update({counter: getattr(row, counter) or 0 for counter in COUNTERS})
+            history.append(usage)
+        return history
+
+    def _apply(self, key: Tuple[int, int, int], increments: Dict[str, Any]) -> None:
+        """Reporter dans le cache les incréments d'une transaction validée"""
+        usage = self.counters.get(key)
+        if usage is None:
+            # Absent du cache : la prochaine lecture rechargera la ligne
+            return
+        for counter, value in increments.items():
+            usage[counter] += value
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache des compteurs"""
+        return self.counters.stats()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_usage(session: Session) -> None:
+    """Mettre à jour les caches de compteurs après validation"""
+    for accounting, key, increments in session.info.pop("usage_increments", []):
+        accounting._apply(key, increments)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_usage(session: Session) -> None:
+    """Oublier les incréments d'une transaction annulée"""
+    session.info.pop("usage_increments", None)
+
+
+# Instance globale de la comptabilité d'utilisation
+usage_accounting = UsageAccounting()
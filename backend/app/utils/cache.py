@@ -0,0 +1,166 @@
+"""
+Cache LRU en mémoire, borné en nombre d'entrées et en taille
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class LRUCache:
+    """
+    Cache LRU thread-safe
+
+    Les entrées les moins récemment utilisées sont évincées dès que le
+    nombre d'entrées ou la taille cumulée (estimée par `sizeof`) dépasse
+    la limite configurée. Une durée de vie optionnelle expire les entrées
+    à la lecture.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 128,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        ttl: Optional[float] = None
+    ):
+        """
+        Args:
+            max_items: Nombre maximal d'entrées
+            max_bytes: Taille cumulée maximale (None = illimitée)
+            sizeof: Fonction estimant la taille d'une valeur en octets
+            ttl: Durée de vie par défaut des entrées en secondes (None = illimitée)
+        """
+        self.max_items = max(1, max_items)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.ttl = ttl
+
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._expires: Dict[Hashable, float] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtenir une valeur et la marquer comme récemment utilisée"""
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            expires_at = self._expires.get(key)
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Ajouter ou remplacer une valeur
+
+        Args:
+            key: Clé
+            value: Valeur
+            ttl: Durée de vie de cette entrée (durée par défaut si absente)
+        """
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Valeur trop grande pour le cache : ne pas vider tout le cache pour elle
+            return
+
+        ttl = ttl if ttl is not None else self.ttl
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+            self._data[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            if ttl is not None:
+                self._expires[key] = time.monotonic() + ttl
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Retirer une entrée du cache"""
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def pop_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Retirer les entrées pour lesquelles `predicate(clé, valeur)` est vrai
+
+        Returns:
+            Nombre d'entrées retirées
+        """
+        with self._lock:
+            keys = [key for key, value in self._data.items() if predicate(key, value)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Vider le cache"""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self._total_bytes = 0
+
+    def keys(self) -> List[Hashable]:
+        """Clés présentes (copie, de la plus ancienne à la plus récente)"""
+        with self._lock:
+            return list(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    @property
+    def total_bytes(self) -> int:
+        """Taille cumulée estimée des entrées"""
+        return self._total_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques d'utilisation du cache"""
+        lookups = self.hits + self.misses
+        return {
+            "items": len(self),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _remove(self, key: Hashable) -> Any:
+        """Retirer une entrée (verrou déjà acquis)"""
+        self._total_bytes -= self._sizes.pop(key)
+        self._expires.pop(key, None)
+        return self._data.pop(key)
+
+    def _evict(self) -> None:
+        """Évincer les entrées les plus anciennes (verrou déjà acquis)"""
+        while self._data and (
+            len(self._data) > self.max_items
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
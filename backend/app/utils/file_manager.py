@@ -1,16 +1,20 @@
 """
 Utilitaires pour la gestion des fichiers et images
+OpenCV et NumPy ne sont importés qu'au premier préprocessing
 """
 
 import os
 import uuid
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 from PIL import Image, ImageOps
 import hashlib
 
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class FileManager:
     """Gestionnaire de fichiers pour l'application"""
@@ -89,9 +93,43 @@ class FileManager:
         return deleted_count
 
 
+# Tag EXIF d'orientation
+EXIF_ORIENTATION = 0x0112
+
+
+def _apply_orientation(pixels: "np.ndarray", orientation: int) -> "np.ndarray":
+    """Appliquer une orientation EXIF (2 à 8) à un tableau HxWxC"""
+    import cv2
+    
+    if orientation == 2:
+        return cv2.flip(pixels, 1)
+    if orientation == 3:
+        return cv2.rotate(pixels, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(pixels, 0)
+    if orientation == 5:
+        return cv2.transpose(pixels)
+    if orientation == 6:
+        return cv2.rotate(pixels, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.rotate(cv2.transpose(pixels), cv2.ROTATE_180)
+    if orientation == 8:
+        return cv2.rotate(pixels, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return pixels
+
+
 class ImageProcessor:
     """Processeur d'images pour les simulations"""
     
+    # Version du préprocessing, incluse dans les clés du cache de résultats
+    PREPROCESSING_VERSION = "cv2-area-v2"
+    
+    # Marge conservée avant le rééchantillonnage final : la réduction DCT et
+    # Image.reduce moyennent déjà les pixels, un facteur 1 suffit
+    REDUCING_GAP = 1.0
+    # Modes acceptés par Image.reduce (les autres sont convertis en RGB)
+    REDUCIBLE_MODES = ("L", "RGB", "RGBA", "I", "F")
+    
     @staticmethod
     def validate_image(image: Image.Image) -> Tuple[bool, Optional[str]]:
         """
@@ -119,39 +157,118 @@ class ImageProcessor:
         return True, None
     
     @staticmethod
-    def prepare_image_for_ai(image: Image.Image) -> Image.Image:
+    def target_size(width: int, height: int, max_size: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Calculer la taille finale d'une image pour Stable Diffusion
+        
+        Le côté le plus long est ramené à max_size puis chaque dimension
+        est arrondie au multiple de 8 inférieur, en une seule étape.
+        
+        Args:
+            width: Largeur source
+            height: Hauteur source
+            max_size: Côté maximal (settings.max_image_size par défaut)
+            
+        Returns:
+            Tuple (largeur, hauteur) multiples de 8
+        """
+        max_size = max_size or settings.max_image_size
+        ratio = min(1.0, max_size / max(width, height))
+        return (
+            max(8, (int(width * ratio) // 8) * 8),
+            max(8, (int(height * ratio) // 8) * 8)
+        )
+    
+    @staticmethod
+    def reduce_on_decode(image: Image.Image, target: Tuple[int, int]) -> Image.Image:
+        """
+        Décoder une image directement près de sa taille cible
+        
+        Les JPEG non encore décodés utilisent le mode draft (réduction DCT
+        1/2, 1/4 ou 1/8 par libjpeg) ; les autres formats sont réduits par
+        un facteur entier avec Image.reduce avant tout traitement coûteux
+        (après conversion en RGB pour les modes que Image.reduce ne gère
+        pas : palette, bilevel, CMYK...).
+        
+        Args:
+            image: Image PIL, idéalement ouverte depuis un fichier et non chargée
+            target: Taille finale visée (dans le repère du fichier)
+            
+        Returns:
+            Image réduite (l'objet d'origine pour le mode draft)
+        """
+        width, height = image.size
+        factor = int(min(width / target[0], height / target[1]) / ImageProcessor.REDUCING_GAP)
+        if factor < 2:
+            return image
+        
+        if image.format == "JPEG" and image.tile:
+            image.draft(None, (width // factor, height // factor))
+            return image
+        
+        if image.mode not in ImageProcessor.REDUCIBLE_MODES:
+            image = image.convert("RGB")
+        return image.reduce(factor)
+    
+    @staticmethod
+    def prepare_image_for_ai(
+        image: Image.Image,
+        max_size: Optional[int] = None,
+        reduce_on_decode: bool = True
+    ) -> Image.Image:
         """
         Préparer une image pour le traitement IA
         
+        Orientation EXIF, conversion RGB et redimensionnement aux multiples
+        de 8 sont faits en une seule passe OpenCV/NumPy : un seul
+        rééchantillonnage, effectué avant la rotation sur le tableau le plus petit.
+        Les grandes images sont décodées directement à résolution réduite.
+        
         Args:
             image: Image PIL d'entrée
+            max_size: Côté maximal (settings.max_image_size par défaut)
+            reduce_on_decode: Décoder à résolution réduite les images trop grandes
             
         Returns:
             Image préparée
         """
-        # Convertir en RGB si nécessaire
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        import cv2
+        import numpy as np
         
-        # Corriger l'orientation EXIF
-        image = ImageOps.exif_transpose(image)
-        
-        # Redimensionner si nécessaire
-        max_size = settings.max_image_size
-        if max(image.size) > max_size:
-            ratio = max_size / max(image.size)
-            new_size = tuple(int(dim * ratio) for dim in image.size)
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
+        orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+        swapped = orientation in (5, 6, 7, 8)
         
-        # S'assurer que les dimensions sont multiples de 8
+        # Taille cible calculée sur l'image orientée, puis ramenée au repère source
         width, height = image.size
-        width = (width // 8) * 8
-        height = (height // 8) * 8
+        if swapped:
+            target_h, target_w = ImageProcessor.target_size(height, width, max_size)
+        else:
+            target_w, target_h = ImageProcessor.target_size(width, height, max_size)
+        
+        if reduce_on_decode:
+            image = ImageProcessor.reduce_on_decode(image, (target_w, target_h))
+        
+        # Conversion RGB directement vers un tableau NumPy
+        if image.mode == "RGB":
+            pixels = np.asarray(image)
+        elif image.mode == "L":
+            pixels = cv2.cvtColor(np.asarray(image), cv2.COLOR_GRAY2RGB)
+        elif image.mode == "RGBA":
+            pixels = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGBA2RGB)
+        else:
+            pixels = np.asarray(image.convert("RGB"))
         
-        if (width, height) != image.size:
-            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        height, width = pixels.shape[:2]
+        if (target_w, target_h) != (width, height):
+            shrinking = target_w <= width and target_h <= height
+            pixels = cv2.resize(
+                pixels,
+                (target_w, target_h),
+                interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4
+            )
         
-        return image
+        pixels = _apply_orientation(pixels, orientation)
+        return Image.fromarray(pixels, "RGB")
     
     @staticmethod
     def create_thumbnail(image: Image.Image, size: Tuple[int, int] = (300, 300)) -> Image.Image:
@@ -0,0 +1,84 @@
+"""
+Pagination par curseur (keyset) sur (created_at, id)
+Le coût d'une page ne dépend pas de sa profondeur, contrairement à OFFSET,
+et l'ordre reste stable quand de nouvelles lignes sont insérées
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+
+class InvalidCursorError(ValueError):
+    """Curseur illisible ou falsifié"""
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Encoder la position de la dernière ligne d'une page
+
+    Args:
+        created_at: Date de création de la ligne
+        row_id: Identifiant de la ligne
+
+    Returns:
+        Curseur opaque (base64 URL-safe)
+    """
+    raw = json.dumps({"c": created_at.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Décoder un curseur
+
+    Raises:
+        InvalidCursorError: Si le curseur est illisible
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Curseur de pagination invalide")
+
+
+def keyset_page(query: Query, model: Any, cursor: Optional[str], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Lire une page, de la plus récente à la plus ancienne
+
+    L'ordre (created_at, id) décroissant remplace tout tri existant de la
+    requête et doit être servi par un index.
+
+    Args:
+        query: Requête filtrée
+        model: Modèle paginé (colonnes created_at et id)
+        cursor: Curseur de la page précédente (None ou vide = première page)
+        limit: Taille de la page
+
+    Returns:
+        (lignes de la page, curseur de la page suivante ou None)
+
+    Raises:
+        InvalidCursorError: Si le curseur est illisible
+    """
+    limit = max(1, limit)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    rows = query.order_by(None).order_by(
+        model.created_at.desc(), model.id.desc()
+    ).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,239 @@
+"""
+Réception des images envoyées par les clients
+Les uploads sont écrits par blocs dans un fichier temporaire, hachés au fil
+de l'eau et limités en taille, sans jamais être chargés entièrement en mémoire.
+Les corps multipart trop volumineux sont refusés avant leur analyse
+(`UploadSizeLimitMiddleware`) : sans lui, Starlette recevrait et écrirait
+tout le fichier dans son propre fichier temporaire avant le contrôle
+"""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+from app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+# Marge du corps multipart au-delà du fichier (délimiteurs, champs du formulaire)
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Signatures des formats d'image acceptés
+IMAGE_SIGNATURES = {
+    "JPEG": (b"\xff\xd8\xff",),
+    "PNG": (b"\x89PNG\r\n\x1a\n",),
+    "WEBP": (b"RIFF",),
+}
+EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+
+class UploadError(ValueError):
+    """Upload refusé"""
+
+
+class UploadTooLargeError(UploadError):
+    """Upload dépassant la taille maximale autorisée"""
+
+
+class InvalidImageError(UploadError):
+    """Contenu qui n'est pas une image supportée"""
+
+
+@dataclass
+class IngestedUpload:
+    """Image reçue et enregistrée sur disque"""
+    path: Path
+    sha256: str
+    size: int
+    format: str
+    width: int
+    height: int
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """
+    Identifier le format d'une image à partir de ses premiers octets
+
+    Args:
+        header: Premiers octets du fichier (au moins 12)
+
+    Returns:
+        Format PIL (JPEG, PNG, WEBP) ou None
+    """
+    for image_format, signatures in IMAGE_SIGNATURES.items():
+        if any(header.startswith(signature) for signature in signatures):
+            if image_format == "WEBP" and header[8:12] != b"WEBP":
+                continue
+            return image_format
+    return None
+
+
+def _write_chunk(buffer: BinaryIO, digest: "hashlib._Hash", chunk: bytes) -> None:
+    """Hacher et écrire un bloc (appel bloquant)"""
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+def _probe_and_publish(tmp_path: Path, destination_dir: Path, file_id: str, image_format: str) -> Tuple[Path, str, int, int]:
+    """
+    Lire l'en-tête de l'image puis publier le fichier sous son nom définitif (appel bloquant)
+
+    Returns:
+        (chemin définitif, format, largeur, hauteur)
+    """
+    # Lecture de l'en-tête uniquement, sans décoder les pixels
+    try:
+        with Image.open(tmp_path) as image:
+            width, height = image.size
+            image_format = image.format or image_format
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(f"Image illisible: {e}")
+
+    final_path = destination_dir / f"{file_id}_original{EXTENSIONS.get(image_format, '.img')}"
+    os.replace(tmp_path, final_path)
+    return final_path, image_format, width, height
+
+
+async def ingest_upload(
+    upload: UploadFile,
+    destination_dir: Optional[Path] = None,
+    file_id: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> IngestedUpload:
+    """
+    Enregistrer un upload d'image par blocs
+
+    Le fichier est écrit dans un fichier temporaire du répertoire de
+    destination puis renommé ; les octets originaux sont conservés
+    (pas de ré-encodage, les métadonnées EXIF restent disponibles).
+    Les écritures sur disque sont faites hors de la boucle d'événements.
+    La limite de taille porte ici sur le fichier déjà reçu par Starlette ;
+    le refus précoce des corps trop gros relève du middleware.
+
+    Args:
+        upload: Fichier reçu par FastAPI
+        destination_dir: Répertoire de destination (settings.upload_dir par défaut)
+        file_id: Préfixe du nom de fichier (UUID généré si absent)
+        max_bytes: Taille maximale (settings.max_upload_size par défaut)
+        chunk_size: Taille des blocs lus
+
+    Returns:
+        Image enregistrée avec son hash et ses dimensions
+
+    Raises:
+        UploadTooLargeError: Si la taille maximale est dépassée
+        InvalidImageError: Si le contenu n'est pas une image supportée
+    """
+    destination_dir = Path(destination_dir or settings.upload_dir)
+    max_bytes = max_bytes if max_bytes is not None else settings.max_upload_size
+    file_id = file_id or str(uuid.uuid4())
+
+    tmp_path = destination_dir / f".{file_id}.part"
+    digest = hashlib.sha256()
+    size = 0
+    image_format = None
+
+    try:
+        buffer = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+
+                if image_format is None:
+                    image_format = sniff_image_format(chunk[:16])
+                    if image_format is None:
+                        raise InvalidImageError("Le fichier n'est pas une image JPEG, PNG ou WebP")
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"Fichier trop volumineux (maximum {max_bytes // (1024 * 1024)} Mo)"
+                    )
+
+                await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+        finally:
+            await asyncio.to_thread(buffer.close)
+
+        if image_format is None:
+            raise InvalidImageError("Fichier vide")
+
+        final_path, image_format, width, height = await asyncio.to_thread(
+            _probe_and_publish, tmp_path, destination_dir, file_id, image_format
+        )
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return IngestedUpload(
+        path=final_path,
+        sha256=digest.hexdigest(),
+        size=size,
+        format=image_format,
+        width=width,
+        height=height
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Refus des corps multipart trop volumineux avant leur analyse
+
+    Un `Content-Length` au-delà de la limite est refusé immédiatement (413)
+    sans lire le corps ; un corps sans longueur annoncée (chunked) est
+    compté pendant sa réception et interrompu dès qu'il la dépasse.
+    """
+
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._is_multipart(scope):
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.max_bytes if self.max_bytes is not None else settings.max_upload_size
+        limit = max_bytes + MULTIPART_OVERHEAD
+        detail = f"Fichier trop volumineux (maximum {max_bytes // (1024 * 1024)} Mo)"
+
+        content_length = self._header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Relayée telle quelle par FastAPI pendant l'analyse du formulaire
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    def _header(scope, name: bytes) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key.lower() == name:
+                return value.decode("latin-1")
+        return None
+
+    def _is_multipart(self, scope) -> bool:
+        return (self._header(scope, b"content-type") or "").lower().startswith("multipart/form-data")
+
@@ -0,0 +1,494 @@
+"""
+Worker de génération des simulations AestheticAI
+Consomme la file de travaux persistante et exécute les générations IA
+
+Lancement d'un worker dédié:
+    python -m app.worker
+
+Plusieurs workers partageant une seule copie des poids (modèles chargés
+par le parent, puis fork) :
+    python -m app.worker --processes 4
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from PIL import Image
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, create_tables, engine
+from app.models import Simulation, SimulationJob
+from app.services.ai_generator import ai_service
+from app.services.inference_scheduler import InferenceTimeoutError
+from app.services.job_queue import job_queue
+from app.services.prefork import PreforkSupervisor, freeze_shared_state
+from app.services.previews import ProgressCallback
+from app.services.renditions import Renditions, create_file_renditions, create_renditions
+from app.services.events import event_bus, simulation_event
+from app.services.status_writer import status_writer
+from app.services.usage import usage_accounting
+from app.utils import FileManager
+
+logger = logging.getLogger(__name__)
+
+
+def preview_filename(generated_filename: str) -> str:
+    """Nom du fichier d'aperçu associé à une image générée"""
+    stem = Path(generated_filename).stem
+    return f"{stem[:-len('_generated')] if stem.endswith('_generated') else stem}_preview.jpg"
+
+
+def make_progress_reporter(db: Session, simulation: Simulation, preview_path: Path) -> ProgressCallback:
+    """
+    Construire le suivi d'avancement d'une simulation
+
+    Appelé depuis le thread du pipeline : les écritures (tous les 5 % ou à
+    chaque nouvel aperçu) passent par l'écrivain unique, qui les regroupe
+    avec celles des autres simulations en cours.
+
+    Args:
+        db: Session du worker (pour le moteur de base de données)
+        simulation: Simulation suivie
+        preview_path: Fichier où enregistrer les aperçus
+
+    Returns:
+        Callback (étape, nombre d'étapes, aperçu)
+    """
+    bind = db.get_bind()
+    simulation_id = simulation.id
+    user_id = simulation.user_id
+    event = simulation_event(simulation)
+    last_progress = [-1]
+
+    def report(step: int, total: int, preview: Optional[Image.Image]) -> None:
+        progress = min(99, int(step * 100 / max(total, 1)))
+        if preview is None and step < total and progress - last_progress[0] < 5:
+            return
+
+        values = {"progress": progress}
+        if preview is not None:
+            tmp_path = preview_path.with_suffix(".tmp")
+            preview.save(tmp_path, "JPEG", quality=70)
+            os.replace(tmp_path, preview_path)
+            values["preview_image_path"] = str(preview_path)
+
+        status_writer.write(bind, lambda session: session.execute(
+            update(Simulation)
+            .where(Simulation.id == simulation_id, Simulation.status == "processing")
+            .values(**values)
+        ))
+        last_progress[0] = progress
+
+        event.update(values)
+        event_bus.publish(user_id, dict(event))
+
+    return report
+
+
+def save_generated_image(generated_image: Image.Image, generated_path: Path) -> Renditions:
+    """
+    Enregistrer l'image générée et ses déclinaisons (appel bloquant)
+
+    Returns:
+        Déclinaisons de l'image générée (vide si leur création échoue)
+    """
+    generated_image.save(generated_path, "JPEG", quality=90)
+    return _renditions_or_empty(create_renditions, generated_image.convert("RGB"), generated_path)
+
+
+def _renditions_or_empty(function: Callable[..., Renditions], *args) -> Renditions:
+    """Les déclinaisons sont facultatives : une erreur ne fait pas échouer la simulation"""
+    try:
+        return function(*args)
+    except Exception as e:
+        logger.warning(f"Déclinaisons non créées pour {args[-1]}: {e}")
+        return {}
+
+
+def finalize_simulation(
+    db: Session,
+    simulation: Simulation,
+    metadata: dict,
+    generated_path: Path,
+    renditions: Optional[Dict[str, Renditions]] = None
+) -> None:
+    """Terminer la simulation (image déjà enregistrée) et comptabiliser l'utilisation"""
+    simulation.generated_image_path = str(generated_path)
+    simulation.set_renditions({kind: value for kind, value in (renditions or {}).items() if value})
+    simulation.model_version = metadata.get("model_version")
+    if simulation.preview_image_path:
+        # L'image finale remplace l'aperçu intermédiaire
+        Path(simulation.preview_image_path).unlink(missing_ok=True)
+        simulation.preview_image_path = None
+    simulation.mark_completed(metadata.get("generation_time", 0))
+
+    # Validé dans la même transaction que la simulation
+    usage_accounting.record_simulation(
+        db,
+        simulation.user_id,
+        storage_mb=generated_path.stat().st_size / (1024 * 1024),
+        processing_seconds=simulation.generation_time or 0.0
+    )
+
+
+def job_timeout(job: SimulationJob) -> Optional[float]:
+    """
+    Durée maximale d'un travail : `max_inference_time` par image générée,
+    plus une marge pour le préprocessing et l'enregistrement des images
+
+    À l'échéance, le travail est marqué en échec et l'emplacement du worker
+    est rendu ; une étape de débruitage bloquée ne peut en revanche pas être
+    interrompue : le thread de l'ordonnanceur d'inférences reste occupé
+    jusqu'à son retour et les inférences suivantes attendent leur tour
+    (dans la limite de `inference_max_pending`).
+
+    Returns:
+        Délai en secondes, ou None si `max_inference_time` est désactivé
+    """
+    if not settings.max_inference_time:
+        return None
+    generations = len(job.get_payload().get("simulation_ids", [])) or 1
+    return settings.max_inference_time * generations + settings.job_timeout_grace_seconds
+
+
+async def process_simulation_job(db: Session, job: SimulationJob) -> None:
+    """
+    Exécuter la génération IA associée à un travail
+
+    Args:
+        db: Session de base de données
+        job: Travail réservé
+
+    Raises:
+        Exception: Si la génération échoue (le travail sera retenté)
+    """
+    if job.kind == "sweep":
+        await process_sweep_job(db, job)
+        return
+
+    simulation = db.query(Simulation).filter(Simulation.id == job.simulation_id).first()
+    if not simulation:
+        logger.warning(f"Simulation {job.simulation_id} introuvable, travail {job.id} ignoré")
+        return
+
+    payload = job.get_payload()
+    simulation.status = "processing"
+    simulation.progress = 0
+    db.commit()
+    event_bus.publish(simulation.user_id, simulation_event(simulation))
+
+    original_path = Path(simulation.original_image_path)
+    generated_filename = payload.get("output_filename", f"{original_path.stem}_generated.jpg")
+    reporter = make_progress_reporter(
+        db, simulation, settings.upload_dir / preview_filename(generated_filename)
+    )
+
+    # Image adossée au fichier : les pixels ne sont décodés qu'au préprocessing
+    with Image.open(original_path) as original_image:
+        # Générer l'image avec l'IA (le hash du fichier source adresse le cache de résultats)
+        generated_image, metadata = await ai_service.generate_simulation(
+            original_image,
+            simulation.intervention_type,
+            simulation.dose,
+            simulation.get_parameters(),
+            source_hash=payload.get("source_hash") or FileManager.get_file_hash(original_path),
+            progress_callback=reporter
+        )
+    if metadata.get("fallback"):
+        raise RuntimeError(metadata.get("error", "Génération IA échouée"))
+
+    # Sauvegarder l'image générée et ses déclinaisons hors de la boucle d'événements
+    generated_path = settings.upload_dir / generated_filename
+    generated_renditions, original_renditions = await asyncio.gather(
+        asyncio.to_thread(save_generated_image, generated_image, generated_path),
+        asyncio.to_thread(_renditions_or_empty, create_file_renditions, original_path)
+    )
+    
+    # Mettre à jour la simulation
+    db.refresh(simulation)
+    finalize_simulation(
+        db, simulation, metadata, generated_path,
+        {"generated": generated_renditions, "original": original_renditions}
+    )
+    db.commit()
+    event_bus.publish(simulation.user_id, simulation_event(simulation))
+
+
+async def process_sweep_job(db: Session, job: SimulationJob) -> None:
+    """
+    Générer en une passe toutes les doses d'une série
+
+    Args:
+        db: Session de base de données
+        job: Travail réservé (payload: simulation_ids, output_filenames)
+
+    Raises:
+        Exception: Si la génération échoue (le travail sera retenté)
+    """
+    payload = job.get_payload()
+    simulation_ids = payload.get("simulation_ids", [job.simulation_id])
+    simulations = db.query(Simulation).filter(
+        Simulation.id.in_(simulation_ids),
+        Simulation.status != "completed"
+    ).order_by(Simulation.dose).all()
+    if not simulations:
+        logger.warning(f"Série du travail {job.id} sans simulation à générer, travail ignoré")
+        return
+
+    for simulation in simulations:
+        simulation.status = "processing"
+        simulation.progress = 0
+    db.commit()
+    for simulation in simulations:
+        event_bus.publish(simulation.user_id, simulation_event(simulation))
+
+    output_filenames = payload.get("output_filenames", {})
+    original_path = Path(simulations[0].original_image_path)
+    generated_filenames = [
+        output_filenames.get(str(simulation.id), f"{original_path.stem}_{simulation.id}_generated.jpg")
+        for simulation in simulations
+    ]
+    reporters = [
+        make_progress_reporter(db, simulation, settings.upload_dir / preview_filename(filename))
+        for simulation, filename in zip(simulations, generated_filenames)
+    ]
+
+    # Toutes les simulations d'une série partagent la même image originale
+    with Image.open(original_path) as original_image:
+        results = await ai_service.generate_dose_sweep(
+            original_image,
+            simulations[0].intervention_type,
+            [simulation.dose for simulation in simulations],
+            simulations[0].get_parameters(),
+            source_hash=payload.get("source_hash") or FileManager.get_file_hash(original_path),
+            progress_callbacks=reporters
+        )
+
+    # L'originale, commune à la série, n'est déclinée qu'une fois
+    generated_paths = [settings.upload_dir / filename for filename in generated_filenames]
+    original_renditions, *generated_renditions = await asyncio.gather(
+        asyncio.to_thread(_renditions_or_empty, create_file_renditions, original_path),
+        *(
+            asyncio.to_thread(save_generated_image, generated_image, path)
+            for (generated_image, _), path in zip(results, generated_paths)
+        )
+    )
+    
+    for simulation, path, (_, metadata), renditions in zip(simulations, generated_paths, results, generated_renditions):
+        db.refresh(simulation)
+        finalize_simulation(
+            db, simulation, metadata, path,
+            {"generated": renditions, "original": original_renditions}
+        )
+    db.commit()
+    for simulation in simulations:
+        event_bus.publish(simulation.user_id, simulation_event(simulation))
+
+
+class SimulationWorker:
+    """
+    Worker consommant la file de travaux des simulations
+
+    Peut tourner dans un processus dédié (python -m app.worker) ou dans le
+    processus API pour les déploiements mono-nœud (settings.embedded_worker).
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        concurrency: Optional[int] = None
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.poll_interval = poll_interval if poll_interval is not None else settings.job_poll_interval
+        self.session_factory = session_factory
+        # Plusieurs travaux simultanés permettent au micro-batching de regrouper les inférences
+        self.concurrency = max(1, concurrency or settings.worker_concurrency)
+        self._stop_requested = False
+        self._last_recovery = 0.0
+
+    def stop(self) -> None:
+        """Demander l'arrêt du worker après le travail en cours"""
+        self._stop_requested = True
+
+    async def run(self, once: bool = False) -> None:
+        """
+        Boucle principale du worker
+
+        Args:
+            once: S'arrêter dès que la file est vide
+        """
+        await ai_service.initialize_models()
+        logger.info(f"Worker {self.worker_id} démarré ({self.concurrency} emplacement(s))")
+
+        await asyncio.gather(*(self._consume(once) for _ in range(self.concurrency)))
+
+        logger.info(f"Worker {self.worker_id} arrêté")
+
+    async def _consume(self, once: bool) -> None:
+        """Boucle d'un emplacement de traitement"""
+        while not self._stop_requested:
+            if time.monotonic() - self._last_recovery > job_queue.lease_seconds / 2:
+                self._last_recovery = time.monotonic()
+                self._recover_expired()
+
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                # Suivi du travail impossible (base indisponible...) : le bail
+                # expirera et le travail sera repris, la boucle continue
+                logger.exception(f"Erreur de suivi d'un travail par {self.worker_id}: {e}")
+                processed = False
+            if not processed:
+                if once:
+                    break
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self) -> bool:
+        """
+        Réserver et traiter un travail
+
+        Returns:
+            True si un travail a été traité
+        """
+        db = self.session_factory()
+        try:
+            job = job_queue.claim(db, self.worker_id)
+            if job is None:
+                return False
+
+            heartbeat = asyncio.create_task(self._heartbeat(job.id))
+            timeout = job_timeout(job)
+            deadline = asyncio.timeout(timeout)
+            try:
+                async with deadline:
+                    await process_simulation_job(db, job)
+            except Exception as e:
+                db.rollback()
+                # Seuls le délai du travail et celui vérifié entre les étapes sont
+                # définitifs ; toute autre TimeoutError (réseau, base...) est réessayée
+                if isinstance(e, InferenceTimeoutError) or (isinstance(e, TimeoutError) and deadline.expired()):
+                    reason = str(e) if isinstance(e, InferenceTimeoutError) else (
+                        f"Délai maximal du travail ({timeout:g}s) dépassé"
+                    )
+                    logger.error(f"Travail {job.id} interrompu: {reason}")
+                    job_queue.fail(db, job, self.worker_id, reason, retry=False)
+                else:
+                    logger.error(f"Erreur lors du traitement du travail {job.id}: {e}")
+                    job_queue.fail(db, job, self.worker_id, str(e))
+            else:
+                job_queue.complete(db, job, self.worker_id)
+            finally:
+                heartbeat.cancel()
+
+            return True
+        finally:
+            db.close()
+
+    async def _heartbeat(self, job_id: int) -> None:
+        """Prolonger périodiquement le bail du travail en cours"""
+        interval = max(job_queue.lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            db = self.session_factory()
+            try:
+                if not job_queue.heartbeat(db, job_id, self.worker_id):
+                    logger.warning(f"Bail perdu pour le travail {job_id}")
+                    return
+            finally:
+                db.close()
+
+    def _recover_expired(self) -> None:
+        """Remettre en file les travaux abandonnés par des workers disparus"""
+        db = self.session_factory()
+        try:
+            job_queue.recover_expired(db)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erreur lors de la récupération des travaux expirés: {e}")
+        finally:
+            db.close()
+
+
+def run_preforked(processes: int, once: bool = False, poll_interval: Optional[float] = None,
+                  concurrency: Optional[int] = None) -> None:
+    """
+    Charger les modèles une fois puis créer les workers par fork
+
+    Les poids restent partagés en copie sur écriture entre les processus ;
+    un worker qui s'arrête anormalement est relancé depuis le parent.
+    """
+    asyncio.run(ai_service.initialize_models())
+    ai_service.prepare_for_fork()
+    # Aucune connexion ni thread du parent ne doit être hérité en cours d'usage
+    engine.dispose()
+    status_writer.shutdown()
+    freeze_shared_state()
+
+    def serve(index: int) -> None:
+        ai_service.after_fork(processes=processes)
+        engine.dispose(close=False)
+        worker = SimulationWorker(poll_interval=poll_interval, concurrency=concurrency)
+
+        async def run() -> None:
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, worker.stop)
+            await worker.run(once=once)
+
+        try:
+            asyncio.run(run())
+        finally:
+            status_writer.shutdown()
+
+    logger.info(f"Modèles chargés, démarrage de {processes} workers préforkés")
+    PreforkSupervisor(processes, serve, respawn=not once).run()
+
+
+def main() -> None:
+    """Point d'entrée du worker dédié"""
+    parser = argparse.ArgumentParser(description="Worker de génération AestheticAI")
+    parser.add_argument("--once", action="store_true", help="S'arrêter quand la file est vide")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Intervalle de scrutation (s)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Travaux traités en parallèle")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Workers préforkés partageant les poids des modèles")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if not settings.debug else logging.DEBUG,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    create_tables()
+    processes = args.processes or settings.worker_processes
+    if processes > 1:
+        try:
+            run_preforked(processes, args.once, args.poll_interval, args.concurrency)
+        finally:
+            asyncio.run(ai_service.cleanup())
+        return
+
+    worker = SimulationWorker(poll_interval=args.poll_interval, concurrency=args.concurrency)
+    try:
+        asyncio.run(worker.run(once=args.once))
+    except KeyboardInterrupt:
+        logger.info("Arrêt demandé")
+    finally:
+        status_writer.shutdown()
+        asyncio.run(ai_service.cleanup())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Test de charge des routes sur la couche base de données asynchrone
+
+Compare le débit de GET /patients sous requêtes concurrentes :
+- "bloquant" : requêtes ORM exécutées directement dans la route async
+  (comportement historique, la boucle d'événements attend la base) ;
+- "thread" : DatabaseSession sur Session classique (pool de threads) ;
+- "async" : DatabaseSession sur AsyncSession (aiosqlite), si installé.
+La latence réseau d'un serveur de base de données est simulée par une
+fonction SQLite qui attend `--latency-ms` avant chaque requête.
+
+La concurrence par défaut reste sous la taille du pool SQLite (5 + 10) :
+au-delà, le mode bloquant attend une connexion depuis la boucle
+d'événements, qui ne peut plus rendre celles des requêtes terminées
+(blocage jusqu'à `pool_timeout`).
+
+Lancement:
+    python -m benchmarks.bench_db_throughput --requests 300 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="bench_db_"))
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR / 'bench.db'}"
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.api import patients_router
+from app.core import database
+from app.core.config import settings
+from app.models import Patient, User
+from app.schemas import PatientSummary
+from app.services.auth import auth_service
+
+
+def add_latency(engine, latency_ms: float) -> None:
+    """Attendre `latency_ms` avant chaque requête, dans le thread du pilote"""
+
+    @event.listens_for(engine, "connect")
+    def register(dbapi_connection, connection_record):
+        dbapi_connection.create_function("bench_latency", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def wait(conn, cursor, statement, parameters, context, executemany):
+        cursor.execute("SELECT bench_latency(?)", (latency_ms,))
+
+
+def build_app() -> FastAPI:
+    """Routes patients réelles plus la variante bloquante de référence"""
+    app = FastAPI()
+    app.include_router(patients_router, prefix="/api")
+
+    @app.get("/blocking/patients/")
+    async def list_patients_blocking(
+        limit: int = 50,
+        db: Session = Depends(database.get_db),
+    ):
+        patients = db.query(Patient).order_by(
+            Patient.created_at.desc(), Patient.id.desc()
+        ).limit(limit).all()
+        return [PatientSummary.from_orm(patient) for patient in patients]
+
+    return app
+
+
+def seed(patients: int) -> str:
+    """Créer le schéma, les patients et un praticien ; retourne son token"""
+    database.create_tables()
+    db = database.SessionLocal()
+    db.add_all(Patient(age_range="26-35", gender="F", skin_type="Claire") for _ in range(patients))
+    user = User(
+        username="bench_doctor",
+        hashed_pin="x",
+        full_name="Dr Bench",
+        speciality="dermatologie",
+        license_number="LIC-BENCH",
+    )
+    db.add(user)
+    db.commit()
+    token = auth_service.create_access_token({"sub": user.username, "user_id": user.id})
+    db.close()
+    return token
+
+
+async def load(app: FastAPI, path: str, token: str, requests: int, concurrency: int):
+    """Débit (req/s) et latences p50/p95 (ms) sous `concurrency` requêtes simultanées"""
+    headers = {"Authorization": f"Bearer {token}"}
+    timings = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=120) as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                timings.append((time.perf_counter() - started) * 1000)
+
+        # Préchauffage (connexions, cache d'authentification)
+        await one()
+        timings.clear()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return requests / elapsed, statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Test de charge de la couche base de données")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="latence simulée par requête SQL")
+    parser.add_argument("--min-speedup", type=float, default=2.0, help="gain minimal sur le mode bloquant")
+    args = parser.parse_args()
+
+    token = seed(args.patients)
+    app = build_app()
+    # Nouvelles connexions : la fonction de latence y est enregistrée
+    database.engine.dispose()
+    add_latency(database.engine, args.latency_ms)
+
+    modes = [("bloquant", "/blocking/patients/", False), ("thread", "/api/patients/", False)]
+    try:
+        import aiosqlite  # noqa: F401
+        add_latency(database.get_async_engine().sync_engine, args.latency_ms)
+        modes.append(("async", "/api/patients/", True))
+    except ImportError:
+        print("aiosqlite non installé : mode async ignoré")
+
+    results = {}
+    for name, path, use_async in modes:
+        settings.database_async = use_async
+        results[name] = asyncio.run(load(app, path, token, args.requests, args.concurrency))
+
+    print(f"{args.requests} requêtes, {args.concurrency} simultanées, latence SQL {args.latency_ms}ms")
+    print(f"{'mode':>10} {'req/s':>8} {'p50':>9} {'p95':>9} {'gain':>6}")
+    baseline = results["bloquant"][0]
+    failures = []
+    for name, (throughput, p50, p95) in results.items():
+        speedup = throughput / baseline
+        print(f"{name:>10} {throughput:8.0f} {p50:7.1f}ms {p95:7.1f}ms {speedup:5.1f}x")
+        if name != "bloquant" and speedup < args.min_speedup:
+            failures.append(f"{name}: gain {speedup:.1f}x < {args.min_speedup}x")
+
+    asyncio.run(database.dispose_async_engine())
+    database.engine.dispose()
+    for path in WORKDIR.iterdir():
+        path.unlink()
+    WORKDIR.rmdir()
+
+    if failures:
+        print("ÉCHEC: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark du décodage des grandes photos avant inférence
+
+Génère un corpus de JPEG/PNG synthétiques de 12 à 24 Mpx puis compare,
+chacun dans un processus séparé pour isoler le pic mémoire (RSS échantillonné) :
+- décodage complet puis réduction (ancien chemin)
+- décodage réduit (mode draft JPEG / Image.reduce) puis réduction
+
+Lancement:
+    python -m benchmarks.bench_decode --images 6
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import numpy as np
+from PIL import Image
+
+SIZES = [(4032, 3024), (6000, 4000), (3024, 4032)]
+
+
+def build_corpus(directory: Path, count: int) -> list:
+    """Créer des photos synthétiques (dégradés + bruit, compressibles comme des photos)"""
+    rng = np.random.default_rng(0)
+    paths = []
+    for index in range(count):
+        width, height = SIZES[index % len(SIZES)]
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+        pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+        image = Image.fromarray(pixels, "RGB")
+
+        if index % 3 == 2:
+            path = directory / f"photo_{index}.png"
+            image.save(path, "PNG", compress_level=1)
+        else:
+            path = directory / f"photo_{index}.jpg"
+            image.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def run_variant(paths: list, reduce_on_decode: bool, max_size: int, queue) -> None:
+    """Préparer toutes les images du corpus dans ce processus"""
+    import psutil
+
+    from app.utils.file_manager import ImageProcessor
+
+    process = psutil.Process()
+    baseline = process.memory_info().rss
+    peak = baseline
+    stop = threading.Event()
+
+    def sample() -> None:
+        nonlocal peak
+        while not stop.is_set():
+            peak = max(peak, process.memory_info().rss)
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    timings = []
+    for path in paths:
+        start = time.perf_counter()
+        with Image.open(path) as image:
+            ImageProcessor.prepare_image_for_ai(image, max_size, reduce_on_decode=reduce_on_decode)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    stop.set()
+    sampler.join()
+    queue.put((timings, (peak - baseline) / (1024 * 1024)))
+
+
+def measure(paths: list, reduce_on_decode: bool, max_size: int):
+    """Exécuter une variante dans un processus neuf"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_variant, args=(paths, reduce_on_decode, max_size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du décodage réduit")
+    parser.add_argument("--images", type=int, default=6)
+    parser.add_argument("--max-size", type=int, default=768)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = build_corpus(Path(directory), args.images)
+        full_times, full_rss = measure(paths, False, args.max_size)
+        draft_times, draft_rss = measure(paths, True, args.max_size)
+
+    print(f"{'fichier':>14} {'complet (ms)':>13} {'réduit (ms)':>12} {'gain':>6}")
+    for path, full, draft in zip(paths, full_times, draft_times):
+        print(f"{path.name:>14} {full:13.1f} {draft:12.1f} {full / draft:5.1f}x")
+    print(
+        f"{'médiane':>14} {statistics.median(full_times):13.1f} "
+        f"{statistics.median(draft_times):12.1f}"
+    )
+    print(f"{'pic RSS (Mo)':>14} {full_rss:13.1f} {draft_rss:12.1f} {full_rss / max(draft_rss, 0.1):5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
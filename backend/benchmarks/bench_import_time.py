@@ -0,0 +1,142 @@
+"""
+Benchmark du temps d'import de l'application (démarrage à froid)
+
+Lance `python -X importtime -c "import app.main"` dans des processus neufs
+et rapporte la médiane du temps total ainsi que les paquets les plus
+coûteux (temps propre cumulé par paquet racine). Échoue si une
+bibliothèque lourde (torch, cv2, diffusers...) est importée au démarrage :
+elles doivent l'être au chargement des modèles, après que l'API écoute.
+
+Avec `--record`, le résultat est enregistré sous la version de
+l'application dans `benchmarks/importtime_history.json`, pour suivre
+l'évolution d'une release à l'autre.
+
+Lancement:
+    python -m benchmarks.bench_import_time --runs 5 --record
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+HISTORY_PATH = Path(__file__).resolve().parent / "importtime_history.json"
+
+# Paquets qui ne doivent pas être importés au démarrage de l'API
+HEAVY_PACKAGES = ("torch", "cv2", "diffusers", "controlnet_aux", "transformers", "numpy")
+
+
+def measure(module: str) -> Tuple[float, Dict[str, float], Set[str]]:
+    """
+    Importer un module dans un processus neuf
+
+    Returns:
+        (temps total en ms, temps propre par paquet racine en ms, paquets importés)
+    """
+    env = {**os.environ, "ENVIRONMENT": os.environ.get("ENVIRONMENT", "test")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import de {module} impossible:\n{result.stderr[-2000:]}")
+
+    total = 0.0
+    by_package: Dict[str, float] = defaultdict(float)
+    packages: Set[str] = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = _split(line)
+        root = name.split(".")[0]
+        packages.add(root)
+        by_package[root] += int(self_us) / 1000
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, dict(by_package), packages
+
+
+def _split(line: str) -> Tuple[str, str, str]:
+    """Découper une ligne `import time: propre | cumulé | module`"""
+    self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+    return self_us.strip(), cumulative_us.strip(), name.strip()
+
+
+def record(version: str, entry: dict) -> None:
+    """Enregistrer le résultat d'une version dans l'historique"""
+    history = json.loads(HISTORY_PATH.read_text(encoding="utf-8")) if HISTORY_PATH.exists() else {}
+    history[version] = entry
+    HISTORY_PATH.write_text(json.dumps(history, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du temps d'import de l'application")
+    parser.add_argument("--module", default="app.main", help="module importé")
+    parser.add_argument("--runs", type=int, default=5, help="processus mesurés")
+    parser.add_argument("--top", type=int, default=10, help="paquets affichés")
+    parser.add_argument("--budget-ms", type=float, default=None, help="échec si la médiane dépasse ce temps")
+    parser.add_argument("--record", action="store_true", help="enregistrer dans l'historique des versions")
+    args = parser.parse_args()
+
+    # Un premier import à blanc remplit les caches de bytecode et du système de fichiers
+    measure(args.module)
+    totals: List[float] = []
+    packages_ms: Dict[str, List[float]] = defaultdict(list)
+    imported: Set[str] = set()
+    for _ in range(args.runs):
+        total, by_package, packages = measure(args.module)
+        totals.append(total)
+        imported |= packages
+        for package, milliseconds in by_package.items():
+            packages_ms[package].append(milliseconds)
+
+    median_total = statistics.median(totals)
+    top = sorted(
+        ((package, statistics.median(values)) for package, values in packages_ms.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )[:args.top]
+
+    print(f"import {args.module} : médiane {median_total:.0f} ms "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}, {args.runs} processus)")
+    print(f"{'paquet':>24} {'temps propre':>13}")
+    for package, milliseconds in top:
+        print(f"{package:>24} {milliseconds:10.0f} ms")
+
+    heavy = sorted(set(HEAVY_PACKAGES) & imported)
+
+    if args.record:
+        from app.core.config import settings
+
+        record(settings.app_version, {
+            "date": date.today().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(terse=True),
+            "module": args.module,
+            "median_ms": round(median_total, 1),
+            "top_packages_ms": {package: round(milliseconds, 1) for package, milliseconds in top},
+            "heavy_packages": heavy,
+        })
+        print(f"Enregistré pour la version {settings.app_version} dans {HISTORY_PATH.name}")
+
+    if heavy:
+        print(f"ÉCHEC: bibliothèques lourdes importées au démarrage: {', '.join(heavy)}")
+        sys.exit(1)
+    if args.budget_ms is not None and median_total > args.budget_ms:
+        print(f"ÉCHEC: {median_total:.0f} ms > budget de {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark des listes de simulations sur une base volumineuse
+
+Peuple une base SQLite temporaire (1M simulations par défaut), puis mesure
+la requête de GET /simulations (par praticien, par statut, par patient)
+sans puis avec les index composites. Échoue si la latence indexée dépasse
+le seuil ou si le gain est insuffisant.
+
+Lancement:
+    python -m benchmarks.bench_list_queries --rows 1000000 --max-ms 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.simulations import _simulation_list_query
+from app.core.database import Base
+from app.models import Simulation
+
+STATUSES = ["completed"] * 8 + ["failed", "pending"]
+INTERVENTIONS = ["lips", "cheeks", "chin", "botox_forehead"]
+LIST_INDEXES = [index for index in Simulation.__table__.indexes if index.name.startswith("ix_simulations_user_")]
+
+
+def seed(engine, rows: int, users: int, patients_per_user: int, batch_size: int = 50000) -> None:
+    """Insérer les simulations par lots"""
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, rows)):
+                user_id = rng.randrange(users) + 1
+                batch.append({
+                    "patient_id": (user_id - 1) * patients_per_user + rng.randrange(patients_per_user) + 1,
+                    "user_id": user_id,
+                    "original_image_path": f"uploads/{i}_original.jpg",
+                    "intervention_type": rng.choice(INTERVENTIONS),
+                    "dose": 1.0,
+                    "status": rng.choice(STATUSES),
+                    "progress": 100,
+                    "created_at": start + timedelta(seconds=i * 30),
+                })
+            connection.execute(Simulation.__table__.insert(), batch)
+
+
+def measure(session_factory, scenarios: dict, iterations: int) -> dict:
+    """Latences (ms) de la première page de chaque scénario"""
+    results = {}
+    for name, filters in scenarios.items():
+        db = session_factory()
+        timings = []
+        for i in range(iterations):
+            user_id, patient_id, status = filters(i)
+            started = time.perf_counter()
+            _simulation_list_query(db, user_id, patient_id, status).limit(50).all()
+            timings.append((time.perf_counter() - started) * 1000)
+            db.expunge_all()
+        db.close()
+        timings.sort()
+        results[name] = (statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)])
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark des listes de simulations")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--patients-per-user", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--unindexed-iterations", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=5.0, help="p95 maximal avec index")
+    parser.add_argument("--min-speedup", type=float, default=10.0, help="gain minimal sur la médiane")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_list_"))
+    engine = create_engine(f"sqlite:///{workdir / 'bench.db'}")
+    Base.metadata.create_all(bind=engine)
+    for index in LIST_INDEXES:
+        index.drop(bind=engine)
+
+    started = time.perf_counter()
+    seed(engine, args.rows, args.users, args.patients_per_user)
+    print(f"{args.rows} simulations insérées en {time.perf_counter() - started:.1f}s")
+
+    session_factory = sessionmaker(bind=engine)
+    users = args.users
+    scenarios = {
+        "praticien": lambda i: (i % users + 1, None, None),
+        "praticien+statut": lambda i: (i % users + 1, None, "failed"),
+        "praticien+patient": lambda i: (i % users + 1, (i % users) * args.patients_per_user + 1, None),
+    }
+
+    without = measure(session_factory, scenarios, args.unindexed_iterations)
+
+    started = time.perf_counter()
+    for index in LIST_INDEXES:
+        index.create(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    print(f"Index créés en {time.perf_counter() - started:.1f}s")
+
+    with_indexes = measure(session_factory, scenarios, args.iterations)
+
+    print(f"{'scénario':>18} {'sans index p50':>15} {'avec index p50':>15} {'p95':>8} {'gain':>8}")
+    failures = []
+    for name in scenarios:
+        slow_p50, _ = without[name]
+        fast_p50, fast_p95 = with_indexes[name]
+        speedup = slow_p50 / max(fast_p50, 1e-6)
+        print(f"{name:>18} {slow_p50:13.2f}ms {fast_p50:13.2f}ms {fast_p95:6.2f}ms {speedup:7.0f}x")
+        if fast_p95 > args.max_ms:
+            failures.append(f"{name}: p95 {fast_p95:.2f}ms > {args.max_ms}ms")
+        if speedup < args.min_speedup:
+            failures.append(f"{name}: gain {speedup:.1f}x < {args.min_speedup}x")
+
+    engine.dispose()
+    for path in workdir.iterdir():
+        path.unlink()
+    workdir.rmdir()
+
+    if failures:
+        print("ÉCHEC: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
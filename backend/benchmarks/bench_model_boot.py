@@ -0,0 +1,120 @@
+"""
+Benchmark du démarrage des workers : chargement des modèles IA
+
+Chaque mesure est un processus neuf qui charge les modèles réels
+(`AIGeneratorService._load_real_models`), comme un worker qui démarre :
+- "sans cache" : from_pretrained depuis le cache Hugging Face à chaque
+  démarrage (conversion de précision comprise) ;
+- "premier" : cache d'artefacts vide, chargement puis enregistrement ;
+- "cache" : démarrages suivants, poids safetensors relus par mmap.
+Les poids Hugging Face doivent déjà être téléchargés (ou accessibles).
+Nécessite torch, diffusers et controlnet_aux.
+
+Lancement:
+    python -m benchmarks.bench_model_boot --runs 3 --device cuda
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def child() -> None:
+    """Charger les modèles une fois et afficher la durée (processus mesuré)"""
+    started = time.perf_counter()
+    from app.services.ai_generator import ai_service
+    from app.services.model_artifacts import model_artifacts
+
+    imported = time.perf_counter()
+    asyncio.run(ai_service._load_real_models())
+    loaded = time.perf_counter()
+    print(json.dumps({
+        "import": imported - started,
+        "load": loaded - imported,
+        "artifacts": model_artifacts.stats(),
+    }))
+
+
+def run(env: dict) -> dict:
+    """Mesurer un démarrage dans un processus neuf"""
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_model_boot", "--child"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Chargement des modèles échoué:\n{result.stderr[-3000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du chargement des modèles au démarrage")
+    parser.add_argument("--runs", type=int, default=3, help="démarrages mesurés par mode")
+    parser.add_argument("--model", default=None, help="modèle Stable Diffusion (MODEL_NAME)")
+    parser.add_argument("--controlnet", default=None, help="modèle ControlNet (CONTROLNET_MODEL)")
+    parser.add_argument("--device", default="cpu", help="cpu ou cuda")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    try:
+        import controlnet_aux  # noqa: F401
+        import diffusers  # noqa: F401
+    except ImportError as e:
+        print(f"Benchmark impossible: {e} (torch, diffusers et controlnet_aux requis)")
+        sys.exit(1)
+
+    models_dir = Path(tempfile.mkdtemp(prefix="bench_models_"))
+    env = {
+        **os.environ,
+        "ENVIRONMENT": "production",
+        "MODELS_DIR": str(models_dir),
+        "DEVICE": args.device,
+        "USE_GPU": str(args.device == "cuda").lower(),
+    }
+    if args.model:
+        env["MODEL_NAME"] = args.model
+    if args.controlnet:
+        env["CONTROLNET_MODEL"] = args.controlnet
+
+    results = {}
+    results["sans cache"] = [run({**env, "MODEL_ARTIFACT_CACHE": "false"}) for _ in range(args.runs)]
+    results["premier"] = [run({**env, "MODEL_ARTIFACT_CACHE": "true"})]
+    results["cache"] = [run({**env, "MODEL_ARTIFACT_CACHE": "true"}) for _ in range(args.runs)]
+
+    artifacts = models_dir / "artifacts"
+    size_mb = sum(f.stat().st_size for f in artifacts.rglob("*") if f.is_file()) / (1024 * 1024)
+    print(f"Modèles: {args.model or 'défaut'} / {args.controlnet or 'défaut'} sur {args.device}, "
+          f"artefact {size_mb:.0f} Mo")
+    print(f"{'mode':>11} {'chargement':>11} {'min':>8} {'import':>8} {'hits':>5}")
+    for name, measures in results.items():
+        loads: List[float] = [m["load"] for m in measures]
+        print(f"{name:>11} {statistics.median(loads):10.2f}s {min(loads):7.2f}s "
+              f"{statistics.median(m['import'] for m in measures):7.2f}s "
+              f"{measures[-1]['artifacts']['hits']:5d}")
+
+    shutil.rmtree(models_dir, ignore_errors=True)
+
+    if results["cache"][-1]["artifacts"]["hits"] != 1:
+        print("ÉCHEC: l'artefact enregistré n'a pas été réutilisé")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark du préprocessing des images avant inférence
+
+Compare l'ancien chemin PIL (LANCZOS puis second redimensionnement aux
+multiples de 8) au chemin OpenCV/NumPy en une passe.
+
+Lancement:
+    python -m benchmarks.bench_preprocessing --iterations 50
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.utils.file_manager import ImageProcessor
+
+SIZES = [(1024, 768), (3024, 4032), (4000, 3000)]
+
+
+def legacy_preprocess(image: Image.Image, max_size: int) -> Image.Image:
+    """Ancien chemin : conversion, EXIF, LANCZOS puis second redimensionnement"""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_size:
+        ratio = max_size / max(image.size)
+        image = image.resize(tuple(int(dim * ratio) for dim in image.size), Image.Resampling.LANCZOS)
+    width, height = image.size
+    if (width // 8 * 8, height // 8 * 8) != image.size:
+        image = image.resize((width // 8 * 8, height // 8 * 8), Image.Resampling.LANCZOS)
+    return image
+
+
+def make_photo(width: int, height: int, orientation: int = 6) -> Image.Image:
+    """Image de test bruitée avec une orientation EXIF"""
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels, "RGB")
+    exif = image.getexif()
+    exif[0x0112] = orientation
+    image.info["exif"] = exif.tobytes()
+    return image
+
+
+def measure(func, image: Image.Image, max_size: int, iterations: int) -> float:
+    """Médiane du temps d'exécution en millisecondes"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(image, max_size)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du préprocessing")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--max-size", type=int, default=768)
+    args = parser.parse_args()
+
+    print(f"{'source':>12} {'PIL (ms)':>10} {'cv2 (ms)':>10} {'gain':>7}  sortie")
+    for width, height in SIZES:
+        image = make_photo(width, height)
+        legacy = measure(legacy_preprocess, image, args.max_size, args.iterations)
+        single_pass = measure(ImageProcessor.prepare_image_for_ai, image, args.max_size, args.iterations)
+        output = ImageProcessor.prepare_image_for_ai(image, args.max_size)
+        print(
+            f"{f'{width}x{height}':>12} {legacy:10.1f} {single_pass:10.1f} {legacy / single_pass:6.1f}x  "
+            f"{output.size[0]}x{output.size[1]}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Benchmark des écritures concurrentes sur SQLite
+
+Simule N simulations générées en parallèle (passage en cours, mises à jour
+d'avancement, finalisation avec comptabilité d'utilisation) pendant que des
+lecteurs interrogent la liste des simulations, comme le font les routes et
+les flux SSE. Compare :
+- "défaut" : configuration historique (journal rollback, écrivains concurrents) ;
+- "réglé" : WAL, synchronous=NORMAL, busy_timeout, mmap et écrivain unique
+  pour l'avancement.
+Échoue si le mode réglé rencontre une erreur "database is locked".
+
+Lancement:
+    python -m benchmarks.bench_sqlite_concurrency --simulations 32 --steps 40
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.simulations import _simulation_list_query
+from app.core.database import Base, configure_sqlite
+from app.models import Patient, Simulation, User
+from app.services.status_writer import StatusWriter
+from app.services.usage import usage_accounting
+
+
+def build_engine(path: Path, tuned: bool):
+    """Engine SQLite avec ou sans les réglages de l'application"""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if tuned:
+        configure_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def seed(engine, simulations: int) -> None:
+    """Un praticien, un patient et les simulations en attente"""
+    db = sessionmaker(bind=engine)()
+    user = User(username="bench", hashed_pin="x", full_name="Dr Bench",
+                speciality="dermatologie", license_number="LIC-BENCH")
+    patient = Patient(age_range="26-35", gender="F", skin_type="Claire")
+    db.add_all([user, patient])
+    db.flush()
+    db.add_all(
+        Simulation(patient_id=patient.id, user_id=user.id, original_image_path=f"uploads/{i}.jpg",
+                   intervention_type="lips", dose=1.0, status="pending")
+        for i in range(simulations)
+    )
+    db.commit()
+    db.close()
+
+
+class Run:
+    """État partagé d'une exécution (erreurs de verrou, latences d'écriture)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locked_errors = 0
+        self.other_errors = 0
+        self.write_ms = []
+        self.reads = 0
+        self.done = threading.Event()
+
+    def timed_write(self, write) -> None:
+        started = time.perf_counter()
+        try:
+            write()
+        except OperationalError as e:
+            with self.lock:
+                if "locked" in str(e):
+                    self.locked_errors += 1
+                else:
+                    self.other_errors += 1
+            return
+        with self.lock:
+            self.write_ms.append((time.perf_counter() - started) * 1000)
+
+
+def simulate(engine, run: Run, writer, simulation_id: int, steps: int, step_seconds: float) -> None:
+    """Cycle d'écriture d'une simulation"""
+    factory = sessionmaker(bind=engine)
+
+    def set_values(**values):
+        def write():
+            with factory() as session:
+                session.execute(update(Simulation).where(Simulation.id == simulation_id).values(**values))
+                session.commit()
+        return write
+
+    run.timed_write(set_values(status="processing", progress=0))
+    for step in range(1, steps + 1):
+        time.sleep(step_seconds)
+        values = {"progress": min(99, step * 100 // steps)}
+        if writer is None:
+            run.timed_write(set_values(**values))
+        else:
+            statement = update(Simulation).where(Simulation.id == simulation_id).values(**values)
+            run.timed_write(lambda: writer.write(engine, lambda session: session.execute(statement)))
+
+    def finalize():
+        with factory() as session:
+            simulation = session.get(Simulation, simulation_id)
+            simulation.mark_completed(steps * step_seconds)
+            usage_accounting.record_simulation(session, simulation.user_id, storage_mb=0.5,
+                                               processing_seconds=steps * step_seconds)
+            session.commit()
+
+    run.timed_write(finalize)
+
+
+def read(engine, run: Run) -> None:
+    """Lecteur : liste des simulations (routes, réconciliation SSE)"""
+    while not run.done.is_set():
+        try:
+            with Session(bind=engine) as session:
+                _simulation_list_query(session, 1).limit(50).all()
+            with run.lock:
+                run.reads += 1
+        except OperationalError as e:
+            with run.lock:
+                if "locked" in str(e):
+                    run.locked_errors += 1
+                else:
+                    run.other_errors += 1
+
+
+def execute(workdir: Path, tuned: bool, args) -> dict:
+    """Exécuter un scénario complet et retourner ses métriques"""
+    path = workdir / ("tuned.db" if tuned else "default.db")
+    engine = build_engine(path, tuned)
+    seed(engine, args.simulations)
+    writer = StatusWriter() if tuned else None
+    run = Run()
+
+    readers = [threading.Thread(target=read, args=(engine, run)) for _ in range(args.readers)]
+    workers = [
+        threading.Thread(target=simulate, args=(engine, run, writer, i + 1, args.steps, args.step_ms / 1000))
+        for i in range(args.simulations)
+    ]
+    started = time.perf_counter()
+    for thread in readers + workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    run.done.set()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if writer is not None:
+        writer.shutdown()
+    with Session(bind=engine) as session:
+        completed = session.query(Simulation).filter(Simulation.status == "completed").count()
+    engine.dispose()
+
+    timings = sorted(run.write_ms) or [0.0]
+    return {
+        "locked": run.locked_errors,
+        "errors": run.other_errors,
+        "completed": completed,
+        "elapsed": elapsed,
+        "reads": run.reads / elapsed,
+        "p50": statistics.median(timings),
+        "p95": timings[max(0, int(len(timings) * 0.95) - 1)],
+        "batches": writer.stats()["avg_batch"] if writer is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark des écritures concurrentes SQLite")
+    parser.add_argument("--simulations", type=int, default=32, help="simulations en parallèle")
+    parser.add_argument("--steps", type=int, default=40, help="mises à jour d'avancement par simulation")
+    parser.add_argument("--step-ms", type=float, default=10.0, help="durée d'une étape d'inférence")
+    parser.add_argument("--readers", type=int, default=4, help="lecteurs concurrents")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_sqlite_"))
+    results = {
+        "défaut": execute(workdir, False, args),
+        "réglé": execute(workdir, True, args),
+    }
+
+    print(f"{args.simulations} simulations × {args.steps} étapes, {args.readers} lecteurs")
+    print(f"{'mode':>8} {'verrous':>8} {'terminées':>10} {'durée':>8} {'lectures/s':>11} "
+          f"{'écr. p50':>9} {'écr. p95':>9} {'lot moyen':>10}")
+    for name, result in results.items():
+        batch = f"{result['batches']:.1f}" if result["batches"] is not None else "-"
+        print(f"{name:>8} {result['locked']:8d} {result['completed']:6d}/{args.simulations:<3d} "
+              f"{result['elapsed']:7.2f}s {result['reads']:11.0f} {result['p50']:7.1f}ms "
+              f"{result['p95']:7.1f}ms {batch:>10}")
+
+    for path in workdir.iterdir():
+        path.unlink()
+    workdir.rmdir()
+
+    tuned = results["réglé"]
+    if tuned["locked"] or tuned["errors"] or tuned["completed"] != args.simulations:
+        print(f"ÉCHEC: {tuned['locked']} erreur(s) de verrou, {tuned['errors']} autre(s), "
+              f"{tuned['completed']}/{args.simulations} simulations terminées")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
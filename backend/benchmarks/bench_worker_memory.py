@@ -0,0 +1,157 @@
+"""
+Benchmark mémoire des workers de génération
+
+Compare la mémoire de N workers d'inférence :
+- "indépendants" : chaque processus charge sa propre copie des poids
+  (comportement de plusieurs workers uvicorn ou `python -m app.worker`) ;
+- "préforkés" : le parent charge les poids une fois, les fige
+  (eval, sans gradients, gc.freeze) puis crée les workers par fork.
+Chaque worker exécute quelques inférences avant la mesure. Sont rapportés
+le RSS de chaque worker (qui compte les pages partagées), sa mémoire
+propre (USS, coût réel d'un worker supplémentaire) et le PSS total de
+l'ensemble des processus, lu dans /proc/<pid>/smaps_rollup (Linux).
+
+Par défaut les poids sont un réseau synthétique de `--weights-mb` Mo ;
+`--real` charge les vrais modèles via AIGeneratorService (diffusers requis,
+sans inférence).
+
+Lancement:
+    python -m benchmarks.bench_worker_memory --workers 4 --weights-mb 1024
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+from typing import Dict, List
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import torch
+
+from app.services.prefork import PreforkSupervisor, cpu_share, freeze_shared_state
+
+LAYER_SIZE = 1024
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """RSS, PSS et USS d'un processus (kB)"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def build_model(weights_mb: int) -> torch.nn.Module:
+    """Réseau synthétique d'environ `weights_mb` Mo de poids float32"""
+    layers = max(1, weights_mb * 1024 * 1024 // (LAYER_SIZE * LAYER_SIZE * 4))
+    return torch.nn.Sequential(*(torch.nn.Linear(LAYER_SIZE, LAYER_SIZE) for _ in range(layers)))
+
+
+def freeze(model: torch.nn.Module) -> torch.nn.Module:
+    """Mode inférence : poids en lecture seule"""
+    model.eval()
+    model.requires_grad_(False)
+    return model
+
+
+def infer(model: torch.nn.Module, steps: int) -> None:
+    """Quelques passes avant, comme des étapes de diffusion"""
+    with torch.inference_mode():
+        x = torch.randn(4, LAYER_SIZE)
+        for _ in range(steps):
+            model(x)
+
+
+def measure(mode: str, args) -> Dict[str, object]:
+    """Démarrer N workers, attendre leurs mesures et les arrêter"""
+    context = multiprocessing.get_context("fork")
+    reports = context.Queue()
+    release = context.Event()
+    shared = None
+
+    if mode == "préforkés":
+        if args.real:
+            from app.services.ai_generator import ai_service
+
+            asyncio.run(ai_service.initialize_models())
+            ai_service.prepare_for_fork()
+        else:
+            shared = freeze(build_model(args.weights_mb))
+            infer(shared, 1)
+        freeze_shared_state()
+
+    def serve(index: int) -> None:
+        torch.set_num_threads(cpu_share(args.workers))
+        if args.real:
+            from app.services.ai_generator import ai_service
+
+            if mode == "préforkés":
+                ai_service.after_fork()
+            else:
+                asyncio.run(ai_service.initialize_models())
+        else:
+            model = shared if shared is not None else freeze(build_model(args.weights_mb))
+            infer(model, args.steps)
+        reports.put((index, os.getpid(), memory_kb(os.getpid())))
+        release.wait(600)
+
+    supervisor = PreforkSupervisor(args.workers, serve, respawn=False)
+    supervisor.start()
+    workers = sorted(reports.get(timeout=1800) for _ in range(args.workers))
+    # Les mesures PSS sont relues une fois tous les workers présents
+    pss_total = memory_kb(os.getpid())["pss"] + sum(memory_kb(pid)["pss"] for _, pid, _ in workers)
+    release.set()
+    supervisor.wait()
+
+    return {
+        "parent_rss": memory_kb(os.getpid())["rss"],
+        "rss": [m["rss"] for _, _, m in workers],
+        "uss": [m["uss"] for _, _, m in workers],
+        "pss_total": pss_total,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark mémoire des workers préforkés")
+    parser.add_argument("--workers", type=int, default=4, help="workers d'inférence")
+    parser.add_argument("--weights-mb", type=int, default=512, help="taille des poids synthétiques")
+    parser.add_argument("--steps", type=int, default=20, help="inférences par worker avant mesure")
+    parser.add_argument("--real", action="store_true", help="vrais modèles (AIGeneratorService)")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("Benchmark impossible: /proc/<pid>/smaps_rollup indisponible (Linux requis)")
+        sys.exit(1)
+    if args.real:
+        os.environ["ENVIRONMENT"] = "production"
+
+    # Mode indépendant d'abord : le parent ne détient encore aucun poids
+    results = {mode: measure(mode, args) for mode in ("indépendants", "préforkés")}
+
+    label = "modèles réels" if args.real else f"poids synthétiques {args.weights_mb} Mo"
+    print(f"{args.workers} workers, {label}")
+    print(f"{'mode':>13} {'RSS/worker':>11} {'USS/worker':>11} {'PSS total':>10}")
+    for mode, result in results.items():
+        rss: List[int] = result["rss"]
+        uss: List[int] = result["uss"]
+        print(f"{mode:>13} {statistics.median(rss) / 1024:8.0f} Mo {statistics.median(uss) / 1024:8.0f} Mo "
+              f"{result['pss_total'] / 1024:7.0f} Mo")
+
+    independent, preforked = results["indépendants"], results["préforkés"]
+    saved = (independent["pss_total"] - preforked["pss_total"]) / 1024
+    print(f"Coût d'un worker supplémentaire: {statistics.median(independent['uss']) / 1024:.0f} Mo "
+          f"-> {statistics.median(preforked['uss']) / 1024:.0f} Mo ; mémoire totale économisée: {saved:.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
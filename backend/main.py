@@ -1,9 +1,9 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+import mimetypes
 import uuid
 import shutil
 from pathlib import Path
@@ -11,12 +11,20 @@ import logging
 import asyncio
 from datetime import datetime
 
-from database import get_db, create_tables, User, Patient, Simulation
+from database import get_db, create_tables, SessionLocal, User, Patient, Simulation
 from schemas import *
 from config import INTERVENTION_TYPES, UPLOAD_DIR
-from ai_generator import ai_generator
-from auth import create_access_token, verify_token, hash_pin, verify_pin
+from auth import create_access_token, verify_token
 from subscription_api import router as subscription_router
+from app.core.config import settings
+from app.services.ai_generator import ai_service
+from app.services.image_delivery import image_delivery
+from app.services.job_queue import job_queue
+from app.worker import SimulationWorker
+from app.services.pin_hashing import pin_hasher
+from app.services.principal_cache import principal_cache
+from app.utils.uploads import UploadSizeLimitMiddleware
+from migrate_db import upgrade_schema
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +36,9 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Refus des uploads trop volumineux avant l'analyse du formulaire
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -38,13 +49,15 @@ app.add_middleware(
 )
 
 # Servir les fichiers uploadés
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+if settings.public_uploads:
+    app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 # Inclure les routers
 app.include_router(subscription_router)
 
 # Sécurité
 security = HTTPBearer()
+principal_cache.register_model(User)
 
 
 @app.on_event("startup")
@@ -52,15 +65,31 @@ async def startup_event():
     """Initialisation au démarrage"""
     logger.info("Démarrage de l'application...")
 
-    # Créer les tables de base de données
+    # Schéma à jour (migrations Alembic) : le worker embarqué lit les modèles
+    # de app.models (séries, avancement...), absents des tables de create_all
+    await asyncio.to_thread(upgrade_schema)
     create_tables()
 
-    # Initialiser les modèles IA
-    await ai_generator.initialize()
+    # Worker embarqué, sur la même base que cette API : lui seul charge les
+    # modèles IA (en arrière-plan, l'API répond pendant le chargement). Sans
+    # lui, les processus de l'API ne gardent aucune copie des poids.
+    if settings.embedded_worker:
+        ai_service.load_models_in_background()
+        app.state.worker = SimulationWorker(session_factory=SessionLocal)
+        app.state.worker_task = asyncio.create_task(app.state.worker.run())
 
     logger.info("Application prête !")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arrêt propre du worker embarqué"""
+    worker = getattr(app.state, "worker", None)
+    if worker:
+        worker.stop()
+        app.state.worker_task.cancel()
+
+
 @app.get("/")
 async def root():
     """Point d'entrée de l'API"""
@@ -77,10 +106,21 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow(),
-        "ai_ready": ai_generator.pipeline is not None,
+        "ai_ready": ai_service.models_loaded,
     }
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Disponibilité : 503 tant que le worker embarqué n'a pas chargé les modèles IA"""
+    if not settings.embedded_worker:
+        # Modèles chargés par les workers dédiés (python -m app.worker)
+        return {"status": "ready", "models": "external"}
+    if not ai_service.models_loaded:
+        raise HTTPException(status_code=503, detail="Modèles IA en cours de chargement")
+    return {"status": "ready", "models": "fallback" if ai_service.using_fallback else "loaded"}
+
+
 @app.get("/version")
 async def get_version():
     """Obtenir la version de l'API"""
@@ -105,7 +145,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Nom d'utilisateur déjà utilisé")
 
     # Créer le nouvel utilisateur
-    hashed_pin = hash_pin(user_data.pin)
+    hashed_pin = await pin_hasher.hash(user_data.pin)
     db_user = User(
         username=user_data.username,
         hashed_pin=hashed_pin,
@@ -126,12 +166,21 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     """Connexion avec PIN"""
 
     user = db.query(User).filter(User.username == login_data.username).first()
-    if not user or not verify_pin(login_data.pin, user.hashed_pin):
+    if not user:
+        raise HTTPException(status_code=401, detail="Identifiants incorrects")
+
+    valid, new_hash = await pin_hasher.verify(login_data.pin, user.hashed_pin)
+    if not valid:
         raise HTTPException(status_code=401, detail="Identifiants incorrects")
 
     if not user.is_active:
         raise HTTPException(status_code=401, detail="Compte désactivé")
 
+    if new_hash is not None:
+        # Coût bcrypt modifié : hash recalculé de façon transparente
+        user.hashed_pin = new_hash
+        db.commit()
+
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -142,12 +191,16 @@ def get_current_user(
 ):
     """Obtenir l'utilisateur connecté"""
     payload = verify_token(credentials.credentials)
+    cached_user = principal_cache.lookup(credentials.credentials, db, User)
+    if cached_user is not None:
+        return cached_user
     username = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=401, detail="Token invalide")
     user = db.query(User).filter(User.username == username).first()
     if not user:
         raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    principal_cache.store(credentials.credentials, user, payload.get("exp"))
     return user
 
 
@@ -212,6 +265,15 @@ async def create_simulation(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient non trouvé")
 
+    # Refuser si la file de génération est saturée
+    retry_after = job_queue.admission_delay(db)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Trop de simulations en attente de génération, réessayez plus tard",
+            headers={"Retry-After": str(retry_after)},
+        )
+
     # Vérifier le type d'intervention
     if intervention_type not in INTERVENTION_TYPES:
         raise HTTPException(status_code=400, detail="Type d'intervention non supporté")
@@ -250,61 +312,15 @@ async def create_simulation(
     db.commit()
     db.refresh(db_simulation)
 
-    # Lancer la génération IA en arrière-plan
-    asyncio.create_task(
-        process_simulation(
-            db_simulation.id, str(original_path), intervention_type, dose
-        )
+    # Mettre la génération en file (traitée par un worker)
+    generated_filename = Path(original_filename.replace("original_", "generated_", 1)).with_suffix(".jpg").name
+    job_queue.enqueue(
+        db, db_simulation.id, payload={"output_filename": generated_filename}
     )
 
     return db_simulation
 
 
-async def process_simulation(
-    simulation_id: int, image_path: str, intervention_type: str, dose: float
-):
-    """Traiter la simulation IA en arrière-plan"""
-
-    # Obtenir une nouvelle session DB pour cette tâche
-    from database import SessionLocal
-
-    db = SessionLocal()
-
-    try:
-        # Récupérer la simulation
-        simulation = db.query(Simulation).filter(Simulation.id == simulation_id).first()
-        if not simulation:
-            return
-
-        # Générer l'image avec l'IA
-        generated_path, generation_time = (
-            await ai_generator.generate_aesthetic_simulation(
-                image_path, intervention_type, dose
-            )
-        )
-
-        # Mettre à jour la simulation
-        simulation.generated_image_path = generated_path
-        simulation.generation_time = generation_time
-        simulation.status = "completed"
-        simulation.completed_at = datetime.utcnow()
-
-        db.commit()
-        logger.info(f"Simulation {simulation_id} terminée en {generation_time:.2f}s")
-
-    except Exception as e:
-        logger.error(f"Erreur lors du traitement de la simulation {simulation_id}: {e}")
-
-        # Marquer comme échouée
-        simulation = db.query(Simulation).filter(Simulation.id == simulation_id).first()
-        if simulation:
-            simulation.status = "failed"
-            db.commit()
-
-    finally:
-        db.close()
-
-
 @app.get("/simulations/{simulation_id}", response_model=SimulationResponse)
 async def get_simulation(
     simulation_id: int,
@@ -343,14 +359,15 @@ async def list_simulations(
 
 
 @app.get("/images/{filename}")
-async def get_image(filename: str, current_user: User = Depends(get_current_user)):
-    """Servir une image de manière sécurisée"""
+async def get_image(filename: str, request: Request, current_user: User = Depends(get_current_user)):
+    """Servir une image de manière sécurisée (ETag, 304, plages, X-Accel-Redirect)"""
 
     file_path = UPLOAD_DIR / filename
-    if not file_path.exists():
+    if file_path.resolve().parent != UPLOAD_DIR.resolve() or not file_path.is_file():
         raise HTTPException(status_code=404, detail="Image non trouvée")
 
-    return FileResponse(file_path)
+    media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+    return await image_delivery.respond(request, file_path, media_type, root=UPLOAD_DIR)
 
 
 if __name__ == "__main__":
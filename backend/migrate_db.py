@@ -1,6 +1,19 @@
 """
-Script de migration pour ajouter les tables d'abonnement
+Script de migration de la base de données
+
+Applique les migrations Alembic (`alembic upgrade head`) puis crée un
+abonnement freemium pour les utilisateurs qui n'en ont pas encore.
 """
+import tempfile
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+from alembic import command
+from alembic.config import Config
 from sqlalchemy import create_engine, text
 from database import DATABASE_URL
 import logging
@@ -8,69 +21,42 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def migrate_database():
-    """Migrer la base de données pour ajouter les nouvelles tables"""
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    
+ALEMBIC_INI = Path(__file__).resolve().parent / "alembic.ini"
+MIGRATION_LOCK = Path(tempfile.gettempdir()) / "aestheticai-migrations.lock"
+
+
+def alembic_config(database_url: str = DATABASE_URL) -> Config:
+    """Configuration Alembic pointant sur la base donnée"""
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    config.set_main_option("sqlalchemy.url", database_url)
+    return config
+
+
+def upgrade_schema(database_url: str = DATABASE_URL) -> None:
+    """
+    Amener le schéma à la dernière révision (`alembic upgrade head`)
+
+    Appelé au démarrage de l'API : les processus uvicorn démarrent
+    ensemble, un verrou de fichier sérialise les migrations. La
+    configuration des logs de l'application est conservée.
+    """
+    config = alembic_config(database_url)
+    config.attributes["configure_logger"] = False
+    with open(MIGRATION_LOCK, "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        command.upgrade(config, "head")
+
+
+def migrate_database(database_url: str = DATABASE_URL):
+    """Migrer la base de données jusqu'à la dernière révision"""
     try:
-        logger.info("Création des nouvelles tables d'abonnement...")
+        logger.info("Application des migrations Alembic...")
+        upgrade_schema(database_url)
         
-        # Créer les tables manuellement avec SQL
+        engine = create_engine(database_url, connect_args={"check_same_thread": False})
         with engine.connect() as conn:
-            # Table subscriptions
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS subscriptions (
-                    id INTEGER PRIMARY KEY,
-                    user_id INTEGER UNIQUE,
-                    tier TEXT DEFAULT 'freemium',
-                    start_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    end_date DATETIME,
-                    is_active BOOLEAN DEFAULT 1,
-                    auto_renew BOOLEAN DEFAULT 1,
-                    monthly_simulations_limit INTEGER DEFAULT 5,
-                    storage_limit_mb INTEGER DEFAULT 100,
-                    advanced_ai_features BOOLEAN DEFAULT 0,
-                    priority_support BOOLEAN DEFAULT 0,
-                    white_label BOOLEAN DEFAULT 0,
-                    stripe_subscription_id TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(user_id) REFERENCES users(id)
-                )
-            """))
-            
-            # Table payments
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS payments (
-                    id INTEGER PRIMARY KEY,
-                    subscription_id INTEGER,
-                    amount REAL,
-                    currency TEXT DEFAULT 'EUR',
-                    status TEXT DEFAULT 'pending',
-                    payment_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    stripe_payment_id TEXT,
-                    invoice_url TEXT,
-                    FOREIGN KEY(subscription_id) REFERENCES subscriptions(id)
-                )
-            """))
-            
-            # Table usage_stats
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS usage_stats (
-                    id INTEGER PRIMARY KEY,
-                    user_id INTEGER,
-                    month INTEGER,
-                    year INTEGER,
-                    simulations_count INTEGER DEFAULT 0,
-                    storage_used_mb REAL DEFAULT 0.0,
-                    ai_processing_time_seconds REAL DEFAULT 0.0,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(user_id) REFERENCES users(id)
-                )
-            """))
-            
-            conn.commit()
-            
             # Créer des abonnements freemium pour tous les utilisateurs existants
             result = conn.execute(text("SELECT id FROM users"))
             users = result.fetchall()
@@ -87,6 +73,7 @@ def migrate_database():
                     logger.info(f"Abonnement freemium créé pour l'utilisateur {user_id}")
             
             conn.commit()
+        engine.dispose()
             
         logger.info("Migration terminée avec succès!")
             
@@ -0,0 +1,51 @@
+"""
+Utilitaires des migrations
+
+Les bases existantes ont été créées par `create_all` ou `migrate_db.py`
+avant l'introduction d'Alembic : les opérations vérifient l'état réel du
+schéma pour que `alembic upgrade head` soit sans effet sur ce qui existe déjà.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def has_table(table: str) -> bool:
+    """La table existe-t-elle ?"""
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    """La colonne existe-t-elle ?"""
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def has_index(table: str, index: str) -> bool:
+    """L'index existe-t-il ?"""
+    return any(i["name"] == index for i in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def create_index(index: str, table: str, columns, unique: bool = False) -> None:
+    """Créer un index s'il n'existe pas"""
+    if not has_index(table, index):
+        op.create_index(index, table, columns, unique=unique)
+
+
+def drop_index(index: str, table: str) -> None:
+    """Supprimer un index s'il existe"""
+    if has_index(table, index):
+        op.drop_index(index, table_name=table)
+
+
+def add_column(table: str, column: sa.Column) -> None:
+    """Ajouter une colonne si elle n'existe pas"""
+    if not has_column(table, column.name):
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(column)
+
+
+def drop_column(table: str, column: str) -> None:
+    """Supprimer une colonne si elle existe"""
+    if has_column(table, column):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
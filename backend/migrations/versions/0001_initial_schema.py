@@ -0,0 +1,120 @@
+"""
+Schéma initial (utilisateurs, patients, simulations, abonnements)
+
+Reprend les tables créées jusqu'ici par `create_all` et `migrate_db.py` ;
+les tables déjà présentes sont conservées telles quelles.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_table
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("hashed_pin", sa.String(), nullable=False),
+            sa.Column("full_name", sa.String(), nullable=False),
+            sa.Column("speciality", sa.String(), nullable=False),
+            sa.Column("license_number", sa.String(), nullable=False, unique=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.true()),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if not has_table("patients"):
+        op.create_table(
+            "patients",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("anonymous_id", sa.String(), nullable=False, unique=True),
+            sa.Column("age_range", sa.String(), nullable=False),
+            sa.Column("gender", sa.String(), nullable=False),
+            sa.Column("skin_type", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        )
+        op.create_index("ix_patients_id", "patients", ["id"])
+
+    if not has_table("simulations"):
+        op.create_table(
+            "simulations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("original_image_path", sa.String(), nullable=False),
+            sa.Column("generated_image_path", sa.String(), nullable=True),
+            sa.Column("intervention_type", sa.String(), nullable=False),
+            sa.Column("dose", sa.Float(), nullable=False),
+            sa.Column("parameters", sa.Text(), nullable=True),
+            sa.Column("model_version", sa.String(), nullable=True),
+            sa.Column("generation_time", sa.Float(), nullable=True),
+            sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_simulations_id", "simulations", ["id"])
+
+    # Tables d'abonnement (anciennement créées par migrate_db.py)
+    if not has_table("subscriptions"):
+        op.create_table(
+            "subscriptions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+            sa.Column("tier", sa.String(), server_default="freemium"),
+            sa.Column("start_date", sa.DateTime(), server_default=sa.func.current_timestamp()),
+            sa.Column("end_date", sa.DateTime()),
+            sa.Column("is_active", sa.Boolean(), server_default=sa.true()),
+            sa.Column("auto_renew", sa.Boolean(), server_default=sa.true()),
+            sa.Column("monthly_simulations_limit", sa.Integer(), server_default="5"),
+            sa.Column("storage_limit_mb", sa.Integer(), server_default="100"),
+            sa.Column("advanced_ai_features", sa.Boolean(), server_default=sa.false()),
+            sa.Column("priority_support", sa.Boolean(), server_default=sa.false()),
+            sa.Column("white_label", sa.Boolean(), server_default=sa.false()),
+            sa.Column("stripe_subscription_id", sa.String()),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.current_timestamp()),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.current_timestamp()),
+        )
+
+    if not has_table("payments"):
+        op.create_table(
+            "payments",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("subscription_id", sa.Integer(), sa.ForeignKey("subscriptions.id")),
+            sa.Column("amount", sa.Float()),
+            sa.Column("currency", sa.String(), server_default="EUR"),
+            sa.Column("status", sa.String(), server_default="pending"),
+            sa.Column("payment_date", sa.DateTime(), server_default=sa.func.current_timestamp()),
+            sa.Column("stripe_payment_id", sa.String()),
+            sa.Column("invoice_url", sa.String()),
+        )
+
+    if not has_table("usage_stats"):
+        op.create_table(
+            "usage_stats",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("month", sa.Integer()),
+            sa.Column("year", sa.Integer()),
+            sa.Column("simulations_count", sa.Integer(), server_default="0"),
+            sa.Column("storage_used_mb", sa.Float(), server_default="0"),
+            sa.Column("ai_processing_time_seconds", sa.Float(), server_default="0"),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.current_timestamp()),
+        )
+
+
+def downgrade() -> None:
+    for table in ("usage_stats", "payments", "subscriptions", "simulations", "patients", "users"):
+        op.drop_table(table)
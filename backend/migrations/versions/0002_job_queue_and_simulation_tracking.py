@@ -0,0 +1,90 @@
+"""
+File de travaux, séries de doses, avancement et comptabilité d'utilisation
+
+- table simulation_jobs (file persistante des générations)
+- simulations.sweep_id, progress et preview_image_path
+- index unique (user_id, year, month) de usage_stats, cible des upserts ;
+  les lignes en double (ancienne comptabilité lecture puis insertion) sont
+  d'abord fusionnées en additionnant leurs compteurs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, create_index, drop_column, drop_index, has_index, has_table
+
+USAGE_COUNTERS = ("simulations_count", "storage_used_mb", "ai_processing_time_seconds")
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not has_table("simulation_jobs"):
+        op.create_table(
+            "simulation_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("simulation_id", sa.Integer(), sa.ForeignKey("simulations.id"), nullable=False),
+            sa.Column("kind", sa.String(), nullable=False, server_default="simulation"),
+            sa.Column("payload", sa.Text(), nullable=True),
+            sa.Column("status", sa.String(), nullable=False, server_default="queued"),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"),
+            sa.Column("available_at", sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+            sa.Column("lease_owner", sa.String(), nullable=True),
+            sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+        )
+    create_index("ix_simulation_jobs_id", "simulation_jobs", ["id"])
+    create_index("ix_simulation_jobs_simulation_id", "simulation_jobs", ["simulation_id"])
+    create_index("ix_simulation_jobs_status_available_at", "simulation_jobs", ["status", "available_at"])
+
+    add_column("simulations", sa.Column("sweep_id", sa.String(), nullable=True))
+    add_column("simulations", sa.Column("progress", sa.Integer(), nullable=False, server_default="0"))
+    add_column("simulations", sa.Column("preview_image_path", sa.String(), nullable=True))
+    create_index("ix_simulations_sweep_id", "simulations", ["sweep_id"])
+
+    if not has_index("usage_stats", "ix_usage_stats_user_period"):
+        merge_duplicate_usage_rows()
+        create_index("ix_usage_stats_user_period", "usage_stats", ["user_id", "year", "month"], unique=True)
+
+
+def merge_duplicate_usage_rows() -> None:
+    """Fusionner les lignes d'un même utilisateur et d'un même mois dans la plus ancienne"""
+    period = "user_id IS NOT NULL AND year IS NOT NULL AND month IS NOT NULL"
+    same_period = (
+        "duplicate.user_id = usage_stats.user_id "
+        "AND duplicate.year = usage_stats.year AND duplicate.month = usage_stats.month"
+    )
+    totals = ", ".join(
+        f"{counter} = (SELECT SUM(COALESCE(duplicate.{counter}, 0)) "
+        f"FROM usage_stats AS duplicate WHERE {same_period})"
+        for counter in USAGE_COUNTERS
+    )
+    op.execute(
+        f"UPDATE usage_stats SET {totals} WHERE id IN ("
+        f"SELECT MIN(id) FROM usage_stats WHERE {period} "
+        "GROUP BY user_id, year, month HAVING COUNT(*) > 1)"
+    )
+    op.execute(
+        f"DELETE FROM usage_stats WHERE {period} AND id NOT IN ("
+        f"SELECT MIN(id) FROM usage_stats WHERE {period} GROUP BY user_id, year, month)"
+    )
+
+
+def downgrade() -> None:
+    drop_index("ix_usage_stats_user_period", "usage_stats")
+    drop_index("ix_simulations_sweep_id", "simulations")
+    for column in ("preview_image_path", "progress", "sweep_id"):
+        drop_column("simulations", column)
+    if has_table("simulation_jobs"):
+        op.drop_table("simulation_jobs")
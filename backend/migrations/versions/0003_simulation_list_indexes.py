@@ -0,0 +1,34 @@
+"""
+Index composites des listes de simulations
+
+Les listes filtrent par praticien (et statut ou patient) et trient par
+date de création : chaque combinaison est servie par un parcours d'index
+sans tri ni lecture de la table entière.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from migrations.helpers import create_index, drop_index
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_simulations_user_created": ["user_id", "created_at"],
+    "ix_simulations_user_status_created": ["user_id", "status", "created_at"],
+    "ix_simulations_user_patient_created": ["user_id", "patient_id", "created_at"],
+}
+
+
+def upgrade() -> None:
+    for index, columns in INDEXES.items():
+        create_index(index, "simulations", columns)
+
+
+def downgrade() -> None:
+    for index in INDEXES:
+        drop_index(index, "simulations")
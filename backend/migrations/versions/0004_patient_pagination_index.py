@@ -0,0 +1,22 @@
+"""
+Index de pagination par curseur des patients
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from migrations.helpers import create_index, drop_index
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index("ix_patients_created_id", "patients", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    drop_index("ix_patients_created_id", "patients")
@@ -0,0 +1,24 @@
+"""
+Déclinaisons des images de simulation (miniature, moyenne, pleine taille)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, drop_column
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    add_column("simulations", sa.Column("renditions", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    drop_column("simulations", "renditions")
@@ -0,0 +1,24 @@
+"""
+Cause de l'échec des simulations (délai d'inférence dépassé, erreur du pipeline)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, drop_column
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    add_column("simulations", sa.Column("failure_reason", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    drop_column("simulations", "failure_reason")
@@ -8,11 +8,13 @@ import os
 
 from database import get_db, User
 from subscription_models import (
-    Subscription, Payment, UsageStats, 
+    Subscription, Payment, 
     SubscriptionTier, PaymentStatus,
     get_subscription_limits, check_usage_limits
 )
 from auth import verify_token
+from app.services.principal_cache import principal_cache
+from app.services.usage import usage_accounting
 from schemas import *
 
 # Configuration Stripe
@@ -21,18 +23,25 @@ stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_votre_cle_stripe")
 # Sécurité
 security = HTTPBearer()
 
+# Invalidation du cache d'authentification à chaque modification d'un utilisateur
+principal_cache.register_model(User)
+
 def get_current_user_from_credentials(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     """Helper pour obtenir l'utilisateur actuel depuis le token"""
     payload = verify_token(credentials.credentials)
+    cached_user = principal_cache.lookup(credentials.credentials, db, User)
+    if cached_user is not None:
+        return cached_user
     username = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=401, detail="Token invalide")
     current_user = db.query(User).filter(User.username == username).first()
     if not current_user:
         raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    principal_cache.store(credentials.credentials, current_user, payload.get("exp"))
     return current_user
 
 router = APIRouter(prefix="/subscription", tags=["subscription"])
@@ -92,25 +101,8 @@ async def get_current_subscription(
         }
     }
     
-    # Obtenir les statistiques d'utilisation
-    current_month = datetime.utcnow().month
-    current_year = datetime.utcnow().year
-    
-    usage = db.query(UsageStats).filter(
-        UsageStats.user_id == current_user.id,
-        UsageStats.month == current_month,
-        UsageStats.year == current_year
-    ).first()
-    
-    if not usage:
-        usage = UsageStats(
-            user_id=current_user.id,
-            month=current_month,
-            year=current_year
-        )
-        db.add(usage)
-        db.commit()
-        db.refresh(usage)
+    # Obtenir les statistiques d'utilisation (compteurs tenus par la comptabilité d'utilisation)
+    usage = usage_accounting.current_usage(db, current_user.id)
     
     limits = get_subscription_limits(subscription.tier)
     usage_check = check_usage_limits(current_user.id, db)
@@ -125,9 +117,9 @@ async def get_current_subscription(
         },
         "limits": limits,
         "usage": {
-            "simulations_count": usage.simulations_count,
-            "storage_used_mb": usage.storage_used_mb,
-            "ai_processing_time": usage.ai_processing_time_seconds
+            "simulations_count": usage["simulations_count"],
+            "storage_used_mb": usage["storage_used_mb"],
+            "ai_processing_time": usage["ai_processing_time_seconds"]
         },
         "usage_check": usage_check
     }
@@ -227,25 +219,19 @@ async def get_usage_statistics(
     db: Session = Depends(get_db)
 ):
     """Obtenir les statistiques d'utilisation détaillées"""
-    # Obtenir les 12 derniers mois
-    stats = []
-    for i in range(12):
-        date = datetime.utcnow() - timedelta(days=30 * i)
-        usage = db.query(UsageStats).filter(
-            UsageStats.user_id == current_user.id,
-            UsageStats.month == date.month,
-            UsageStats.year == date.year
-        ).first()
-        
-        stats.append({
-            "month": date.month,
-            "year": date.year,
-            "simulations": usage.simulations_count if usage else 0,
-            "storage_mb": usage.storage_used_mb if usage else 0,
-            "processing_time": usage.ai_processing_time_seconds if usage else 0
-        })
+    # 12 derniers mois (ordre chronologique) en une seule requête
+    stats = [
+        {
+            "month": usage["month"],
+            "year": usage["year"],
+            "simulations": usage["simulations_count"],
+            "storage_mb": usage["storage_used_mb"],
+            "processing_time": usage["ai_processing_time_seconds"]
+        }
+        for usage in usage_accounting.history(db, current_user.id, months=12)
+    ]
     
-    return {"usage_history": stats[::-1]}  # Inverser pour ordre chronologique
+    return {"usage_history": stats}
 
 @router.post("/cancel")
 async def cancel_subscription(
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Text, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy import create_engine
@@ -88,6 +88,10 @@ class Payment(Base):
 
 class UsageStats(Base):
     __tablename__ = "usage_stats"
+    __table_args__ = (
+        # Une ligne par utilisateur et par mois (cible des upserts de comptabilité)
+        Index("ix_usage_stats_user_period", "user_id", "year", "month", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -225,20 +229,14 @@ def check_usage_limits(user_id: int, db_session) -> dict:
         return {"allowed": False, "reason": "Abonnement expiré"}
     
     # Vérifier les simulations mensuelles
-    current_month = datetime.utcnow().month
-    current_year = datetime.utcnow().year
-    
-    usage = db_session.query(UsageStats).filter(
-        UsageStats.user_id == user_id,
-        UsageStats.month == current_month,
-        UsageStats.year == current_year
-    ).first()
-    
-    if usage:
-        if limits["monthly_simulations"] != -1 and usage.simulations_count >= limits["monthly_simulations"]:
-            return {"allowed": False, "reason": f"Limite mensuelle atteinte ({limits['monthly_simulations']} simulations)"}
-        
-        if limits["storage_mb"] != -1 and usage.storage_used_mb >= limits["storage_mb"]:
-            return {"allowed": False, "reason": f"Limite de stockage atteinte ({limits['storage_mb']} MB)"}
-    
-    return {"allowed": True, "remaining_simulations": limits["monthly_simulations"] - (usage.simulations_count if usage else 0) if limits["monthly_simulations"] != -1 else -1}
+    # Compteurs servis par le cache en mémoire (une requête au plus par période de cache)
+    from app.services.usage import usage_accounting
+    usage = usage_accounting.current_usage(db_session, user_id)
+    
+    if limits["monthly_simulations"] != -1 and usage["simulations_count"] >= limits["monthly_simulations"]:
+        return {"allowed": False, "reason": f"Limite mensuelle atteinte ({limits['monthly_simulations']} simulations)"}
+    
+    if limits["storage_mb"] != -1 and usage["storage_used_mb"] >= limits["storage_mb"]:
+        return {"allowed": False, "reason": f"Limite de stockage atteinte ({limits['storage_mb']} MB)"}
+    
+    return {"allowed": True, "remaining_simulations": limits["monthly_simulations"] - usage["simulations_count"] if limits["monthly_simulations"] != -1 else -1}
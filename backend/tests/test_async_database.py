@@ -0,0 +1,93 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import (
+    Base, DatabaseSession, _engine_options, async_database_url, create_async_engine_for
+)
+from app.models import Patient
+
+
+class TestAsyncDatabaseConfiguration:
+
+    def test_async_driver_urls(self):
+        """Chaque dialecte est associé à son pilote asynchrone"""
+        assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+        assert async_database_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+        with pytest.raises(ValueError):
+            async_database_url("mysql://u:p@db/app")
+
+    def test_pool_options_only_for_server_databases(self):
+        """Le dimensionnement du pool ne s'applique pas à SQLite"""
+        sqlite_options = _engine_options("sqlite:///./app.db")
+        assert "pool_size" not in sqlite_options
+        assert sqlite_options["pool_pre_ping"] is True
+
+        postgres_options = _engine_options("postgresql://u:p@db/app")
+        assert postgres_options["pool_size"] > 0
+        assert postgres_options["pool_recycle"] > 0
+        assert postgres_options["query_cache_size"] > 0
+
+
+class TestDatabaseSession:
+
+    def test_sync_session_runs_outside_event_loop_thread(self):
+        """Sans pilote asynchrone, les requêtes sont déportées dans un thread"""
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        db = DatabaseSession(sessionmaker(bind=engine)())
+
+        def count(session):
+            return threading.get_ident(), session.query(Patient).count()
+
+        async def scenario():
+            return threading.get_ident(), await db.run(count)
+
+        loop_thread, (query_thread, total) = asyncio.run(scenario())
+        asyncio.run(db.close())
+        engine.dispose()
+
+        assert total == 0
+        assert query_thread != loop_thread
+
+    def test_async_session_shares_orm_code(self, tmp_path):
+        """Le même code ORM s'exécute sur une AsyncSession (aiosqlite)"""
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        engine = create_async_engine_for(f"sqlite:///{tmp_path / 'async.db'}")
+
+        def create_patient(session):
+            patient = Patient(age_range="26-35", gender="F", skin_type="Claire")
+            session.add(patient)
+            session.commit()
+            return patient.id
+
+        async def scenario():
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+            db = DatabaseSession(async_sessionmaker(bind=engine, expire_on_commit=False)())
+            try:
+                assert db.is_async
+                patient_id = await db.run(create_patient)
+                found = await db.run(lambda session: session.get(Patient, patient_id))
+                return patient_id, found.skin_type
+            finally:
+                await db.close()
+                await engine.dispose()
+
+        patient_id, skin_type = asyncio.run(scenario())
+        assert patient_id == 1
+        assert skin_type == "Claire"
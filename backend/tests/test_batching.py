@@ -0,0 +1,223 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.services.ai_generator import AIGeneratorService, MockStableDiffusionPipeline
+from app.services.batching import InferenceBatcher
+from app.services.control_cache import ControlImageCache
+from app.services.inference_scheduler import InferenceScheduler
+
+
+class RecordingPipeline(MockStableDiffusionPipeline):
+    """Pipeline mock qui enregistre les appels reçus"""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append(kwargs)
+        if self.fail:
+            raise RuntimeError("pipeline en erreur")
+        return super().__call__(*args, **kwargs)
+
+
+class SteppingPipeline(MockStableDiffusionPipeline):
+    """Pipeline mock dont chaque étape de diffusion prend 20 ms"""
+
+    def __init__(self):
+        self.steps_run = 0
+
+    def __call__(self, *args, **kwargs):
+        callback = kwargs.get("callback_on_step_end")
+        for step in range(kwargs.get("num_inference_steps", 1)):
+            time.sleep(0.02)
+            self.steps_run += 1
+            if callback is not None:
+                callback(self, step, 1000 - step, {})
+        return super().__call__(prompt=kwargs.get("prompt"))
+
+
+@pytest.fixture
+def service():
+    service = AIGeneratorService()
+    asyncio.run(service.initialize_models())
+    return service
+
+
+def make_batcher(service, pipeline, max_batch_size=4, max_wait_ms=20):
+    service.pipeline = pipeline
+    return InferenceBatcher(
+        service._run_pipeline_batch,
+        executor=service.executor,
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+    )
+
+
+class TestInferenceBatcher:
+
+    def test_compatible_requests_share_one_call(self, service):
+        """Les requêtes compatibles sont exécutées en un seul appel"""
+        pipeline = RecordingPipeline()
+        batcher = make_batcher(service, pipeline)
+        control = Image.new("L", (512, 512), color=128)
+
+        async def run():
+            return await asyncio.gather(*(
+                batcher.submit(f"prompt {i}", control, 20, 7.5) for i in range(3)
+            ))
+
+        images = asyncio.run(run())
+
+        assert len(images) == 3
+        assert len(pipeline.calls) == 1
+        assert pipeline.calls[0]["prompt"] == ["prompt 0", "prompt 1", "prompt 2"]
+        assert len(pipeline.calls[0]["generator"]) == 3
+
+    def test_incompatible_requests_are_split(self, service):
+        """Des tailles ou nombres d'étapes différents donnent des lots séparés"""
+        pipeline = RecordingPipeline()
+        batcher = make_batcher(service, pipeline)
+
+        async def run():
+            return await asyncio.gather(
+                batcher.submit("a", Image.new("L", (512, 512)), 20, 7.5),
+                batcher.submit("b", Image.new("L", (512, 768)), 20, 7.5),
+                batcher.submit("c", Image.new("L", (512, 512)), 30, 7.5),
+            )
+
+        asyncio.run(run())
+        assert len(pipeline.calls) == 3
+
+    def test_full_batch_is_dispatched_immediately(self, service):
+        """Un lot complet part sans attendre la fin de la fenêtre"""
+        pipeline = RecordingPipeline()
+        batcher = make_batcher(service, pipeline, max_batch_size=2, max_wait_ms=10_000)
+        control = Image.new("L", (512, 512))
+
+        async def run():
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.submit("a", control, 20, 7.5), batcher.submit("b", control, 20, 7.5)),
+                timeout=5,
+            )
+
+        assert len(asyncio.run(run())) == 2
+        assert batcher.stats["max_batch_size_seen"] == 2
+
+    def test_errors_fan_out_to_all_callers(self, service):
+        """Une erreur du pipeline est propagée à chaque appelant du lot"""
+        batcher = make_batcher(service, RecordingPipeline(fail=True))
+        control = Image.new("L", (512, 512))
+
+        async def run():
+            return await asyncio.gather(
+                batcher.submit("a", control, 20, 7.5),
+                batcher.submit("b", control, 20, 7.5),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+
+class TestDoseSweep:
+
+    def test_sweep_shares_preprocessing_and_one_call(self, service, tmp_path):
+        """Une série de doses ne calcule qu'une fois les contours et n'appelle qu'une fois le pipeline"""
+        pipeline = RecordingPipeline()
+        service.pipeline = pipeline
+        service.result_cache = None
+        service.control_cache = ControlImageCache(memory_bytes=10 * 1024 * 1024, persist=False)
+        canny_calls = []
+        service.canny_detector = lambda image: canny_calls.append(image.size) or image.convert("L")
+        source = Image.new("RGB", (512, 512), color="red")
+
+        results = asyncio.run(service.generate_dose_sweep(source, "lips", [1.0, 2.5, 4.5], source_hash="abc"))
+
+        assert [metadata["dose"] for _, metadata in results] == [1.0, 2.5, 4.5]
+        assert len(pipeline.calls) == 1
+        assert len(pipeline.calls[0]["prompt"]) == 3
+        assert len(canny_calls) == 1
+
+    def test_abandoned_sweep_releases_its_scheduler_slot(self, service):
+        """Des séries abandonnées en file (délai du travail) ne s'exécutent pas et rendent leur place"""
+        pipeline = RecordingPipeline()
+        service.result_cache = None
+        service.control_cache = ControlImageCache(memory_bytes=10 * 1024 * 1024, persist=False)
+        service.canny_detector = lambda image: image.convert("L")
+        scheduler = InferenceScheduler(device="cpu", concurrency=1, max_pending=3)
+        service.executor = scheduler
+        service.batcher = make_batcher(service, pipeline)
+        service.batcher.executor = scheduler
+        source = Image.new("RGB", (512, 512), color="red")
+        release = threading.Event()
+        busy = scheduler.submit(release.wait, 5)
+
+        async def run():
+            for _ in range(3):
+                with pytest.raises(TimeoutError):
+                    async with asyncio.timeout(0.1):
+                        await service.generate_dose_sweep(source, "lips", [1.0, 2.5], source_hash="abc")
+            release.set()
+            while scheduler.stats()["pending"] or scheduler.stats()["running"]:
+                await asyncio.sleep(0.01)
+            return await service.generate_dose_sweep(source, "lips", [1.0, 2.5], source_hash="abc")
+
+        results = asyncio.run(run())
+        scheduler.shutdown()
+        assert busy.result(5) is True
+        assert len(results) == 2
+        # Les séries abandonnées s'arrêtent avant la première étape
+        assert len(pipeline.calls) == 1
+        assert scheduler.stats()["rejected"] == 0
+
+
+    def test_running_sweep_stops_when_caller_leaves(self, service, monkeypatch):
+        """Une série en cours s'arrête à l'étape suivante quand le travail est abandonné"""
+        monkeypatch.setattr(settings, "inference_steps", 200)
+        monkeypatch.setattr(settings, "max_inference_time", 0)
+        pipeline = SteppingPipeline()
+        service.pipeline = pipeline
+        service.result_cache = None
+        service.control_cache = ControlImageCache(memory_bytes=10 * 1024 * 1024, persist=False)
+        service.canny_detector = lambda image: image.convert("L")
+        source = Image.new("RGB", (512, 512), color="red")
+
+        async def run():
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.2):
+                    await service.generate_dose_sweep(source, "lips", [1.0, 2.5], source_hash="abc")
+            while service.executor.stats()["running"]:
+                await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+        assert pipeline.steps_run < 200
+
+
+class TestProgressPreviews:
+
+    def test_progress_and_previews_are_published(self, service):
+        """Le callback de fin d'étape publie l'avancement et des aperçus périodiques"""
+        service.result_cache = None
+        events = []
+        source = Image.new("RGB", (512, 512), color="red")
+
+        asyncio.run(service.generate_simulation(
+            source, "lips", 2.0, source_hash="progress",
+            progress_callback=lambda step, total, preview: events.append((step, total, preview))
+        ))
+
+        total = events[0][1]
+        assert [step for step, _, _ in events] == list(range(1, total + 1))
+        previews = [preview for _, _, preview in events if preview is not None]
+        assert previews
+        assert previews[0].mode == "RGB"
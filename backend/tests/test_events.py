@@ -0,0 +1,43 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import threading
+
+from app.services.events import SimulationEventBus
+
+
+class TestSimulationEventBus:
+
+    def test_events_are_delivered_per_user_from_threads(self):
+        """Les événements publiés depuis un autre thread arrivent au bon abonné"""
+        bus = SimulationEventBus()
+
+        async def run():
+            mine = bus.subscribe(1)
+            other = bus.subscribe(2)
+            publisher = threading.Thread(target=bus.publish, args=(1, {"id": 7, "status": "completed"}))
+            publisher.start()
+            publisher.join()
+            event = await asyncio.wait_for(mine.get(), timeout=1)
+            assert other.empty()
+            bus.unsubscribe(1, mine)
+            bus.unsubscribe(2, other)
+            return event
+
+        assert asyncio.run(run()) == {"id": 7, "status": "completed"}
+        assert bus.subscriber_count(1) == 0
+
+    def test_slow_subscriber_keeps_latest_events(self):
+        """Un client lent perd les plus anciens événements, pas les derniers"""
+        bus = SimulationEventBus(max_queue_size=2)
+
+        async def run():
+            queue = bus.subscribe(1)
+            for progress in (10, 20, 30):
+                bus.publish(1, {"id": 1, "progress": progress})
+            await asyncio.sleep(0)
+            return [queue.get_nowait()["progress"] for _ in range(queue.qsize())]
+
+        assert asyncio.run(run()) == [20, 30]
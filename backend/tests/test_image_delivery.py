@@ -0,0 +1,104 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.image_delivery import ETagCache, ImageDelivery, parse_range
+
+
+@pytest.fixture
+def image(tmp_path):
+    """Fichier image factice dans le dossier des uploads"""
+    path = tmp_path / "abc_generated.jpg"
+    path.write_bytes(bytes(range(256)) * 40)
+    return path
+
+
+@pytest.fixture
+def client(image, tmp_path, monkeypatch):
+    """Application minimale servant le fichier via ImageDelivery"""
+    monkeypatch.setattr(settings, "upload_dir", tmp_path)
+    delivery = ImageDelivery(ETagCache(max_items=10))
+    app = FastAPI()
+
+    @app.get("/image")
+    async def serve(request: Request):
+        return await delivery.respond(request, image, "image/jpeg")
+
+    client = TestClient(app)
+    client.delivery = delivery
+    return client
+
+
+class TestImageDelivery:
+
+    def test_etag_and_not_modified(self, client):
+        """ETag fort stable ; If-None-Match correspondant donne un 304 sans corps"""
+        first = client.get("/image")
+        assert first.status_code == 200
+        assert len(first.content) == 10240
+        etag = first.headers["etag"]
+        assert etag.startswith('"') and not etag.startswith("W/")
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        second = client.get("/image", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert client.delivery.etags.stats() == {"items": 1, "hits": 1, "misses": 1}
+
+    def test_pinned_version_is_immutable(self, client):
+        """`?v=<empreinte>` est mis en cache comme immuable, pas une autre version"""
+        digest = client.get("/image").headers["etag"].strip('"')
+
+        assert "immutable" in client.get(f"/image?v={digest}").headers["cache-control"]
+        assert "immutable" not in client.get("/image?v=old").headers["cache-control"]
+
+    def test_byte_range(self, client, image):
+        """Plage unique en 206, plage hors fichier en 416, plage inversée ignorée"""
+        partial = client.get("/image", headers={"Range": "bytes=100-355"})
+        assert partial.status_code == 206
+        assert partial.headers["content-range"] == "bytes 100-355/10240"
+        assert partial.content == image.read_bytes()[100:356]
+
+        assert client.get("/image", headers={"Range": "bytes=-10"}).content == image.read_bytes()[-10:]
+        assert client.get("/image", headers={"Range": "bytes=99999-"}).status_code == 416
+
+        inverted = client.get("/image", headers={"Range": "bytes=5-3"})
+        assert inverted.status_code == 200
+        assert inverted.content == image.read_bytes()
+        stale = client.get("/image", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert stale.status_code == 200
+
+    def test_accel_redirect(self, client, monkeypatch):
+        """Avec X-Accel-Redirect, aucun octet n'est envoyé par Python"""
+        monkeypatch.setattr(settings, "image_accel_redirect_prefix", "/protected-uploads/")
+
+        response = client.get("/image")
+
+        assert response.headers["x-accel-redirect"] == "/protected-uploads/abc_generated.jpg"
+        assert response.content == b""
+        assert "etag" in response.headers
+
+    def test_etag_changes_with_content(self, image):
+        """Le fichier est haché de nouveau s'il est réécrit"""
+        etags = ETagCache()
+        before = etags.digest(image)
+        image.write_bytes(b"autre contenu")
+        assert etags.digest(image) != before
+
+    def test_parse_range(self):
+        """Plages invalides ou multiples : fichier complet"""
+        assert parse_range("bytes=0-", 10) == (0, 9)
+        assert parse_range("bytes=2-50", 10) == (2, 9)
+        assert parse_range("bytes=0-1,4-5", 10) is None
+        assert parse_range("items=0-1", 10) is None
+        assert parse_range("bytes=5-2", 10) is None
+        assert parse_range("bytes=abc", 10) is None
+        with pytest.raises(ValueError):
+            parse_range("bytes=10-20", 10)
@@ -0,0 +1,185 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.simulations import _check_admission
+from app.core.config import settings
+from app.core.database import Base
+from app.models import User, Patient, Simulation
+from app.services.inference_scheduler import InferenceScheduler, SchedulerFullError, device_concurrency
+from app.services.job_queue import JobQueue, job_queue
+
+
+@pytest.fixture
+def db():
+    """Session SQLite en mémoire avec un patient et un praticien"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    user = User(username="doc", hashed_pin="x", full_name="Dr Test",
+                speciality="dermatologie", license_number="LIC-1")
+    patient = Patient(age_range="26-35", gender="F", skin_type="Claire")
+    session.add_all([user, patient])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_simulations(db, count: int, status: str = "processing", generation_time=None, enqueue: bool = True):
+    user, patient = db.query(User).first(), db.query(Patient).first()
+    for _ in range(count):
+        simulation = Simulation(patient_id=patient.id, user_id=user.id, original_image_path="x.jpg",
+                                intervention_type="lips", dose=2.0, status=status,
+                                generation_time=generation_time)
+        db.add(simulation)
+        db.flush()
+        if enqueue:
+            job_queue.enqueue(db, simulation.id, commit=False)
+    db.commit()
+
+
+class TestInferenceScheduler:
+
+    def test_concurrency_is_bounded(self):
+        """Jamais plus d'inférences simultanées que d'emplacements"""
+        scheduler = InferenceScheduler(device="cpu", concurrency=2, max_pending=0)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def infer():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(scheduler, infer) for _ in range(6)))
+
+        asyncio.run(run())
+        scheduler.shutdown()
+        assert peak[0] == 2
+        stats = scheduler.stats()
+        assert stats["completed"] == 6
+        assert stats["pending"] == stats["running"] == 0
+        assert stats["max_wait_ms"] > 0
+
+    def test_submissions_beyond_pending_limit_are_rejected(self):
+        """Au-delà de la file autorisée, la soumission est refusée sans être exécutée"""
+        scheduler = InferenceScheduler(device="cpu", concurrency=1, max_pending=1)
+        release = threading.Event()
+
+        running = scheduler.submit(release.wait, 5)
+        deadline = time.monotonic() + 5
+        while scheduler.stats()["running"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        waiting = scheduler.submit(lambda: "ok")
+
+        with pytest.raises(SchedulerFullError):
+            scheduler.submit(lambda: "refusé")
+
+        release.set()
+        assert running.result(5) is True
+        assert waiting.result(5) == "ok"
+        scheduler.shutdown()
+        assert scheduler.stats()["rejected"] == 1
+
+    def test_cancelled_queued_submission_releases_its_slot(self):
+        """Un appel annulé avant son démarrage (délai dépassé) libère sa place dans la file"""
+        scheduler = InferenceScheduler(device="cpu", concurrency=1, max_pending=1)
+        release = threading.Event()
+
+        running = scheduler.submit(release.wait, 5)
+        deadline = time.monotonic() + 5
+        while scheduler.stats()["running"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        async def abandoned():
+            loop = asyncio.get_running_loop()
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.05):
+                    await loop.run_in_executor(scheduler, lambda: "jamais")
+
+        for _ in range(3):
+            asyncio.run(abandoned())
+            assert scheduler.stats()["pending"] == 0
+
+        queued = scheduler.submit(lambda: "ok")
+        assert queued.cancel()
+        assert scheduler.stats()["pending"] == 0
+
+        release.set()
+        assert running.result(5) is True
+        assert scheduler.submit(lambda: "ok").result(5) == "ok"
+        scheduler.shutdown()
+        assert scheduler.stats()["pending"] == 0
+
+    def test_concurrency_depends_on_device(self, monkeypatch):
+        """Le nombre d'emplacements est configuré par device"""
+        monkeypatch.setattr(settings, "inference_concurrency_cpu", 1)
+        monkeypatch.setattr(settings, "inference_concurrency_cuda", 3)
+
+        assert device_concurrency("cpu") == 1
+        assert device_concurrency("cuda:0") == 3
+        assert InferenceScheduler(device="cuda").concurrency == 3
+
+    def test_cpu_threads_are_shared_between_slots(self, monkeypatch):
+        """Sur CPU, les cœurs sont répartis entre processus et inférences simultanées"""
+        torch = pytest.importorskip("torch")
+        monkeypatch.setattr(settings, "torch_num_threads", 0)
+        monkeypatch.setattr(os, "cpu_count", lambda: 8)
+        previous = torch.get_num_threads()
+        try:
+            assert InferenceScheduler(device="cpu", concurrency=2).configure_threads(processes=2) == 2
+            assert torch.get_num_threads() == 2
+            assert InferenceScheduler(device="cuda", concurrency=2).configure_threads() is None
+        finally:
+            torch.set_num_threads(previous)
+
+
+class TestAdmissionControl:
+
+    def test_new_jobs_are_accepted_below_limit(self, db):
+        """Sous le seuil, aucune attente n'est imposée"""
+        add_simulations(db, 2)
+
+        assert JobQueue().admission_delay(db, max_queued=3) is None
+        assert JobQueue().admission_delay(db, max_queued=0) is None
+
+    def test_retry_after_is_estimated_from_recent_generations(self, db, monkeypatch):
+        """Le délai conseillé dépend du dépassement, de la durée moyenne et des emplacements"""
+        monkeypatch.setattr(settings, "worker_processes", 2)
+        monkeypatch.setattr(settings, "worker_concurrency", 1)
+        add_simulations(db, 3, status="completed", generation_time=10.0, enqueue=False)
+        add_simulations(db, 4)
+
+        # 4 en attente pour 3 tolérés : 2 travaux à écouler, 10 s chacun, 2 emplacements
+        assert JobQueue().admission_delay(db, max_queued=3) == 10
+
+    def test_create_simulation_is_rejected_with_429(self, db, monkeypatch):
+        """Une file saturée renvoie 429 avec Retry-After"""
+        monkeypatch.setattr(settings, "max_queued_jobs", 1)
+        add_simulations(db, 1)
+
+        with pytest.raises(HTTPException) as error:
+            _check_admission(db)
+
+        assert error.value.status_code == 429
+        assert int(error.value.headers["Retry-After"]) >= 1
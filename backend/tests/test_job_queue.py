@@ -0,0 +1,351 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models import User, Patient, Simulation, SimulationJob, UsageStats
+from app.services.ai_generator import MockStableDiffusionPipeline, ai_service
+from app.services.inference_scheduler import inference_scheduler
+from app.services.job_queue import JobQueue
+from app.services.result_cache import ResultCache
+from app import worker as worker_module
+from app.worker import SimulationWorker
+
+
+@pytest.fixture
+def session_factory():
+    """Base SQLite en mémoire partagée entre sessions"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def simulation(session_factory, tmp_path):
+    """Simulation en attente avec son image originale sur disque"""
+    original_path = tmp_path / "abc_original.jpg"
+    Image.new("RGB", (512, 512), color="red").save(original_path, "JPEG")
+
+    db = session_factory()
+    user = User(
+        username="test_doctor",
+        hashed_pin="x",
+        full_name="Dr Test",
+        speciality="dermatologie",
+        license_number="LIC-1",
+    )
+    patient = Patient(age_range="26-35", gender="F", skin_type="Claire")
+    db.add_all([user, patient])
+    db.flush()
+    sim = Simulation(
+        patient_id=patient.id,
+        user_id=user.id,
+        original_image_path=str(original_path),
+        intervention_type="lips",
+        dose=2.0,
+        status="processing",
+    )
+    db.add(sim)
+    db.commit()
+    sim_id = sim.id
+    db.close()
+    return sim_id
+
+
+class TestJobQueue:
+
+    def test_claim_is_exclusive(self, session_factory, simulation):
+        """Un travail ne peut être réservé que par un seul worker"""
+        queue = JobQueue(lease_seconds=60, max_attempts=3, retry_backoff=0)
+        db = session_factory()
+        queue.enqueue(db, simulation)
+
+        first = queue.claim(db, "worker-a")
+        second = queue.claim(db, "worker-b")
+
+        assert first is not None
+        assert first.status == "running"
+        assert first.lease_owner == "worker-a"
+        assert first.attempts == 1
+        assert second is None
+        db.close()
+
+    def test_failed_job_is_retried_then_marked_failed(self, session_factory, simulation):
+        """Les échecs sont retentés puis la simulation est marquée échouée"""
+        queue = JobQueue(lease_seconds=60, max_attempts=2, retry_backoff=0)
+        db = session_factory()
+        queue.enqueue(db, simulation)
+
+        job = queue.claim(db, "worker-a")
+        assert queue.fail(db, job, "worker-a", "boom") is False
+        assert job.status == "queued"
+
+        job = queue.claim(db, "worker-a")
+        assert job.attempts == 2
+        assert queue.fail(db, job, "worker-a", "boom") is True
+
+        sim = db.get(Simulation, simulation)
+        assert job.status == "failed"
+        assert sim.status == "failed"
+        db.close()
+
+    def test_worker_loop_survives_bookkeeping_errors(self, session_factory):
+        """Une erreur de suivi (échec non enregistrable) est journalisée, la boucle continue"""
+        worker = SimulationWorker(worker_id="worker-test", session_factory=session_factory, poll_interval=0)
+        outcomes = [RuntimeError("no such column simulations.sweep_id"), True, False]
+        calls = []
+
+        async def run_once():
+            outcome = outcomes[len(calls)]
+            calls.append(outcome)
+            if isinstance(outcome, Exception):
+                raise outcome
+            if not outcome:
+                worker.stop()
+            return outcome
+
+        worker.run_once = run_once
+        asyncio.run(worker._consume(once=False))
+
+        assert len(calls) == 3
+
+    def test_expired_lease_is_recovered(self, session_factory, simulation):
+        """Un travail abandonné par un worker disparu est remis en file"""
+        queue = JobQueue(lease_seconds=60, max_attempts=3, retry_backoff=0)
+        db = session_factory()
+        queue.enqueue(db, simulation)
+        job = queue.claim(db, "worker-a")
+
+        job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+        assert queue.recover_expired(db) == 1
+        reclaimed = queue.claim(db, "worker-b")
+        assert reclaimed.id == job.id
+        assert reclaimed.lease_owner == "worker-b"
+
+        # L'ancien worker ne peut plus terminer le travail
+        assert queue.complete(db, reclaimed, "worker-a") is False
+        db.close()
+
+    def test_lease_renewed_during_recovery_is_kept(self, session_factory, simulation):
+        """Un bail prolongé entre la sélection et la reprise n'est pas repris"""
+        queue = JobQueue(lease_seconds=60, max_attempts=3, retry_backoff=0)
+        db = session_factory()
+        queue.enqueue(db, simulation)
+        job = queue.claim(db, "worker-a")
+        job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+        renewed = []
+
+        def renew_before_update(state):
+            if state.is_update and not renewed:
+                renewed.append(True)
+                other = session_factory()
+                assert queue.heartbeat(other, job.id, "worker-a")
+                other.close()
+
+        event.listen(db, "do_orm_execute", renew_before_update)
+        assert queue.recover_expired(db) == 0
+        event.remove(db, "do_orm_execute", renew_before_update)
+
+        db.expire_all()
+        job = db.get(SimulationJob, job.id)
+        assert (job.status, job.lease_owner) == ("running", "worker-a")
+        assert queue.complete(db, job, "worker-a") is True
+        db.close()
+
+
+class TestSimulationWorker:
+
+    def test_worker_processes_job(self, session_factory, simulation, tmp_path, monkeypatch):
+        """Le worker génère l'image et termine la simulation"""
+        monkeypatch.setattr(settings, "upload_dir", tmp_path)
+        monkeypatch.setattr(ai_service, "result_cache", ResultCache(directory=tmp_path / "cache"))
+        db = session_factory()
+        JobQueue().enqueue(db, simulation, payload={"output_filename": "abc_generated.jpg"})
+        db.close()
+
+        worker = SimulationWorker(worker_id="worker-test", session_factory=session_factory)
+        asyncio.run(worker.run(once=True))
+
+        db = session_factory()
+        sim = db.get(Simulation, simulation)
+        job = db.query(SimulationJob).filter(SimulationJob.simulation_id == simulation).one()
+        assert sim.status == "completed"
+        assert sim.generated_image_path == str(tmp_path / "abc_generated.jpg")
+        assert (tmp_path / "abc_generated.jpg").exists()
+        assert os.path.exists(sim.get_renditions()["generated"]["thumb"]["jpeg"])
+        assert os.path.exists(sim.get_renditions()["original"]["medium"]["jpeg"])
+        assert job.status == "completed"
+        db.close()
+
+    def test_worker_processes_sweep_job(self, session_factory, simulation, tmp_path, monkeypatch):
+        """Un travail de série génère toutes les doses et termine chaque simulation"""
+        monkeypatch.setattr(settings, "upload_dir", tmp_path)
+        monkeypatch.setattr(ai_service, "result_cache", ResultCache(directory=tmp_path / "cache"))
+        db = session_factory()
+        first = db.get(Simulation, simulation)
+        second = Simulation(
+            patient_id=first.patient_id,
+            user_id=first.user_id,
+            original_image_path=first.original_image_path,
+            intervention_type="lips",
+            dose=3.0,
+            status="processing",
+        )
+        db.add(second)
+        db.commit()
+        ids = [first.id, second.id]
+        JobQueue().enqueue(db, first.id, payload={"simulation_ids": ids}, kind="sweep")
+        db.close()
+
+        worker = SimulationWorker(worker_id="worker-test", session_factory=session_factory)
+        asyncio.run(worker.run(once=True))
+
+        db = session_factory()
+        simulations = db.query(Simulation).filter(Simulation.id.in_(ids)).all()
+        assert [sim.status for sim in simulations] == ["completed", "completed"]
+        assert all(os.path.exists(sim.generated_image_path) for sim in simulations)
+        usage = db.query(UsageStats).one()
+        assert usage.simulations_count == 2
+        assert usage.storage_used_mb > 0
+        db.close()
+
+    def test_worker_reports_progress(self, session_factory, simulation, tmp_path, monkeypatch):
+        """L'avancement est enregistré pendant la génération puis l'aperçu est retiré"""
+        monkeypatch.setattr(settings, "upload_dir", tmp_path)
+        monkeypatch.setattr(ai_service, "result_cache", None)
+        seen = []
+        original_reporter = worker_module.make_progress_reporter
+
+        def recording_reporter(db, tracked, preview_path):
+            report = original_reporter(db, tracked, preview_path)
+
+            def wrapper(step, total, preview):
+                report(step, total, preview)
+                with session_factory() as check:
+                    sim = check.get(Simulation, tracked.id)
+                    seen.append((sim.progress, sim.preview_image_path))
+            return wrapper
+
+        monkeypatch.setattr(worker_module, "make_progress_reporter", recording_reporter)
+        db = session_factory()
+        JobQueue().enqueue(db, simulation, payload={"output_filename": "abc_generated.jpg"})
+        db.close()
+
+        asyncio.run(SimulationWorker(worker_id="worker-test", session_factory=session_factory).run(once=True))
+
+        assert any(path == str(tmp_path / "abc_preview.jpg") for _, path in seen)
+        assert max(progress for progress, _ in seen) == 99
+        db = session_factory()
+        sim = db.get(Simulation, simulation)
+        assert (sim.progress, sim.preview_image_path) == (100, None)
+        assert not (tmp_path / "abc_preview.jpg").exists()
+        db.close()
+
+
+class SlowPipeline(MockStableDiffusionPipeline):
+    """Pipeline mock dont chaque étape de diffusion prend `step_seconds`"""
+
+    def __init__(self, step_seconds: float):
+        self.step_seconds = step_seconds
+        self.steps_run = 0
+
+    def __call__(self, *args, **kwargs):
+        callback = kwargs.get("callback_on_step_end")
+        for step in range(kwargs.get("num_inference_steps", 1)):
+            time.sleep(self.step_seconds)
+            self.steps_run += 1
+            if callback is not None:
+                callback(self, step, 1000 - step, {})
+        return super().__call__(prompt=kwargs.get("prompt"))
+
+
+class TestInferenceDeadline:
+
+    @pytest.fixture
+    def slow_worker(self, session_factory, simulation, tmp_path, monkeypatch):
+        """Worker prêt à traiter la simulation avec un pipeline lent"""
+        asyncio.run(ai_service.initialize_models())
+        monkeypatch.setattr(settings, "upload_dir", tmp_path)
+        monkeypatch.setattr(settings, "inference_steps", 200)
+        monkeypatch.setattr(ai_service, "result_cache", None)
+        db = session_factory()
+        JobQueue().enqueue(db, simulation, payload={"output_filename": "abc_generated.jpg"})
+        db.close()
+        return SimulationWorker(worker_id="worker-test", session_factory=session_factory)
+
+    def run_and_fetch(self, worker, session_factory, simulation):
+        started = time.monotonic()
+        asyncio.run(worker.run(once=True))
+        elapsed = time.monotonic() - started
+        db = session_factory()
+        sim = db.get(Simulation, simulation)
+        job = db.query(SimulationJob).filter(SimulationJob.simulation_id == simulation).one()
+        result = (elapsed, sim.status, sim.failure_reason, job.status, job.attempts)
+        db.close()
+        return result
+
+    def test_generation_is_interrupted_between_steps(self, slow_worker, session_factory, simulation, monkeypatch):
+        """Au-delà de max_inference_time, la boucle de débruitage s'arrête à l'étape suivante"""
+        pipeline = SlowPipeline(step_seconds=0.02)
+        monkeypatch.setattr(ai_service, "pipeline", pipeline)
+        monkeypatch.setattr(settings, "max_inference_time", 0.3)
+
+        elapsed, status, reason, job_status, attempts = self.run_and_fetch(slow_worker, session_factory, simulation)
+
+        assert pipeline.steps_run < 200
+        assert elapsed < 3
+        assert (status, job_status, attempts) == ("failed", "failed", 1)
+        assert "délai maximal d'inférence" in reason
+        assert inference_scheduler.stats()["running"] == 0
+
+    def test_stuck_step_times_out_the_job(self, slow_worker, session_factory, simulation, monkeypatch):
+        """Une étape bloquée fait échouer le travail à son délai ; l'emplacement d'inférence reste tenu jusqu'à la fin de l'étape"""
+        pipeline = SlowPipeline(step_seconds=1.0)
+        monkeypatch.setattr(ai_service, "pipeline", pipeline)
+        monkeypatch.setattr(settings, "max_inference_time", 0.2)
+        monkeypatch.setattr(settings, "job_timeout_grace_seconds", 0.1)
+
+        elapsed, status, reason, job_status, attempts = self.run_and_fetch(slow_worker, session_factory, simulation)
+
+        assert elapsed < 1
+        assert (status, job_status, attempts) == ("failed", "failed", 1)
+        assert reason.startswith("Délai maximal du travail")
+        assert inference_scheduler.stats()["running"] == 1
+
+        # L'inférence abandonnée s'interrompt à la fin de l'étape en cours
+        deadline = time.monotonic() + 5
+        while inference_scheduler.stats()["running"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pipeline.steps_run == 1
+
+    def test_other_timeout_errors_are_retried(self, slow_worker, session_factory, simulation, monkeypatch):
+        """Une TimeoutError étrangère au délai du travail suit le chemin de nouvel essai"""
+        async def transient_failure(db, job):
+            raise TimeoutError("connexion expirée")
+
+        monkeypatch.setattr(worker_module, "process_simulation_job", transient_failure)
+
+        elapsed, status, reason, job_status, attempts = self.run_and_fetch(slow_worker, session_factory, simulation)
+
+        assert (status, job_status, attempts) == ("processing", "queued", 1)
+
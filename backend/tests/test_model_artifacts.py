@@ -0,0 +1,87 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import json
+import time
+
+import pytest
+
+from app.services.model_artifacts import MANIFEST_NAME, ModelArtifactCache
+
+SPEC = {
+    "model_name": "runwayml/stable-diffusion-v1-5",
+    "controlnet_model": "lllyasviel/sd-controlnet-canny",
+    "dtype": "float16",
+    "torch": "2.1.0",
+    "diffusers": "0.24.0",
+}
+
+
+class SavedPipeline:
+    """Pipeline minimal : `save_pretrained` écrit un dossier par composant"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    def save_pretrained(self, directory, safe_serialization=False):
+        assert safe_serialization
+        for component in ("unet", "controlnet"):
+            (directory / component).mkdir()
+            (directory / component / "config.json").write_text("{}")
+            (directory / component / "diffusion_pytorch_model.safetensors").write_bytes(b"\0" * 1024)
+        if self.fail:
+            raise OSError("disque plein")
+
+
+class TestModelArtifactCache:
+
+    def test_store_then_lookup(self, tmp_path):
+        """Un artefact enregistré est retrouvé avec son manifeste"""
+        cache = ModelArtifactCache(directory=tmp_path)
+        assert cache.lookup(SPEC) is None
+
+        path = cache.store(SPEC, SavedPipeline(), source_load_seconds=12.5)
+
+        assert cache.lookup(SPEC) == path
+        manifest = json.loads((path / MANIFEST_NAME).read_text())
+        assert manifest["files"]["unet/diffusion_pytorch_model.safetensors"] == 1024
+        assert manifest["source_load_seconds"] == 12.5
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    def test_key_depends_on_dtype_and_versions(self, tmp_path):
+        """Précision ou version différente : autre artefact"""
+        cache = ModelArtifactCache(directory=tmp_path)
+        cache.store(SPEC, SavedPipeline())
+
+        assert cache.lookup({**SPEC, "dtype": "float32"}) is None
+        assert cache.lookup({**SPEC, "diffusers": "0.25.0"}) is None
+
+    def test_truncated_artifact_is_ignored(self, tmp_path):
+        """Fichier de poids tronqué : l'artefact n'est pas utilisé"""
+        cache = ModelArtifactCache(directory=tmp_path)
+        path = cache.store(SPEC, SavedPipeline())
+        (path / "unet" / "diffusion_pytorch_model.safetensors").write_bytes(b"\0" * 10)
+
+        assert cache.lookup(SPEC) is None
+
+    def test_failed_save_leaves_nothing(self, tmp_path):
+        """Une écriture interrompue ne publie pas d'artefact"""
+        cache = ModelArtifactCache(directory=tmp_path)
+        with pytest.raises(OSError):
+            cache.store(SPEC, SavedPipeline(fail=True))
+
+        assert list(tmp_path.iterdir()) == []
+        assert cache.lookup(SPEC) is None
+
+    def test_only_recent_artifacts_are_kept(self, tmp_path):
+        """Au-delà de `keep`, les artefacts les plus anciens sont supprimés"""
+        cache = ModelArtifactCache(directory=tmp_path, keep=2)
+        specs = [{**SPEC, "torch": f"2.{i}.0"} for i in range(3)]
+        for spec in specs:
+            cache.store(spec, SavedPipeline())
+            time.sleep(0.01)
+
+        assert cache.lookup(specs[0]) is None
+        assert cache.lookup(specs[1]) is not None
+        assert cache.lookup(specs[2]) is not None
@@ -0,0 +1,72 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.pin_hashing import PinHasher
+
+
+class TestPinHasher:
+
+    def test_hashing_does_not_block_event_loop(self):
+        """La boucle d'événements continue de tourner pendant le calcul bcrypt"""
+        hasher = PinHasher(rounds=10, max_workers=1)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            hashed = await hasher.hash("1234")
+            valid, _ = await hasher.verify("1234", hashed)
+            task.cancel()
+            return valid, ticks
+
+        valid, ticks = asyncio.run(run())
+        hasher.shutdown()
+        assert valid
+        assert ticks > 0
+        assert hasher.stats()["completed"] == 2
+
+    def test_hash_is_upgraded_when_cost_changes(self):
+        """Un hash d'un autre coût est recalculé lors d'une vérification réussie"""
+        old_hasher = PinHasher(rounds=4, max_workers=1)
+        new_hasher = PinHasher(rounds=5, max_workers=1)
+        hashed = old_hasher.hash_sync("1234")
+
+        valid, new_hash = asyncio.run(new_hasher.verify("1234", hashed))
+        assert valid
+        assert new_hash.startswith("$2b$05$")
+        assert new_hasher.stats()["rehashed"] == 1
+
+        assert asyncio.run(new_hasher.verify("0000", hashed)) == (False, None)
+        assert asyncio.run(new_hasher.verify("1234", new_hash)) == (True, None)
+        old_hasher.shutdown()
+        new_hasher.shutdown()
+
+    def test_requests_beyond_pending_limit_are_rejected(self):
+        """Au-delà de la file autorisée, la demande est refusée avec Retry-After"""
+        hasher = PinHasher(rounds=8, max_workers=1, max_pending=1)
+
+        async def run():
+            return await asyncio.gather(
+                *(hasher.hash("1234") for _ in range(3)),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        hasher.shutdown()
+        errors = [result for result in results if isinstance(result, HTTPException)]
+        assert errors and len(errors) < 3
+        assert all(error.status_code == 503 for error in errors)
+        assert errors[0].headers["Retry-After"] == "1"
+        assert hasher.stats()["rejected"] == len(errors)
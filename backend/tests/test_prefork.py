@@ -0,0 +1,92 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from app.services.prefork import PreforkSupervisor
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SEED_JOBS = textwrap.dedent("""
+    from PIL import Image
+    from app.core.config import settings
+    from app.core.database import SessionLocal, create_tables
+    from app.models import Patient, Simulation, User
+    from app.services.job_queue import job_queue
+
+    create_tables()
+    db = SessionLocal()
+    user = User(username="doc", hashed_pin="x", full_name="Dr Test",
+                speciality="dermatologie", license_number="LIC-1")
+    patient = Patient(age_range="26-35", gender="F", skin_type="Claire")
+    db.add_all([user, patient])
+    db.flush()
+    for i in range(4):
+        path = settings.upload_dir / f"{i}_original.jpg"
+        Image.new("RGB", (256, 256), color="red").save(path, "JPEG")
+        simulation = Simulation(patient_id=patient.id, user_id=user.id, original_image_path=str(path),
+                                intervention_type="lips", dose=1.0 + i, status="processing")
+        db.add(simulation)
+        db.flush()
+        job_queue.enqueue(db, simulation.id, payload={"output_filename": f"{i}_generated.jpg"}, commit=False)
+    db.commit()
+""")
+
+COUNT_COMPLETED = (
+    "from app.core.database import SessionLocal; from app.models import Simulation; "
+    "print(SessionLocal().query(Simulation).filter(Simulation.status == 'completed').count())"
+)
+
+
+class TestPreforkSupervisor:
+
+    def test_failed_process_is_respawned(self, tmp_path):
+        """Un processus terminé en erreur est relancé, pas celui qui termine normalement"""
+        def target(index: int) -> None:
+            marker = tmp_path / f"started-{index}"
+            first_run = not marker.exists()
+            with open(marker, "a") as f:
+                f.write(f"{os.getpid()}\n")
+            if index == 0 and first_run:
+                os._exit(1)
+
+        supervisor = PreforkSupervisor(2, target, respawn_delay=0)
+        supervisor.start()
+        supervisor.wait(timeout=30)
+
+        assert supervisor.restarts == 1
+        assert len((tmp_path / "started-0").read_text().split()) == 2
+        assert len((tmp_path / "started-1").read_text().split()) == 1
+
+
+class TestPreforkedWorkers:
+
+    def test_forked_workers_process_jobs(self, tmp_path):
+        """Modèles chargés par le parent, travaux traités par les workers forkés"""
+        uploads = tmp_path / "uploads"
+        uploads.mkdir()
+        env = {
+            **os.environ,
+            "ENVIRONMENT": "test",
+            "DATABASE_URL": f"sqlite:///{tmp_path / 'prefork.db'}",
+            "UPLOAD_DIR": str(uploads),
+            "CACHE_DIR": str(tmp_path / "cache"),
+            "RESULT_CACHE_ENABLED": "false",
+            "JOB_POLL_INTERVAL": "0.1",
+        }
+
+        def run(*command):
+            result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120)
+            assert result.returncode == 0, result.stderr[-2000:]
+            return result
+
+        run(sys.executable, "-c", SEED_JOBS)
+        worker = run(sys.executable, "-m", "app.worker", "--processes", "2", "--once")
+
+        assert "2 workers préforkés" in worker.stderr
+        assert run(sys.executable, "-c", COUNT_COMPLETED).stdout.strip() == "4"
+        assert all((uploads / f"{i}_generated.jpg").exists() for i in range(4))
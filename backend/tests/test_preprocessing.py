@@ -0,0 +1,84 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.utils.file_manager import ImageProcessor
+
+
+def with_orientation(image, orientation):
+    """Ajouter un tag EXIF d'orientation à une image"""
+    exif = image.getexif()
+    exif[0x0112] = orientation
+    image.info["exif"] = exif.tobytes()
+    return image
+
+
+class TestImageProcessor:
+
+    def test_target_size_is_multiple_of_eight(self):
+        """La taille cible respecte le côté maximal et les multiples de 8"""
+        assert ImageProcessor.target_size(900, 700, 768) == (768, 592)
+        assert ImageProcessor.target_size(513, 300, 768) == (512, 296)
+
+    def test_single_pass_matches_exif_transpose(self):
+        """Le résultat a l'orientation et la taille de l'ancien chemin PIL"""
+        pixels = np.random.default_rng(0).integers(0, 256, (600, 1000, 3), dtype=np.uint8)
+        for orientation in range(1, 9):
+            image = with_orientation(Image.fromarray(pixels, "RGB"), orientation)
+            expected = ImageOps.exif_transpose(image)
+
+            prepared = ImageProcessor.prepare_image_for_ai(image, 768)
+
+            assert prepared.mode == "RGB"
+            assert prepared.size == ImageProcessor.target_size(*expected.size, 768)
+
+    def test_orientation_without_resize_is_exact(self):
+        """Sans redimensionnement, les pixels orientés sont identiques à PIL"""
+        pixels = np.random.default_rng(1).integers(0, 256, (64, 128, 3), dtype=np.uint8)
+        for orientation in range(1, 9):
+            image = with_orientation(Image.fromarray(pixels, "RGB"), orientation)
+            expected = np.asarray(ImageOps.exif_transpose(image))
+
+            prepared = np.asarray(ImageProcessor.prepare_image_for_ai(image, 768))
+
+            assert np.array_equal(prepared, expected)
+
+    def test_grayscale_and_alpha_are_converted(self):
+        """Les images L et RGBA sont converties en RGB"""
+        for mode in ("L", "RGBA", "P"):
+            prepared = ImageProcessor.prepare_image_for_ai(Image.new(mode, (300, 260)), 768)
+            assert prepared.mode == "RGB"
+            assert prepared.size == (296, 256)
+
+    def test_large_jpeg_is_decoded_reduced(self, tmp_path):
+        """Une grande photo JPEG est décodée directement à résolution réduite"""
+        path = tmp_path / "photo.jpg"
+        Image.new("RGB", (4000, 3000), color="red").save(path, "JPEG")
+
+        with Image.open(path) as image:
+            reduced = ImageProcessor.reduce_on_decode(image, (768, 576))
+            assert reduced.size == (1000, 750)
+
+            prepared = ImageProcessor.prepare_image_for_ai(image, 768)
+
+        assert prepared.size == (768, 576)
+
+    def test_large_png_is_reduced_before_resampling(self):
+        """Les autres formats sont réduits par un facteur entier"""
+        reduced = ImageProcessor.reduce_on_decode(Image.new("RGB", (4000, 3000)), (768, 576))
+        assert reduced.size == (800, 600)
+
+    def test_palette_and_bilevel_png_are_reduced(self, tmp_path):
+        """Les PNG en palette ou bilevel, non gérés par Image.reduce, sont convertis puis réduits"""
+        for mode in ("P", "1"):
+            path = tmp_path / f"photo_{mode}.png"
+            Image.new(mode, (2000, 1500)).save(path, "PNG")
+
+            with Image.open(path) as image:
+                assert ImageProcessor.reduce_on_decode(image, (768, 576)).size == (1000, 750)
+                prepared = ImageProcessor.prepare_image_for_ai(image, 768)
+
+            assert (prepared.mode, prepared.size) == ("RGB", (768, 576))
@@ -0,0 +1,136 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import User
+from app.services.auth import auth_service, _resolve_user
+from app.services.principal_cache import PrincipalCache, principal_cache
+
+
+@pytest.fixture
+def session_factory():
+    """Base SQLite en mémoire partagée entre sessions"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+    principal_cache.clear()
+
+
+@pytest.fixture
+def doctor(session_factory):
+    """Utilisateur actif et son token"""
+    db = session_factory()
+    user = User(
+        username="cache_doctor",
+        hashed_pin="x",
+        full_name="Dr Cache",
+        speciality="dermatologie",
+        license_number="LIC-CACHE",
+    )
+    db.add(user)
+    db.commit()
+    token = auth_service.create_access_token({"sub": user.username, "user_id": user.id})
+    db.close()
+    return token
+
+
+def count_user_queries(engine):
+    """Compter les requêtes SELECT sur la table users"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    return statements
+
+
+class TestPrincipalCache:
+
+    def test_cached_user_skips_database_query(self, session_factory, doctor):
+        """Le second appel avec le même token ne requête plus la base"""
+        queries = count_user_queries(session_factory.kw["bind"])
+
+        db = session_factory()
+        first = _resolve_user(doctor, db)
+        db.close()
+
+        db = session_factory()
+        second = _resolve_user(doctor, db)
+        assert second.username == first.username
+        assert second in db
+        db.close()
+
+        assert len(queries) == 1
+        assert principal_cache.stats()["hits"] >= 1
+
+    def test_deactivation_invalidates_cached_user(self, session_factory, doctor):
+        """Désactiver un compte retire immédiatement ses entrées du cache"""
+        db = session_factory()
+        user = _resolve_user(doctor, db)
+        user.is_active = False
+        db.commit()
+        db.close()
+
+        db = session_factory()
+        with pytest.raises(HTTPException) as exc:
+            _resolve_user(doctor, db)
+        assert exc.value.status_code == 401
+        db.close()
+
+    def test_entries_expire_with_ttl(self, session_factory, doctor):
+        """Les entrées ne survivent pas à leur durée de vie"""
+        cache = PrincipalCache(ttl_seconds=0.05, max_items=10)
+        db = session_factory()
+        user = db.query(User).first()
+        cache.store(doctor, user)
+        assert cache.lookup(doctor, db, User) is not None
+
+        time.sleep(0.1)
+        assert cache.lookup(doctor, db, User) is None
+        assert cache.stats()["expirations"] == 1
+        db.close()
+
+    def test_expired_token_is_not_cached(self, session_factory, doctor):
+        """La durée de vie est bornée par l'expiration du token"""
+        cache = PrincipalCache(ttl_seconds=60, max_items=10)
+        db = session_factory()
+        cache.store(doctor, db.query(User).first(), expires_at=time.time() - 1)
+        assert cache.lookup(doctor, db, User) is None
+        db.close()
+
+    def test_invalidation_only_targets_the_user(self, session_factory, doctor):
+        """L'invalidation retire toutes les entrées de l'utilisateur, et seulement les siennes"""
+        cache = PrincipalCache(ttl_seconds=60, max_items=2)
+        db = session_factory()
+        user = db.query(User).first()
+        other = User(username="other_doctor", hashed_pin="x", full_name="Dr Autre",
+                     speciality="dermatologie", license_number="LIC-OTHER")
+        db.add(other)
+        db.commit()
+
+        # Entrée évincée par la limite LRU : rien ne doit subsister pour elle
+        cache.store("ancien-token", user)
+        cache.store(doctor, user)
+        cache.store("autre-token", other)
+        assert cache.stats()["evictions"] == 1
+
+        cache.invalidate_user(User, user.id)
+        assert cache.lookup(doctor, db, User) is None
+        assert cache.lookup("autre-token", db, User) is not None
+        db.close()
@@ -0,0 +1,60 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from pathlib import Path
+
+from PIL import Image
+
+from app.services.renditions import (
+    RENDITION_FORMATS, create_file_renditions, delete_renditions, rendition_sizes, select_rendition
+)
+
+
+def make_photo(path: Path, size=(2048, 1536)) -> Path:
+    """Image bruitée enregistrée en JPEG (taille proche d'une photo)"""
+    Image.effect_noise(size, 64).convert("RGB").save(path, "JPEG", quality=90)
+    return path
+
+
+class TestRenditions:
+
+    def test_all_sizes_and_formats_created(self, tmp_path):
+        """Chaque taille existe dans chaque format, la source sert de pleine taille JPEG"""
+        source = make_photo(tmp_path / "abc_generated.jpg")
+        renditions = create_file_renditions(source)
+
+        assert list(renditions) == list(rendition_sizes())
+        for size, formats in renditions.items():
+            assert set(formats) == set(RENDITION_FORMATS)
+            assert all(Path(path).exists() for path in formats.values())
+        assert renditions["full"]["jpeg"] == str(source)
+        with Image.open(renditions["thumb"]["jpeg"]) as thumb:
+            assert max(thumb.size) == 320
+
+    def test_thumbnail_is_a_fraction_of_full_size(self, tmp_path):
+        """Une miniature pèse une petite fraction de l'image complète"""
+        renditions = create_file_renditions(make_photo(tmp_path / "abc.jpg"))
+
+        full = os.path.getsize(renditions["full"]["jpeg"])
+        assert os.path.getsize(renditions["thumb"]["jpeg"]) < full / 10
+
+    def test_select_by_accept_header(self, tmp_path):
+        """WebP pour les clients qui l'acceptent, JPEG sinon ou si demandé"""
+        renditions = create_file_renditions(make_photo(tmp_path / "abc.jpg", (640, 480)))
+
+        path, media_type = select_rendition(renditions, "thumb", "image/avif,image/webp,*/*")
+        assert media_type == "image/" + RENDITION_FORMATS[0]
+        assert select_rendition(renditions, "thumb", "image/*")[1] == "image/jpeg"
+        assert select_rendition(renditions, "medium", "image/webp", "jpeg")[1] == "image/jpeg"
+        assert select_rendition({}, "thumb", "image/webp") is None
+
+    def test_delete_keeps_requested_paths(self, tmp_path):
+        """Suppression des déclinaisons sans toucher aux chemins conservés"""
+        source = make_photo(tmp_path / "abc.jpg", (640, 480))
+        renditions = create_file_renditions(source)
+
+        delete_renditions(renditions, keep=[str(source)])
+
+        assert source.exists()
+        assert not Path(renditions["thumb"]["jpeg"]).exists()
@@ -0,0 +1,182 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import threading
+
+import pytest
+from PIL import Image
+
+from app.services.ai_generator import AIGeneratorService, MockImageResult
+from app.services.control_cache import ControlImageCache
+from app.services.result_cache import ResultCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(directory=tmp_path / "results", memory_bytes=10 * 1024 * 1024, disk_bytes=10 * 1024 * 1024)
+
+
+class TestResultCache:
+
+    def test_key_normalizes_prompt(self, cache):
+        """La casse et les espaces du prompt n'influencent pas la clé"""
+        settings = {"steps": 20, "guidance_scale": 7.5, "seed": 42}
+        key_a = cache.make_key("abc", "Fuller  lips", 2.0, "sd", settings)
+        key_b = cache.make_key("abc", "fuller lips ", 2.0, "sd", settings)
+        key_c = cache.make_key("abc", "fuller lips", 3.0, "sd", settings)
+
+        assert key_a == key_b
+        assert key_a != key_c
+
+    def test_disk_tier_survives_memory_eviction(self, cache):
+        """Une entrée évincée de la mémoire est relue depuis le disque"""
+        image = Image.new("RGB", (64, 64), color="blue")
+        cache.put("k1", image, {"prompt": "p"})
+        cache.memory.clear()
+
+        cached = cache.get("k1")
+
+        assert cached is not None
+        assert cached[0].size == (64, 64)
+        assert cached[1] == {"prompt": "p"}
+        assert cache.disk_hits == 1
+
+    def test_disk_tier_is_size_bounded(self, tmp_path):
+        """Les fichiers les plus anciens sont supprimés au-delà de la limite"""
+        cache = ResultCache(directory=tmp_path / "results", memory_bytes=0, disk_bytes=30_000)
+        for i in range(10):
+            noisy = Image.effect_noise((64, 64), 100).convert("RGB")
+            cache.put(f"key{i:02d}", noisy, {})
+
+        total = sum(p.stat().st_size for p in (tmp_path / "results").rglob("*") if p.is_file())
+        assert total <= 30_000
+        assert cache.get("key09") is not None
+        assert cache.get("key00") is None
+
+    def test_results_of_a_source_are_deleted_together(self, cache, tmp_path):
+        """La suppression d'une image source retire ses résultats (mémoire et disque), pas ceux des autres"""
+        settings = {"steps": 20, "guidance_scale": 7.5, "seed": 42}
+        image = Image.new("RGB", (64, 64), color="blue")
+        patient_keys = [cache.make_key("abc", "lips", dose, "sd", settings) for dose in (1.0, 2.0)]
+        other_key = cache.make_key("def", "lips", 1.0, "sd", settings)
+        for key in patient_keys + [other_key]:
+            cache.put(key, image, {})
+
+        cache.delete_source("abc")
+
+        assert all(cache.get(key) is None for key in patient_keys)
+        assert cache.get(other_key) is not None
+        assert [path.name for path in (tmp_path / "results").rglob("*.png")] == [f"{other_key}.png"]
+
+
+class TestGeneratorCaching:
+
+    def test_repeat_request_skips_inference(self, cache):
+        """Une requête identique est servie depuis le cache"""
+        service = AIGeneratorService()
+        service.result_cache = cache
+        asyncio.run(service.initialize_models())
+        calls = []
+        service.pipeline = lambda **kwargs: calls.append(kwargs) or MockImageResult(count=len(kwargs["prompt"]))
+        source = Image.new("RGB", (512, 512), color="red")
+
+        _, first = asyncio.run(service.generate_simulation(source, "lips", 2.0, source_hash="abc"))
+        _, second = asyncio.run(service.generate_simulation(source, "lips", 2.0, source_hash="abc"))
+        _, other_dose = asyncio.run(service.generate_simulation(source, "lips", 3.0, source_hash="abc"))
+
+        assert "cache_hit" not in first
+        assert second["cache_hit"] is True
+        assert "cache_hit" not in other_dose
+        assert len(calls) == 2
+
+    def test_fallback_results_are_not_served_to_real_models(self, cache):
+        """Les images des mocks de repli sont mises en cache sous une autre version de modèle"""
+        service = AIGeneratorService()
+        service.result_cache = cache
+        asyncio.run(service.initialize_models())
+        calls = []
+        service.pipeline = lambda **kwargs: calls.append(kwargs) or MockImageResult(count=len(kwargs["prompt"]))
+        source = Image.new("RGB", (512, 512), color="red")
+
+        service.using_fallback = True
+        asyncio.run(service.generate_simulation(source, "lips", 2.0, source_hash="abc"))
+        service.using_fallback = False
+        _, metadata = asyncio.run(service.generate_simulation(source, "lips", 2.0, source_hash="abc"))
+
+        assert "cache_hit" not in metadata
+        assert len(calls) == 2
+
+    def test_cache_and_preprocessing_run_off_event_loop(self, cache, monkeypatch):
+        """Accès au cache, préprocessing et contours n'occupent pas le thread de la boucle"""
+        service = AIGeneratorService()
+        service.result_cache = cache
+        asyncio.run(service.initialize_models())
+        loop_thread = threading.get_ident()
+        threads = {}
+
+        def recording(name, function):
+            def wrapper(*args, **kwargs):
+                threads[name] = threading.get_ident()
+                return function(*args, **kwargs)
+            return wrapper
+
+        monkeypatch.setattr(cache, "get", recording("get", cache.get))
+        monkeypatch.setattr(cache, "put", recording("put", cache.put))
+        monkeypatch.setattr(service, "_preprocess_image", recording("preprocess", service._preprocess_image))
+        source = Image.new("RGB", (512, 512), color="red")
+
+        asyncio.run(service.generate_simulation(source, "lips", 2.0))
+
+        assert set(threads) == {"get", "put", "preprocess"}
+        assert loop_thread not in threads.values()
+
+
+class TestControlImageCache:
+
+    def test_canny_computed_once_per_source(self, tmp_path):
+        """Les contours sont calculés une seule fois pour plusieurs interventions"""
+        control_dir = tmp_path / "control"
+        control_cache = ControlImageCache(memory_bytes=10 * 1024 * 1024, persist=True, directory=control_dir)
+        processed = Image.new("RGB", (512, 512), color="red")
+        calls = []
+
+        def detector(image):
+            calls.append(image.size)
+            return image.convert("L")
+
+        first = control_cache.get_or_compute("abc", processed, detector)
+        second = control_cache.get_or_compute("abc", processed, detector)
+
+        assert first is second
+        assert len(calls) == 1
+        assert (control_dir / "abc_512x512_canny.png").exists()
+
+        # Un nouveau processus relit la carte de contours persistée
+        restarted = ControlImageCache(memory_bytes=10 * 1024 * 1024, persist=True, directory=control_dir)
+        restored = restarted.get_or_compute("abc", processed, detector)
+        assert restored.size == (512, 512)
+        assert len(calls) == 1
+
+    def test_sizes_are_persisted_separately_and_deleted_together(self, tmp_path):
+        """Deux préprocessings d'une même source ne s'écrasent pas ; la suppression retire les deux"""
+        control_dir = tmp_path / "control"
+        control_cache = ControlImageCache(memory_bytes=10 * 1024 * 1024, persist=True, directory=control_dir)
+        calls = []
+
+        def detector(image):
+            calls.append(image.size)
+            return image.convert("L")
+
+        for size in ((768, 512), (1024, 680), (768, 512)):
+            control_cache.get_or_compute("abc", Image.new("RGB", size, color="red"), detector)
+
+        assert calls == [(768, 512), (1024, 680)]
+        assert sorted(path.name for path in control_dir.iterdir()) == [
+            "abc_1024x680_canny.png", "abc_768x512_canny.png"
+        ]
+
+        control_cache.delete("abc")
+        assert list(control_dir.iterdir()) == []
+        assert control_cache.memory.keys() == []
@@ -0,0 +1,145 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.patients import list_patients
+from app.api.simulations import _simulation_list_query, list_simulations
+from app.core.database import Base, DatabaseSession
+from app.models import User, Patient, Simulation
+
+
+@pytest.fixture
+def db():
+    """Base SQLite en mémoire"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def doctor_with_simulations(db):
+    """Praticien avec 7 simulations, dont plusieurs créées au même instant"""
+    user = User(
+        username="list_doctor",
+        hashed_pin="x",
+        full_name="Dr Liste",
+        speciality="dermatologie",
+        license_number="LIC-LIST",
+    )
+    patient = Patient(age_range="26-35", gender="F", skin_type="Claire")
+    db.add_all([user, patient])
+    db.flush()
+    start = datetime(2026, 1, 1)
+    for i in range(7):
+        db.add(Simulation(
+            patient_id=patient.id,
+            user_id=user.id,
+            original_image_path=f"{i}_original.jpg",
+            intervention_type="lips",
+            dose=1.0,
+            status="completed",
+            created_at=start + timedelta(minutes=i // 3),
+        ))
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def list_page(db, user, cursor, limit=3):
+    """Appeler GET /simulations en mode curseur"""
+    return asyncio.run(list_simulations(
+        skip=0, limit=limit, patient_id=None, status=None,
+        cursor=cursor, db=DatabaseSession(db), current_user=user
+    ))
+
+
+def query_plan(db, query) -> str:
+    """Plan d'exécution SQLite d'une requête ORM"""
+    statement = query.limit(50).statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+class TestSimulationListQuery:
+
+    @pytest.mark.parametrize("patient_id, status, index", [
+        (None, None, "ix_simulations_user_created"),
+        (None, "completed", "ix_simulations_user_status_created"),
+        (3, None, "ix_simulations_user_patient_created"),
+    ])
+    def test_list_is_served_by_composite_index(self, db, patient_id, status, index):
+        """Chaque filtre de liste parcourt un index composite, sans tri en mémoire"""
+        plan = query_plan(db, _simulation_list_query(db, 1, patient_id, status))
+
+        assert index in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_cursor_pages_cover_every_simulation_once(self, db, doctor_with_simulations):
+        """Les pages successives couvrent tout, sans doublon, malgré des dates identiques"""
+        seen = []
+        cursor = ""
+        while True:
+            page = list_page(db, doctor_with_simulations, cursor)
+            seen.extend(item.id for item in page.items)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+        expected = [sim.id for sim in db.query(Simulation).order_by(
+            Simulation.created_at.desc(), Simulation.id.desc()
+        )]
+        assert seen == expected
+        assert len(seen) == 7
+
+    def test_offset_mode_is_kept(self, db, doctor_with_simulations):
+        """Sans curseur, la réponse reste une liste paginée par skip/limit"""
+        first = list_page(db, doctor_with_simulations, cursor="")
+        offset_page = asyncio.run(list_simulations(
+            skip=0, limit=3, patient_id=None, status=None,
+            cursor=None, db=DatabaseSession(db), current_user=doctor_with_simulations
+        ))
+        assert isinstance(offset_page, list)
+        assert [item.id for item in offset_page] == [item.id for item in first.items]
+
+    def test_invalid_cursor_is_rejected(self, db, doctor_with_simulations):
+        """Un curseur illisible donne une erreur 400"""
+        with pytest.raises(HTTPException) as exc:
+            list_page(db, doctor_with_simulations, cursor="pas-un-curseur")
+        assert exc.value.status_code == 400
+
+
+class TestPatientListPagination:
+
+    def test_patients_cursor_pagination(self, db, doctor_with_simulations):
+        """La liste des patients se parcourt par curseur, plus récents d'abord"""
+        db.add_all([Patient(age_range="36-45", gender="M", skin_type="Mate") for _ in range(4)])
+        db.commit()
+
+        first = asyncio.run(list_patients(
+            skip=0, limit=3, cursor="", db=DatabaseSession(db), current_user=doctor_with_simulations
+        ))
+        second = asyncio.run(list_patients(
+            skip=0, limit=3, cursor=first.next_cursor, db=DatabaseSession(db), current_user=doctor_with_simulations
+        ))
+
+        ids = [item.id for item in first.items + second.items]
+        assert len(ids) == 5 == len(set(ids))
+        assert second.next_cursor is None
@@ -0,0 +1,119 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.simulations import get_user_simulation_stats
+from app.core.database import Base, DatabaseSession
+from app.models import User, Patient, Simulation
+
+
+@pytest.fixture
+def db():
+    """Base SQLite en mémoire"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_user(db, username):
+    """Créer un praticien et un patient"""
+    user = User(
+        username=username,
+        hashed_pin="x",
+        full_name="Dr Stats",
+        speciality="dermatologie",
+        license_number=f"LIC-{username}",
+    )
+    patient = Patient(age_range="26-35", gender="F", skin_type="Claire")
+    db.add_all([user, patient])
+    db.flush()
+    return user, patient
+
+
+class TestUserSimulationStats:
+
+    def test_stats_are_aggregated_in_a_single_query(self, db):
+        """Les statistiques sont calculées par un seul agrégat SQL, par utilisateur"""
+        user, patient = add_user(db, "stats_doctor")
+        other, other_patient = add_user(db, "other_doctor")
+        rows = [
+            (user, patient, "lips", "completed", 2.0),
+            (user, patient, "lips", "completed", 4.0),
+            (user, patient, "lips", "failed", None),
+            (user, patient, "botox_forehead", "completed", 6.0),
+            (user, patient, "botox_forehead", "pending", None),
+            (other, other_patient, "cheeks", "completed", 100.0),
+        ]
+        for owner, owner_patient, intervention, sim_status, generation_time in rows:
+            db.add(Simulation(
+                patient_id=owner_patient.id,
+                user_id=owner.id,
+                original_image_path="original.jpg",
+                intervention_type=intervention,
+                dose=1.0,
+                status=sim_status,
+                generation_time=generation_time,
+            ))
+        db.commit()
+        db.refresh(user)
+
+        statements = []
+        event.listen(
+            db.get_bind(), "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement)
+        )
+        stats = asyncio.run(get_user_simulation_stats(db=DatabaseSession(db), current_user=user))
+
+        assert len(statements) == 1
+        assert "GROUP BY" in statements[0]
+        assert stats.total_simulations == 5
+        assert stats.completed_simulations == 3
+        assert stats.failed_simulations == 1
+        assert stats.average_generation_time == pytest.approx(4.0)
+        assert stats.most_common_intervention == "lips"
+
+    def test_zero_times_and_ties_match_previous_behaviour(self, db):
+        """Les temps nuls sont ignorés et une égalité revient à la première intervention créée"""
+        user, patient = add_user(db, "tie_doctor")
+        for intervention, generation_time in [
+            ("botox_forehead", 0.0), ("lips", 3.0), ("lips", None), ("botox_forehead", 5.0)
+        ]:
+            db.add(Simulation(
+                patient_id=patient.id,
+                user_id=user.id,
+                original_image_path="original.jpg",
+                intervention_type=intervention,
+                dose=1.0,
+                status="completed",
+                generation_time=generation_time,
+            ))
+        db.commit()
+
+        stats = asyncio.run(get_user_simulation_stats(db=DatabaseSession(db), current_user=user))
+
+        assert stats.average_generation_time == pytest.approx(4.0)
+        assert stats.most_common_intervention == "botox_forehead"
+
+    def test_stats_without_simulations(self, db):
+        """Un utilisateur sans simulation obtient des statistiques vides"""
+        user, _ = add_user(db, "new_doctor")
+        db.commit()
+        stats = asyncio.run(get_user_simulation_stats(db=DatabaseSession(db), current_user=user))
+
+        assert stats.total_simulations == 0
+        assert stats.average_generation_time is None
+        assert stats.most_common_intervention is None
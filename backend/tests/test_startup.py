@@ -0,0 +1,155 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import main_router
+from app.services.ai_generator import AIGeneratorService, ai_service
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+class TestLazyStartup:
+
+    def test_app_import_does_not_load_heavy_libraries(self):
+        """torch, cv2 et diffusers ne sont pas importés avec l'application"""
+        code = (
+            "import sys, app.main; "
+            "print(','.join(m for m in ('torch', 'cv2', 'diffusers') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "ENVIRONMENT": "test"},
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ""
+
+    def test_models_are_loaded_once(self):
+        """Chargement en arrière-plan et premières inférences partagent un seul chargement"""
+        service = AIGeneratorService()
+        calls = []
+        load = service._load_models
+
+        async def counting_load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            await load()
+
+        service._load_models = counting_load
+
+        async def scenario():
+            task = service.load_models_in_background()
+            assert service.loading
+            await asyncio.gather(service.initialize_models(), service.initialize_models())
+            await task
+
+        asyncio.run(scenario())
+
+        assert calls == [1]
+        assert service.models_loaded and not service.loading
+        assert service.load_seconds is not None
+
+
+class TestLegacySchema:
+
+    def test_fresh_database_is_migrated_to_app_models(self, tmp_path):
+        """La base créée au démarrage de main:app porte les colonnes lues par le worker"""
+        from sqlalchemy import create_engine, inspect
+
+        from migrate_db import upgrade_schema
+
+        url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        upgrade_schema(url)
+        upgrade_schema(url)
+
+        engine = create_engine(url)
+        columns = {column["name"] for column in inspect(engine).get_columns("simulations")}
+        engine.dispose()
+        assert {"sweep_id", "progress", "failure_reason"} <= columns
+
+    def test_duplicate_usage_rows_are_merged_before_unique_index(self, tmp_path):
+        """Les compteurs en double d'un même mois sont additionnés avant l'index unique"""
+        from alembic import command
+        from sqlalchemy import create_engine, inspect, text
+
+        from migrate_db import alembic_config, upgrade_schema
+
+        url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        command.upgrade(alembic_config(url), "0001")
+        engine = create_engine(url)
+        with engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO usage_stats (user_id, year, month, simulations_count, "
+                "storage_used_mb, ai_processing_time_seconds) VALUES "
+                "(1, 2026, 10, 2, 1.5, 10.0), (1, 2026, 10, 3, 0.5, 5.0), "
+                "(1, 2026, 11, 1, 0.0, 1.0), (2, 2026, 10, 4, 2.0, 8.0), "
+                "(2, 2026, 10, NULL, NULL, 2.0)"
+            ))
+
+        upgrade_schema(url)
+
+        with engine.connect() as connection:
+            rows = connection.execute(text(
+                "SELECT id, user_id, month, simulations_count, storage_used_mb, "
+                "ai_processing_time_seconds FROM usage_stats ORDER BY id"
+            )).all()
+        indexes = {index["name"]: index for index in inspect(engine).get_indexes("usage_stats")}
+        engine.dispose()
+        assert [tuple(row) for row in rows] == [
+            (1, 1, 10, 5, 2.0, 15.0),
+            (3, 1, 11, 1, 0.0, 1.0),
+            (4, 2, 10, 4, 2.0, 10.0),
+        ]
+        assert indexes["ix_usage_stats_user_period"]["unique"]
+
+
+class TestHealthEndpoints:
+
+    def test_liveness_and_readiness(self, monkeypatch):
+        """/health répond pendant le chargement, /health/ready attend les modèles"""
+        app = FastAPI()
+        app.include_router(main_router)
+        client = TestClient(app)
+        monkeypatch.setattr(ai_service, "models_loaded", False)
+
+        assert client.get("/health").status_code == 200
+        assert client.get("/health/live").json()["ready"] is False
+        starting = client.get("/health/ready")
+        assert starting.status_code == 503
+        assert starting.json()["status"] == "starting"
+
+        monkeypatch.setattr(ai_service, "models_loaded", True)
+        monkeypatch.setattr(ai_service, "using_fallback", False)
+        ready = client.get("/health/ready")
+        assert ready.status_code == 200
+        assert ready.json()["checks"] == {"models": "loaded", "database": "ok"}
+
+    def test_legacy_readiness_follows_app_models(self, monkeypatch):
+        """main:app ne charge pas son propre pipeline : sa disponibilité suit ai_service"""
+        import main
+        from app.core.config import settings
+
+        client = TestClient(main.app)
+        monkeypatch.setattr(ai_service, "models_loaded", False)
+
+        monkeypatch.setattr(settings, "embedded_worker", False)
+        assert client.get("/health/ready").json() == {"status": "ready", "models": "external"}
+
+        monkeypatch.setattr(settings, "embedded_worker", True)
+        assert client.get("/health/ready").status_code == 503
+
+        monkeypatch.setattr(ai_service, "models_loaded", True)
+        monkeypatch.setattr(ai_service, "using_fallback", False)
+        assert client.get("/health/ready").json()["models"] == "loaded"
+        assert not hasattr(main, "ai_generator")
+
@@ -0,0 +1,92 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, configure_sqlite
+from app.models import Patient
+from app.services.status_writer import StatusWriter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Base SQLite sur fichier avec les réglages de l'application"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'writer.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    configure_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(Patient(age_range="26-35", gender="F", skin_type="Claire") for _ in range(3))
+    db.commit()
+    db.close()
+    yield engine
+    engine.dispose()
+
+
+def rename(patient_id, skin_type):
+    """Écriture de test : modifier le type de peau d'un patient"""
+    return lambda session: session.execute(
+        update(Patient).where(Patient.id == patient_id).values(skin_type=skin_type)
+    ).rowcount
+
+
+class TestSQLiteTuning:
+
+    def test_pragmas_applied_on_connect(self, engine):
+        """WAL, synchronous=NORMAL et busy_timeout sur chaque connexion"""
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+
+class TestStatusWriter:
+
+    def test_pending_writes_are_committed_together(self, engine):
+        """Les écritures soumises pendant une transaction forment le lot suivant"""
+        writer = StatusWriter(max_batch=50)
+        started, release = threading.Event(), threading.Event()
+        first = writer.submit(engine, lambda session: started.set() or release.wait(5))
+        started.wait(5)
+        futures = [writer.submit(engine, rename(1 + i % 3, f"type-{i}")) for i in range(20)]
+        release.set()
+
+        assert first.result(5) is True
+        assert [future.result(5) for future in futures] == [1] * 20
+        writer.shutdown()
+
+        stats = writer.stats()
+        assert stats["written"] == 21
+        assert stats["batches"] == 2
+        assert stats["largest_batch"] == 20
+
+        db = sessionmaker(bind=engine)()
+        assert db.get(Patient, 2).skin_type == "type-19"
+        db.close()
+
+    def test_failing_write_does_not_cancel_batch(self, engine):
+        """Une écriture en erreur est isolée, les autres du lot sont validées"""
+        writer = StatusWriter()
+        started, release = threading.Event(), threading.Event()
+        writer.submit(engine, lambda session: started.set() or release.wait(5))
+        started.wait(5)
+        good = writer.submit(engine, rename(1, "Mate"))
+        bad = writer.submit(engine, lambda session: session.execute(text("UPDATE missing SET x = 1")))
+        release.set()
+
+        assert good.result(5) == 1
+        with pytest.raises(Exception):
+            bad.result(5)
+        writer.shutdown()
+        assert writer.stats()["failed"] == 1
+
+        db = sessionmaker(bind=engine)()
+        assert db.get(Patient, 1).skin_type == "Mate"
+        db.close()
@@ -0,0 +1,108 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.utils.uploads import ingest_upload, InvalidImageError, UploadSizeLimitMiddleware, UploadTooLargeError
+
+
+def make_upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="photo.jpg")
+
+
+def jpeg_bytes(size=(640, 480)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color="red").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class TestUploadIngestion:
+
+    def test_upload_is_written_and_hashed(self, tmp_path):
+        """Les octets originaux sont conservés et hachés"""
+        content = jpeg_bytes()
+
+        upload = asyncio.run(ingest_upload(make_upload(content), tmp_path, file_id="abc", chunk_size=1024))
+
+        assert upload.path == tmp_path / "abc_original.jpg"
+        assert upload.path.read_bytes() == content
+        assert upload.sha256 == hashlib.sha256(content).hexdigest()
+        assert (upload.format, upload.width, upload.height) == ("JPEG", 640, 480)
+
+    def test_size_limit_is_enforced_while_reading(self, tmp_path):
+        """Un fichier trop volumineux est refusé sans laisser de fichier temporaire"""
+        content = jpeg_bytes((1024, 1024))
+
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(ingest_upload(make_upload(content), tmp_path, max_bytes=len(content) - 1, chunk_size=1024))
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_non_image_is_rejected_from_header(self, tmp_path):
+        """Un contenu non image est refusé dès le premier bloc"""
+        with pytest.raises(InvalidImageError):
+            asyncio.run(ingest_upload(make_upload(b"%PDF-1.4 not an image"), tmp_path))
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestUploadSizeLimitMiddleware:
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.add_middleware(UploadSizeLimitMiddleware, max_bytes=1024)
+        parsed = []
+
+        @app.post("/upload")
+        async def upload(file: UploadFile = File(...)):
+            parsed.append(file.filename)
+            return {"size": len(await file.read())}
+
+        client = TestClient(app)
+        client.parsed = parsed
+        return client
+
+    def test_small_upload_is_accepted(self, client):
+        """Sous la limite, le formulaire est analysé normalement"""
+        response = client.post("/upload", files={"file": ("photo.jpg", b"x" * 512, "image/jpeg")})
+
+        assert response.status_code == 200
+        assert response.json() == {"size": 512}
+
+    def test_oversized_content_length_is_rejected_before_parsing(self, client):
+        """Un Content-Length trop grand est refusé sans analyser le formulaire"""
+        response = client.post("/upload", files={"file": ("photo.jpg", b"x" * (256 * 1024), "image/jpeg")})
+
+        assert response.status_code == 413
+        assert client.parsed == []
+
+    def test_chunked_body_is_cut_off_while_receiving(self, client):
+        """Sans longueur annoncée, le corps est compté pendant sa réception"""
+        boundary = "limite"
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"photo.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n"
+        ).encode() + b"x" * (256 * 1024) + f"\r\n--{boundary}--\r\n".encode()
+
+        def chunks():
+            for start in range(0, len(body), 16 * 1024):
+                yield body[start:start + 16 * 1024]
+
+        response = client.post(
+            "/upload",
+            content=chunks(),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        )
+
+        assert response.status_code == 413
+        assert client.parsed == []
+
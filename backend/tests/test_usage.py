@@ -0,0 +1,102 @@
+import os
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import User, UsageStats
+from app.services.usage import UsageAccounting
+
+
+@pytest.fixture
+def session_factory():
+    """Base SQLite en mémoire partagée entre sessions"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    db.add(User(
+        id=1,
+        username="usage_doctor",
+        hashed_pin="x",
+        full_name="Dr Usage",
+        speciality="dermatologie",
+        license_number="LIC-USAGE",
+    ))
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+
+class TestUsageAccounting:
+
+    def test_records_are_upserted_into_a_single_row(self, session_factory):
+        """Les simulations d'un même mois incrémentent une seule ligne"""
+        accounting = UsageAccounting(ttl_seconds=60)
+        for storage_mb, seconds in ((1.5, 10.0), (0.5, 20.0)):
+            db = session_factory()
+            accounting.record_simulation(db, 1, storage_mb=storage_mb, processing_seconds=seconds)
+            db.commit()
+            db.close()
+
+        db = session_factory()
+        rows = db.query(UsageStats).all()
+        assert len(rows) == 1
+        assert rows[0].simulations_count == 2
+        assert rows[0].storage_used_mb == pytest.approx(2.0)
+        assert rows[0].ai_processing_time_seconds == pytest.approx(30.0)
+        db.close()
+
+    def test_cached_counters_follow_committed_transactions_only(self, session_factory):
+        """Le cache des quotas suit les transactions validées, pas les annulées"""
+        accounting = UsageAccounting(ttl_seconds=60)
+        db = session_factory()
+        assert accounting.current_usage(db, 1)["simulations_count"] == 0
+
+        accounting.record_simulation(db, 1, storage_mb=1.0)
+        db.rollback()
+        assert accounting.current_usage(db, 1)["simulations_count"] == 0
+
+        accounting.record_simulation(db, 1, storage_mb=1.0)
+        db.commit()
+
+        queries = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: queries.append(args[2]))
+        usage = accounting.current_usage(db, 1)
+        assert usage["simulations_count"] == 1
+        assert usage["storage_used_mb"] == pytest.approx(1.0)
+        assert queries == []
+        db.close()
+
+    def test_history_uses_one_range_query(self, session_factory):
+        """L'historique de 12 mois est lu en une requête et complété par des zéros"""
+        accounting = UsageAccounting(ttl_seconds=60)
+        db = session_factory()
+        for when in (datetime(2025, 3, 10), datetime(2025, 12, 1), datetime(2026, 2, 5), datetime(2026, 2, 6)):
+            accounting.record_simulation(db, 1, processing_seconds=5.0, when=when)
+        db.commit()
+
+        queries = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: queries.append(args[2]))
+        history = accounting.history(db, 1, months=12, now=datetime(2026, 2, 20))
+        db.close()
+
+        assert len(queries) == 1
+        assert [(usage["year"], usage["month"]) for usage in history][:2] == [(2025, 3), (2025, 4)]
+        assert (history[-1]["year"], history[-1]["month"]) == (2026, 2)
+        counts = {(usage["year"], usage["month"]): usage["simulations_count"] for usage in history}
+        assert counts[(2025, 3)] == 1
+        assert counts[(2025, 12)] == 1
+        assert counts[(2026, 2)] == 2
+        assert sum(counts.values()) == 4